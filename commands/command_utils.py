@@ -5,6 +5,7 @@ import re
 import resource
 
 from leapp.actors import config as actor_config
+from leapp.cli.commands import repository_manifest
 from leapp.exceptions import CommandError
 from leapp.utils import audit, path
 
@@ -83,8 +84,13 @@ def get_upgrade_paths_config():
     # NOTE(ivasilev) Importing here not to have circular dependencies
     from leapp.cli.commands.upgrade import util  # noqa: C415; pylint: disable=import-outside-toplevel
 
-    repository = util.load_repositories_from('repo_path', '/etc/leapp/repo.d/', manager=None)
-    with open(path.get_common_file_path(repository, LEAPP_UPGRADE_PATHS)) as f:
+    manifest = repository_manifest.load_manifest(util.get_repo_path('repo_path', '/etc/leapp/repo.d/'))
+    if manifest and LEAPP_UPGRADE_PATHS in manifest['files']:
+        upgrade_paths_path = manifest['files'][LEAPP_UPGRADE_PATHS]
+    else:
+        repository = util.load_repositories_from('repo_path', '/etc/leapp/repo.d/', manager=None)
+        upgrade_paths_path = path.get_common_file_path(repository, LEAPP_UPGRADE_PATHS)
+    with open(upgrade_paths_path) as f:
         upgrade_paths_map = json.loads(f.read())
     return upgrade_paths_map
 
@@ -4,13 +4,16 @@ import uuid
 
 from leapp.cli.commands import command_utils
 from leapp.cli.commands.config import get_config
-from leapp.cli.commands.upgrade import breadcrumbs, util
+from leapp.cli.commands.upgrade import breadcrumbs, profiling, util
 from leapp.exceptions import CommandError, LeappError
 from leapp.logger import configure_logger
 from leapp.utils.audit import Execution
 from leapp.utils.clicmd import command, command_opt
 from leapp.utils.output import beautify_actor_exception, report_errors, report_info
 
+# Phases requiring the target userspace, skipped by the quick check
+QUICK_CHECK_SKIPPED_PHASES = ('TargetTransactionFactsCollectionPhase', 'TargetTransactionChecksPhase')
+
 
 @command('preupgrade', help='Generate preupgrade report')
 @command_opt('whitelist-experimental', action='append', metavar='ActorName', help='Enables experimental actors')
@@ -34,12 +37,18 @@ from leapp.utils.output import beautify_actor_exception, report_errors, report_i
 @command_opt('report-schema', help='Specify report schema version for leapp-report.json',
              choices=['1.0.0', '1.1.0', '1.2.0'], default=get_config().get('report', 'schema'))
 @command_opt('nogpgcheck', is_flag=True, help='Disable RPM GPG checks. Same as yum/dnf --nogpgcheck option.')
+@command_opt('quick-check', is_flag=True,
+             help='Only check whether the upgrade is inhibited, without creating the target userspace. Checks'
+                  ' requiring the target userspace (e.g. of the RPM upgrade transaction) are skipped.')
+@command_opt('rescan', is_flag=True,
+             help='Scan the system again instead of reusing facts collected by the previous run of preupgrade')
 @breadcrumbs.produces_breadcrumbs
 def preupgrade(args, breadcrumbs):
     util.disable_database_sync()
     context = str(uuid.uuid4())
     cfg = get_config()
     util.handle_output_level(args)
+    util.handle_fact_cache(args)
     configuration = util.prepare_configuration(args)
     answerfile_path = cfg.get('report', 'answerfile')
     userchoices_path = cfg.get('report', 'userchoices')
@@ -50,7 +59,7 @@ def preupgrade(args, breadcrumbs):
         raise CommandError('This command has to be run under the root user.')
     e = Execution(context=context, kind='preupgrade', configuration=configuration)
     e.store()
-    util.archive_logfiles()
+    util.archive_logfiles(context)
     logger = configure_logger('leapp-preupgrade.log')
     os.environ['LEAPP_EXECUTION_ID'] = context
 
@@ -76,7 +85,13 @@ def preupgrade(args, breadcrumbs):
         os.environ['LANGUAGE'] = 'en_US.UTF-8'
         os.environ['LC_ALL'] = 'en_US.UTF-8'
         os.environ['LANG'] = 'en_US.UTF-8'
-        workflow.run(context=context, until_phase=until_phase, skip_dialogs=True)
+        profiling.enable()
+        if args.quick_check:
+            _run_quick_check(workflow, context, logger)
+        else:
+            workflow.run(context=context, until_phase=until_phase, skip_dialogs=True)
+
+    profiling.store(context)
 
     logger.info("Answerfile will be created at %s", answerfile_path)
     workflow.save_answers(answerfile_path, userchoices_path)
@@ -90,6 +105,22 @@ def preupgrade(args, breadcrumbs):
         sys.exit(1)
 
 
+def _run_quick_check(workflow, context, logger):
+    """
+    Run the workflow until the reports phase skipping phases which require the target userspace
+    """
+    skipped = util.get_phase_actors(workflow, QUICK_CHECK_SKIPPED_PHASES)
+    workflow.run(context=context, until_phase='ChecksPhase', skip_dialogs=True)
+    if workflow.failure:
+        return
+    logger.info('Quick check: skipping phases: %s', ', '.join(QUICK_CHECK_SKIPPED_PHASES))
+    workflow.run(context=context, skip_phases_until=QUICK_CHECK_SKIPPED_PHASES[-1], until_phase='ReportsPhase',
+                 skip_dialogs=True)
+    logger.info('Quick check: skipped actors: %s', ', '.join(skipped))
+    sys.stdout.write('Quick check: the following checks requiring the target userspace have been skipped:\n'
+                     '    {}\n'.format('\n    '.join(skipped)))
+
+
 def register(base_command):
     """
         Registers `leapp preupgrade`
@@ -0,0 +1,135 @@
+"""
+Manifest of leapp repositories installed on the system
+
+Discovering repositories requires walking the whole repository directory
+(following symlinks) to find all `.leapp` directories and then scanning
+each repository again. The manifest, generated when the leapp-repository
+package is built, records the repositories found under the repository path
+and paths of files required by the CLI before the repositories are loaded,
+so the walk can be skipped on every execution of leapp.
+
+The manifest is used only when it matches the installed repositories, i.e.
+listings of all directories traversed during the discovery are unchanged.
+In any other case the repositories are discovered as usual.
+
+This module must not depend on the leapp framework as it is executed
+also during the build of the RPM to generate the manifest:
+
+    python repository_manifest.py REPOSITORY_DIR REPO_PATH OUTPUT
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+REPOSITORY_MANIFEST_PATH = '/usr/share/leapp-repository/repository-manifest.json'
+MANIFEST_VERSION = 1
+# Files looked up in the manifest instead of in the loaded repositories
+MANIFEST_FILES = ('upgrade_paths.json',)
+
+
+def _listing_checksum(path):
+    return hashlib.sha256('\n'.join(sorted(os.listdir(path))).encode('utf-8')).hexdigest()
+
+
+def _find_repos(root):
+    """
+    Return relative paths of repositories and of directories traversed to find them
+
+    Same as the discovery performed by leapp, repositories are directories
+    containing the `.leapp` directory, which are not traversed any further.
+    """
+    repos = []
+    traversed = []
+    for dirpath, dirnames, dummy_filenames in os.walk(root, followlinks=True):
+        relpath = os.path.relpath(dirpath, root)
+        if '.leapp' in dirnames:
+            repos.append(relpath)
+            del dirnames[:]
+            continue
+        traversed.append(relpath)
+        dirnames.sort()
+    return sorted(repos), sorted(traversed)
+
+
+def _find_files(repository_dir, repos, names):
+    files = {}
+    for repo in repos:
+        files_dir = os.path.join(repository_dir, repo, 'files')
+        for name in names:
+            if name not in files and os.path.isfile(os.path.join(files_dir, name)):
+                files[name] = os.path.join(repo, 'files', name)
+    return files
+
+
+def generate_manifest(repository_dir, repo_path):
+    """
+    Generate the manifest for repositories stored in repository_dir
+
+    :param repository_dir: Directory containing the repositories (e.g. inside the RPM buildroot)
+    :param repo_path: Path from which leapp loads the repositories on the installed system
+    :return: The manifest
+    :rtype: dict
+    """
+    repos, traversed = _find_repos(repository_dir)
+    return {
+        'version': MANIFEST_VERSION,
+        'repo_path': os.path.normpath(repo_path),
+        'repositories': repos,
+        'listings': {relpath: _listing_checksum(os.path.join(repository_dir, relpath)) for relpath in traversed},
+        'files': _find_files(repository_dir, repos, MANIFEST_FILES),
+    }
+
+
+def _is_valid(manifest, repo_path):
+    if manifest.get('version') != MANIFEST_VERSION:
+        return False
+    if manifest.get('repo_path') != os.path.normpath(repo_path):
+        return False
+    for relpath, checksum in manifest.get('listings', {}).items():
+        if _listing_checksum(os.path.join(repo_path, relpath)) != checksum:
+            return False
+    for relpath in manifest.get('repositories', []):
+        if not os.path.isdir(os.path.join(repo_path, relpath, '.leapp')):
+            return False
+    return all(os.path.isfile(os.path.join(repo_path, f)) for f in manifest.get('files', {}).values())
+
+
+def load_manifest(repo_path, manifest_path=REPOSITORY_MANIFEST_PATH):
+    """
+    Return the manifest if it matches repositories present in the repo_path, None otherwise
+
+    Paths in the returned manifest are absolute.
+
+    :param repo_path: Path from which repositories are loaded
+    :param manifest_path: Path to the manifest
+    :rtype: dict or None
+    """
+    if os.getenv('LEAPP_DEVEL_SKIP_REPOSITORY_MANIFEST', '0') == '1':
+        return None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if not _is_valid(manifest, repo_path):
+            return None
+    except (EnvironmentError, ValueError, AttributeError):
+        return None
+    return {
+        'repositories': [os.path.normpath(os.path.join(repo_path, r)) for r in manifest['repositories']],
+        'files': {name: os.path.join(repo_path, f) for name, f in manifest['files'].items()},
+    }
+
+
+def main(argv):
+    if len(argv) != 4:
+        sys.stderr.write('usage: {} REPOSITORY_DIR REPO_PATH OUTPUT\n'.format(argv[0]))
+        return 2
+    manifest = generate_manifest(argv[1], argv[2])
+    with open(argv[3], 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,181 @@
+import sqlite3
+import tarfile
+
+import pytest
+
+from leapp.cli.commands.upgrade import util
+
+SCHEMA = '''
+CREATE TABLE execution (id INTEGER PRIMARY KEY, context VARCHAR(36) NOT NULL UNIQUE, kind VARCHAR(256));
+CREATE TABLE message_data (hash VARCHAR(64) PRIMARY KEY, data TEXT);
+CREATE TABLE message (
+    id INTEGER PRIMARY KEY,
+    context VARCHAR(36) NOT NULL REFERENCES execution (context),
+    message_data_hash VARCHAR(64) NOT NULL REFERENCES message_data (hash)
+);
+'''
+
+
+def _create_db(path, executions):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    for context, kind in executions:
+        db.execute('INSERT INTO execution (context, kind) VALUES (?, ?)', (context, kind))
+        db.execute('INSERT INTO message_data (hash, data) VALUES (?, ?)', ('hash-' + context, 'data'))
+        db.execute('INSERT INTO message (context, message_data_hash) VALUES (?, ?)', (context, 'hash-' + context))
+        # shared data are kept while referenced
+        db.execute('INSERT OR IGNORE INTO message_data (hash, data) VALUES (?, ?)', ('shared', 'data'))
+        db.execute('INSERT INTO message (context, message_data_hash) VALUES (?, ?)', (context, 'shared'))
+    db.commit()
+    db.close()
+
+
+def _contexts(path):
+    db = sqlite3.connect(path)
+    try:
+        return (
+            [row[0] for row in db.execute('SELECT context FROM execution ORDER BY id')],
+            sorted(row[0] for row in db.execute('SELECT hash FROM message_data')),
+        )
+    finally:
+        db.close()
+
+
+class MockedConfig(object):
+    def __init__(self, options):
+        self.options = options
+
+    def has_option(self, section, name):
+        return (section, name) in self.options
+
+    def get(self, section, name):
+        return self.options[(section, name)]
+
+
+@pytest.fixture
+def leapp_db(monkeypatch, tmpdir):
+    path = str(tmpdir.join('leapp.db'))
+    _create_db(path, [
+        ('upgrade1', 'upgrade'),
+        ('pre1', 'preupgrade'),
+        ('pre2', 'preupgrade'),
+        ('pre3', 'preupgrade'),
+        ('current', 'preupgrade'),
+    ])
+    monkeypatch.setattr(util, 'get_connection', lambda dummy_db: sqlite3.connect(path))
+    return path
+
+
+def test_prune_database(monkeypatch, leapp_db):
+    monkeypatch.setattr(util, 'get_config', lambda: MockedConfig({('archive', 'keep_executions'): '2'}))
+
+    util.prune_database('current')
+
+    contexts, data = _contexts(leapp_db)
+    assert contexts == ['upgrade1', 'pre3', 'current']
+    assert data == ['hash-current', 'hash-pre3', 'hash-upgrade1', 'shared']
+
+
+def test_prune_database_disabled(monkeypatch, leapp_db):
+    monkeypatch.setattr(util, 'get_config', lambda: MockedConfig({('archive', 'keep_executions'): '0'}))
+
+    util.prune_database('current')
+
+    assert _contexts(leapp_db)[0] == ['upgrade1', 'pre1', 'pre2', 'pre3', 'current']
+
+
+def test_create_context_database(leapp_db, tmpdir):
+    dst = str(tmpdir.join('context.db'))
+
+    util.create_context_database(leapp_db, 'pre3', dst)
+
+    assert _contexts(dst) == (['pre3'], ['hash-pre3', 'shared'])
+    # the original database is untouched
+    assert len(_contexts(leapp_db)[0]) == 5
+
+
+def test_create_context_database_orphans(leapp_db, tmpdir):
+    db = sqlite3.connect(leapp_db)
+    # data of a message removed earlier and data of a message of the kept context
+    db.execute('INSERT INTO message_data (hash, data) VALUES (?, ?)', ('orphan', 'data'))
+    db.commit()
+    db.close()
+    dst = str(tmpdir.join('context.db'))
+
+    util.create_context_database(leapp_db, 'current', dst)
+
+    assert _contexts(dst) == (['current'], ['hash-current', 'shared'])
+
+
+def test_delete_other_contexts_without_foreign_keys():
+    db = sqlite3.connect(':memory:')
+    db.executescript(
+        'CREATE TABLE message_data (hash VARCHAR(64) PRIMARY KEY, data TEXT);'
+        'CREATE TABLE message (id INTEGER PRIMARY KEY, context VARCHAR(36), message_data_hash VARCHAR(64));'
+        "INSERT INTO message_data VALUES ('a', 'data'), ('b', 'data'), ('orphan', 'data');"
+        "INSERT INTO message (context, message_data_hash) VALUES ('ctx1', 'a'), ('ctx2', 'b');"
+    )
+
+    assert util.delete_other_contexts(db, {'ctx1'})
+    assert [row[0] for row in db.execute('SELECT hash FROM message_data')] == ['a']
+    assert not util.delete_other_contexts(db, {'ctx1'})
+
+
+def test_get_previous_context(leapp_db):
+    assert util._get_previous_context('current') == 'pre3'
+    assert util._get_previous_context() == 'current'
+
+
+def test_archive_logfiles(monkeypatch, leapp_db, tmpdir):
+    logs_dir = tmpdir.mkdir('logs')
+    logs_dir.join('leapp-preupgrade.log').write('log')
+    monkeypatch.setattr(util, 'get_config', lambda: MockedConfig({
+        ('files_to_archive', 'dir'): str(logs_dir),
+        ('files_to_archive', 'files'): 'leapp-preupgrade.log,leapp-report.txt',
+        ('archive', 'dir'): str(tmpdir.join('archive')),
+        ('archive', 'keep_executions'): '3',
+        ('debug', 'dir'): str(logs_dir.join('dnf')),
+        ('database', 'path'): leapp_db,
+    }))
+
+    util.archive_logfiles('current')
+
+    archives = tmpdir.join('archive').listdir()
+    assert len(archives) == 1 and archives[0].basename.endswith('.tar.gz')
+    with tarfile.open(str(archives[0])) as tar:
+        names = tar.getnames()
+        assert leapp_db.lstrip('/') in names
+        tar.extract(leapp_db.lstrip('/'), str(tmpdir.join('extracted')))
+    assert _contexts(str(tmpdir.join('extracted', leapp_db.lstrip('/'))))[0] == ['pre3']
+    assert not logs_dir.join('leapp-preupgrade.log').check()
+    assert _contexts(leapp_db)[0] == ['upgrade1', 'pre2', 'pre3', 'current']
+
+
+def test_archive_logfiles_compressor_failed(monkeypatch, leapp_db, tmpdir):
+    logs_dir = tmpdir.mkdir('logs')
+    logs_dir.join('leapp-preupgrade.log').write('log')
+    monkeypatch.setattr(util, 'get_config', lambda: MockedConfig({
+        ('files_to_archive', 'dir'): str(logs_dir),
+        ('files_to_archive', 'files'): 'leapp-preupgrade.log',
+        ('archive', 'dir'): str(tmpdir.join('archive')),
+        ('archive', 'keep_executions'): '3',
+        ('debug', 'dir'): str(logs_dir.join('dnf')),
+        ('database', 'path'): leapp_db,
+    }))
+    monkeypatch.setattr(util, '_get_archive_compression', lambda: ('w|', ['false'], 'tar'))
+
+    with pytest.raises(util.CommandError):
+        util.archive_logfiles('current')
+
+    assert not tmpdir.join('archive').listdir()
+    assert logs_dir.join('leapp-preupgrade.log').check()
+    assert _contexts(leapp_db)[0] == ['upgrade1', 'pre1', 'pre2', 'pre3', 'current']
+
+
+def test_archive_compression_fallback(monkeypatch):
+    monkeypatch.setattr(util, 'get_config', lambda: MockedConfig({('archive', 'compression'): 'zstd'}))
+    monkeypatch.setenv('PATH', '/nonexistent')
+    assert util._get_archive_compression() == util.ARCHIVE_COMPRESSIONS['gz']
+
+    monkeypatch.setattr(util, 'get_config', lambda: MockedConfig({('archive', 'compression'): 'unknown'}))
+    assert util._get_archive_compression() == util.ARCHIVE_COMPRESSIONS['gz']
@@ -0,0 +1,159 @@
+import json
+import sqlite3
+
+import pytest
+
+from leapp.cli.commands.upgrade import profiling
+
+
+class ActorMocked(object):
+    name = 'some_actor'
+
+    def __init__(self, commands=0):
+        self.commands = commands
+
+    def run(self):
+        for dummy_i in range(self.commands):
+            profiling._subprocesses[0] += 1
+        return 'result'
+
+
+@pytest.fixture
+def records_path(monkeypatch, tmpdir):
+    path = str(tmpdir.join('records.jsonl'))
+    open(path, 'w').close()
+    monkeypatch.setattr(profiling, '_records_path', path)
+    return path
+
+
+@pytest.fixture
+def leapp_db(monkeypatch, tmpdir):
+    path = str(tmpdir.join('leapp.db'))
+    monkeypatch.setattr(profiling, 'get_connection', lambda dummy_db: sqlite3.connect(path))
+    return path
+
+
+def test_profiled_run(monkeypatch, records_path):
+    monkeypatch.setenv('LEAPP_CURRENT_PHASE', 'FactsPhase')
+    run = profiling._profiled_run(ActorMocked.run)
+
+    assert run(ActorMocked(commands=3)) == 'result'
+
+    with open(records_path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]['phase'] == 'FactsPhase'
+    assert records[0]['actor'] == 'some_actor'
+    assert records[0]['subprocesses'] == 3
+    assert records[0]['wall_time'] >= 0
+    assert records[0]['max_rss'] > 0
+
+
+def test_profiled_run_failure(records_path):
+    def _failing_run(dummy_self):
+        raise RuntimeError('failed')
+
+    with pytest.raises(RuntimeError):
+        profiling._profiled_run(_failing_run)(ActorMocked())
+
+    with open(records_path) as f:
+        assert len(f.readlines()) == 1
+
+
+def _record(phase, actor, wall_time, subprocesses=1):
+    return {'phase': phase, 'actor': actor, 'started': wall_time, 'wall_time': wall_time, 'cpu_user': 1.0,
+            'cpu_system': 0.5, 'max_rss': 1024 * wall_time, 'subprocesses': subprocesses}
+
+
+def test_store_and_get_profile(records_path, leapp_db):
+    with open(records_path, 'w') as f:
+        for record in (_record('FactsPhase', 'a', 1), _record('FactsPhase', 'b', 2), _record('ChecksPhase', 'c', 3)):
+            f.write(json.dumps(record) + '\n')
+        f.write('malformed\n')
+
+    profiling.store('context-1')
+
+    profile = profiling.get_profile('context-1')
+    assert [(r['phase'], r['actor']) for r in profile] == [('FactsPhase', 'a'), ('FactsPhase', 'b'),
+                                                           ('ChecksPhase', 'c')]
+    assert not profiling.get_profile('context-2')
+    # stored records are not stored again
+    profiling.store('context-1')
+    assert len(profiling.get_profile('context-1')) == 3
+
+
+def test_summarize_phases():
+    profile = [_record('FactsPhase', 'a', 1), _record('FactsPhase', 'b', 2, 5), _record('ChecksPhase', 'c', 3)]
+
+    phases = profiling.summarize_phases(profile)
+
+    assert [p['phase'] for p in phases] == ['FactsPhase', 'ChecksPhase']
+    assert phases[0]['actors'] == 2
+    assert phases[0]['wall_time'] == 3
+    assert phases[0]['cpu_user'] == 2.0
+    assert phases[0]['max_rss'] == 2048
+    assert phases[0]['subprocesses'] == 6
+
+
+def test_generate_timing_file(records_path, leapp_db, tmpdir):
+    with open(records_path, 'w') as f:
+        f.write(json.dumps(_record('FactsPhase', 'a', 1)) + '\n')
+    profiling.store('context-1')
+    path = str(tmpdir.join('leapp-timing.json'))
+
+    profiling.generate_timing_file('context-1', path)
+
+    with open(path) as f:
+        timing = json.load(f)
+    assert timing['context'] == 'context-1'
+    assert [p['phase'] for p in timing['phases']] == ['FactsPhase']
+    assert [a['actor'] for a in timing['actors']] == ['a']
+
+
+@pytest.mark.parametrize('args,name', [
+    (['/usr/bin/rpm', '-qa'], 'rpm'),
+    (['chroot', '/var/lib/leapp/scratch/mounts/root_', 'dnf', 'install'], 'chroot:dnf'),
+    (['systemd-nspawn', '--register=no', '--quiet', '-D', '/var/lib/leapp/el9userspace', '--bind=/sys',
+      '--setenv=LEAPP_DEBUG=0', '/usr/bin/rpm', '-qa'], 'systemd-nspawn:rpm'),
+    (['systemd-nspawn', '-D', '/target'], 'systemd-nspawn'),
+])
+def test_get_command_name(args, name):
+    assert profiling.get_command_name(args) == name
+
+
+def test_command_accounting(monkeypatch, records_path, leapp_db):
+    monkeypatch.setattr(profiling, '_accounting', [True])
+    monkeypatch.setenv('LEAPP_CURRENT_PHASE', 'FactsPhase')
+    call = profiling._counting_call(lambda args, **kwargs: {'stdout': 'x' * 10, 'exit_code': len(args) - 1})
+
+    class CallingActor(ActorMocked):
+        def run(self):
+            call(['rpm', '-qa'])
+            call(['rpm'])
+
+    profiling._profiled_run(CallingActor.run)(CallingActor())
+    call(['lsblk'])
+    profiling.store('context-1')
+
+    commands = profiling.get_commands('context-1')
+    assert [(c['actor'], c['command'], c['exit_code'], c['stdout_size']) for c in commands] == [
+        ('some_actor', 'rpm', 1, 10), ('some_actor', 'rpm', 0, 10), ('', 'lsblk', 0, 10)
+    ]
+    assert profiling.get_profile('context-1')[0]['subprocesses'] == 2
+
+    summary = profiling.summarize_commands(commands)
+    rpm = [c for c in summary if c['command'] == 'rpm'][0]
+    assert rpm['count'] == 2
+    assert rpm['failed'] == 1
+    assert rpm['stdout_size'] == 20
+    assert rpm['actors'] == ['some_actor']
+
+
+def test_command_accounting_disabled(monkeypatch, records_path, leapp_db):
+    monkeypatch.setattr(profiling, '_accounting', [False])
+    call = profiling._counting_call(lambda args, **kwargs: {'stdout': '', 'exit_code': 0})
+
+    call(['rpm', '-qa'])
+    profiling.store('context-1')
+
+    assert not profiling.get_commands('context-1')
@@ -0,0 +1,28 @@
+from collections import namedtuple
+
+from leapp.cli.commands.upgrade import util
+
+_Actor = namedtuple('_Actor', ('name',))
+_Stage = namedtuple('_Stage', ('actors',))
+
+
+class _Workflow(object):
+    def __init__(self, phases):
+        self.phase_actors = [
+            (type(name, (object,), {}),) + tuple(_Stage([_Actor(a) for a in stage]) for stage in stages)
+            for name, stages in phases
+        ]
+
+
+def test_get_phase_actors():
+    workflow = _Workflow([
+        ('ChecksPhase', (['check_before'], ['check'], [])),
+        ('TargetTransactionFactsCollectionPhase', ([], ['target_userspace_creator', 'scan_target'], ['after'])),
+        ('TargetTransactionChecksPhase', ([], ['dnf_check'], [])),
+        ('ReportsPhase', ([], ['verify_check_results'], [])),
+    ])
+
+    actors = util.get_phase_actors(workflow, ('TargetTransactionFactsCollectionPhase', 'TargetTransactionChecksPhase'))
+
+    assert actors == ['target_userspace_creator', 'scan_target', 'after', 'dnf_check']
+    assert util.get_phase_actors(workflow, ('DownloadPhase',)) == []
@@ -0,0 +1,90 @@
+import json
+import os
+
+from leapp.cli.commands import repository_manifest
+
+
+def _create_repository(path):
+    os.makedirs(os.path.join(path, '.leapp'))
+    os.makedirs(os.path.join(path, 'actors', 'someactor'))
+    os.makedirs(os.path.join(path, 'files'))
+
+
+def _setup(tmpdir):
+    """
+    Create repositories in the same layout as installed by the RPM
+
+    The repository dir contains the repositories, the repo path contains
+    a symlink to each top-level directory of the repository dir.
+    """
+    repository_dir = tmpdir.mkdir('repositories')
+    repo_path = tmpdir.mkdir('repos.d')
+    _create_repository(str(repository_dir.join('system_upgrade', 'common')))
+    _create_repository(str(repository_dir.join('system_upgrade', 'el8toel9')))
+    repository_dir.join('system_upgrade', 'common', 'files', 'upgrade_paths.json').write('{}')
+    os.symlink(str(repository_dir.join('system_upgrade')), str(repo_path.join('system_upgrade')))
+
+    manifest_path = str(tmpdir.join('manifest.json'))
+    with open(manifest_path, 'w') as f:
+        json.dump(repository_manifest.generate_manifest(str(repository_dir), str(repo_path)), f)
+    return repository_dir, repo_path, manifest_path
+
+
+def test_generate_manifest(tmpdir):
+    repository_dir, repo_path, dummy_manifest_path = _setup(tmpdir)
+
+    manifest = repository_manifest.generate_manifest(str(repository_dir), str(repo_path))
+
+    assert manifest['repositories'] == ['system_upgrade/common', 'system_upgrade/el8toel9']
+    assert sorted(manifest['listings']) == ['.', 'system_upgrade']
+    assert manifest['files'] == {'upgrade_paths.json': 'system_upgrade/common/files/upgrade_paths.json'}
+
+
+def test_load_manifest(tmpdir):
+    dummy_repository_dir, repo_path, manifest_path = _setup(tmpdir)
+
+    manifest = repository_manifest.load_manifest(str(repo_path), manifest_path)
+
+    assert manifest['repositories'] == [
+        os.path.join(str(repo_path), 'system_upgrade', 'common'),
+        os.path.join(str(repo_path), 'system_upgrade', 'el8toel9'),
+    ]
+    assert manifest['files'] == {
+        'upgrade_paths.json': os.path.join(str(repo_path), 'system_upgrade/common/files/upgrade_paths.json')
+    }
+
+
+def test_load_manifest_new_repository(tmpdir):
+    dummy_repository_dir, repo_path, manifest_path = _setup(tmpdir)
+    _create_repository(str(tmpdir.join('custom')))
+    os.symlink(str(tmpdir.join('custom')), str(repo_path.join('custom')))
+
+    assert repository_manifest.load_manifest(str(repo_path), manifest_path) is None
+
+
+def test_load_manifest_removed_repository(tmpdir):
+    repository_dir, repo_path, manifest_path = _setup(tmpdir)
+    repository_dir.join('system_upgrade', 'el8toel9', '.leapp').remove()
+
+    assert repository_manifest.load_manifest(str(repo_path), manifest_path) is None
+
+
+def test_load_manifest_different_repo_path(tmpdir):
+    dummy_repository_dir, repo_path, manifest_path = _setup(tmpdir)
+
+    assert repository_manifest.load_manifest(str(repo_path.join('system_upgrade')), manifest_path) is None
+
+
+def test_load_manifest_invalid(tmpdir):
+    manifest_path = tmpdir.join('manifest.json')
+    manifest_path.write('not a json')
+
+    assert repository_manifest.load_manifest(str(tmpdir), str(manifest_path)) is None
+    assert repository_manifest.load_manifest(str(tmpdir), str(tmpdir.join('missing.json'))) is None
+
+
+def test_load_manifest_skipped(monkeypatch, tmpdir):
+    dummy_repository_dir, repo_path, manifest_path = _setup(tmpdir)
+    monkeypatch.setenv('LEAPP_DEVEL_SKIP_REPOSITORY_MANIFEST', '1')
+
+    assert repository_manifest.load_manifest(str(repo_path), manifest_path) is None
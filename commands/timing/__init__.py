@@ -0,0 +1,92 @@
+from __future__ import print_function
+
+import sys
+
+from leapp.cli.commands.upgrade import profiling
+from leapp.exceptions import CommandError
+from leapp.utils.audit import get_connection
+from leapp.utils.clicmd import command, command_opt
+
+
+def _fetch_last_context():
+    with get_connection(None) as db:
+        row = db.execute('SELECT context FROM execution ORDER BY id DESC LIMIT 1').fetchone()
+    return row[0] if row else None
+
+
+def _format_row(name, values, others=None):
+    columns = ['{:>9.1f}s'.format(values['wall_time']),
+               '{:>9.1f}s'.format(values['cpu_user'] + values['cpu_system']),
+               '{:>8}M'.format(values['max_rss'] // 1024),
+               '{:>6}'.format(values['subprocesses'])]
+    if others is not None:
+        other_wall = others['wall_time'] if others else 0.0
+        columns.append('{:>+9.1f}s'.format(values['wall_time'] - other_wall))
+    return '{:<50} {}'.format(name, ' '.join(columns))
+
+
+def _print_profile(profile, other_profile=None, top=None):
+    header = '{:<50} {:>10} {:>10} {:>9} {:>6}'.format('', 'wall', 'cpu', 'max rss', 'procs')
+    if other_profile is not None:
+        header += ' {:>10}'.format('wall diff')
+
+    other_phases = {p['phase']: p for p in profiling.summarize_phases(other_profile or [])}
+    print('Phases:\n' + header, file=sys.stdout)
+    for phase in profiling.summarize_phases(profile):
+        others = other_phases.get(phase['phase'], {}) if other_profile is not None else None
+        print(_format_row(phase['phase'], phase, others), file=sys.stdout)
+
+    other_actors = {(a['phase'], a['actor']): a for a in other_profile or []}
+    actors = sorted(profile, key=lambda a: a['wall_time'], reverse=True)
+    print('\nActors by wall time:\n' + header, file=sys.stdout)
+    for actor in actors[:top] if top else actors:
+        others = other_actors.get((actor['phase'], actor['actor']), {}) if other_profile is not None else None
+        print(_format_row('{} ({})'.format(actor['actor'], actor['phase']), actor, others), file=sys.stdout)
+
+
+def _print_commands(commands, top=None):
+    if not commands:
+        print('\nNo commands have been recorded, set LEAPP_COMMAND_ACCOUNTING=1 to record them.', file=sys.stdout)
+        return
+    summary = profiling.summarize_commands(commands)
+    print('\nCommands by total time:', file=sys.stdout)
+    print('{:<40} {:>6} {:>10} {:>10} {:>6} {:>10}  {}'.format(
+        '', 'count', 'total', 'max', 'failed', 'stdout', 'actors'), file=sys.stdout)
+    for entry in summary[:top] if top else summary:
+        print('{:<40} {:>6} {:>9.1f}s {:>9.1f}s {:>6} {:>9}K  {}'.format(
+            entry['command'], entry['count'], entry['duration'], entry['max_duration'],
+            entry['failed'], entry['stdout_size'] // 1024, ', '.join(entry['actors'])), file=sys.stdout)
+
+
+@command('timing', help='Show time and resources spent by actors of a previous Leapp execution')
+@command_opt('context', metavar='CONTEXT', help='Context ID of the execution, the last one by default')
+@command_opt('compare', metavar='CONTEXT', help='Compare with the execution of the given context ID')
+@command_opt('top', value_type=int, default=20, help='Number of the most expensive actors to show, 0 for all')
+@command_opt('commands', is_flag=True,
+             help='Show the most expensive commands executed by actors (requires LEAPP_COMMAND_ACCOUNTING=1)')
+def timing(args):
+    context = args.context or _fetch_last_context()
+    if not context:
+        raise CommandError('No previous run found!')
+    profile = profiling.get_profile(context)
+    if not profile:
+        raise CommandError('No timing data found for the execution {}'.format(context))
+
+    other_profile = None
+    if args.compare:
+        other_profile = profiling.get_profile(args.compare)
+        if not other_profile:
+            raise CommandError('No timing data found for the execution {}'.format(args.compare))
+        print('Execution {} compared to {}\n'.format(context, args.compare), file=sys.stdout)
+    else:
+        print('Execution {}\n'.format(context), file=sys.stdout)
+    _print_profile(profile, other_profile, args.top)
+    if args.commands:
+        _print_commands(profiling.get_commands(context), args.top)
+
+
+def register(base_command):
+    """
+        Registers `leapp timing`
+    """
+    base_command.add_sub(timing)
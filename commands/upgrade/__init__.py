@@ -4,7 +4,7 @@ import uuid
 
 from leapp.cli.commands import command_utils
 from leapp.cli.commands.config import get_config
-from leapp.cli.commands.upgrade import breadcrumbs, util
+from leapp.cli.commands.upgrade import breadcrumbs, profiling, util
 from leapp.exceptions import CommandError, LeappError
 from leapp.logger import configure_logger
 from leapp.utils.audit import Execution
@@ -60,6 +60,9 @@ def upgrade(args, breadcrumbs):
     if os.getuid():
         raise CommandError('This command has to be run under the root user.')
 
+    # The upgrade always scans the system, facts cached by leapp preupgrade are never reused
+    os.environ['LEAPP_FACT_CACHE'] = '0'
+
     if args.resume:
         context, configuration = util.fetch_last_upgrade_context(resume_context)
         if not context:
@@ -78,7 +81,7 @@ def upgrade(args, breadcrumbs):
         configuration = util.prepare_configuration(args)
         e = Execution(context=context, kind='upgrade', configuration=configuration)
         e.store()
-        util.archive_logfiles()
+        util.archive_logfiles(context)
 
     logger = configure_logger('leapp-upgrade.log')
     os.environ['LEAPP_EXECUTION_ID'] = context
@@ -106,9 +109,12 @@ def upgrade(args, breadcrumbs):
         os.environ['LANGUAGE'] = 'en_US.UTF-8'
         os.environ['LC_ALL'] = 'en_US.UTF-8'
         os.environ['LANG'] = 'en_US.UTF-8'
+        profiling.enable()
         workflow.run(context=context, skip_phases_until=skip_phases_until, skip_dialogs=True,
                      only_with_tags=only_with_tags)
 
+    profiling.store(context)
+
     logger.info("Answerfile will be created at %s", answerfile_path)
     workflow.save_answers(answerfile_path, userchoices_path)
     report_errors(workflow.errors)
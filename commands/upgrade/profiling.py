@@ -0,0 +1,308 @@
+"""
+Profiling of actors executed by the IPU workflow
+
+Each actor is executed by the leapp framework in a forked process. The profiling
+wraps `Actor.run` so the forked process measures the execution of the actor
+itself and appends the measured values to a file shared with the leapp command.
+When the workflow finishes, the collected records are stored in leapp.db
+together with the execution context.
+
+When LEAPP_COMMAND_ACCOUNTING=1 is set, every command executed through
+`leapp.libraries.stdlib.run` (including IsolatedActions.call) is recorded
+as well, with its duration, exit code, size of its output and the actor
+which executed it.
+
+The profiling must never break the upgrade, any failure is only logged.
+"""
+
+import atexit
+import json
+import logging
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+
+from leapp.actors import Actor
+from leapp.libraries import stdlib
+from leapp.utils.audit import get_connection
+
+PROFILE_TABLE = 'actor_profile'
+PROFILE_COLUMNS = ('phase', 'actor', 'started', 'wall_time', 'cpu_user', 'cpu_system', 'max_rss', 'subprocesses')
+COMMANDS_TABLE = 'command_profile'
+COMMANDS_COLUMNS = ('phase', 'actor', 'command', 'started', 'duration', 'exit_code', 'stdout_size')
+# Commands used to execute other commands in an isolated environment
+ISOLATION_COMMANDS = ('chroot', 'systemd-nspawn')
+
+_records_path = None
+_subprocesses = [0]
+_accounting = [False]
+_current_actor = ['']
+
+
+def _logger():
+    return logging.getLogger('leapp.profiling')
+
+
+def get_command_name(args):
+    """
+    Return name of the executed command
+
+    For commands executed in an isolated environment (see IsolatedActions), the isolation
+    command is followed by the name of the command executed inside, e.g. `systemd-nspawn:rpm`.
+    """
+    if not isinstance(args, (list, tuple)) or not args:
+        return str(args)
+    name = os.path.basename(args[0])
+    if name == 'chroot' and len(args) > 2:
+        return '{}:{}'.format(name, os.path.basename(args[2]))
+    if name == 'systemd-nspawn':
+        options = iter(args[1:])
+        for arg in options:
+            if arg == '-D':
+                next(options, None)
+            elif not arg.startswith('-'):
+                return '{}:{}'.format(name, os.path.basename(arg))
+    return name
+
+
+def _write_command_record(args, started, result):
+    try:
+        stdout = result.get('stdout') if isinstance(result, dict) else None
+        record = {
+            'type': 'command',
+            'phase': os.environ.get('LEAPP_CURRENT_PHASE', ''),
+            'actor': _current_actor[0],
+            'command': get_command_name(args),
+            'started': started,
+            'duration': time.time() - started,
+            'exit_code': result.get('exit_code') if isinstance(result, dict) else None,
+            'stdout_size': len(stdout) if stdout is not None else None,
+        }
+        with open(_records_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    except (EnvironmentError, TypeError) as err:
+        _logger().debug('Cannot record execution of {}: {}'.format(args, err))
+
+
+def _counting_call(call):
+    def wrapper(args, *pargs, **kwargs):
+        _subprocesses[0] += 1
+        if not _accounting[0]:
+            return call(args, *pargs, **kwargs)
+        started = time.time()
+        result = None
+        try:
+            result = call(args, *pargs, **kwargs)
+            return result
+        finally:
+            _write_command_record(args, started, result)
+    wrapper.wrapped_call = call
+    return wrapper
+
+
+def _profiled_run(run):
+    def wrapper(self, *args, **kwargs):
+        started = time.time()
+        times = os.times()
+        subprocesses = _subprocesses[0]
+        _current_actor[0] = self.name
+        try:
+            return run(self, *args, **kwargs)
+        finally:
+            _current_actor[0] = ''
+            _write_record(self, started, times, subprocesses)
+    wrapper.wrapped_run = run
+    return wrapper
+
+
+def _write_record(actor, started, times, subprocesses):
+    try:
+        end = os.times()
+        max_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        record = {
+            'type': 'actor',
+            'phase': os.environ.get('LEAPP_CURRENT_PHASE', ''),
+            'actor': actor.name,
+            'started': started,
+            'wall_time': time.time() - started,
+            # time of subprocesses executed by the actor included
+            'cpu_user': (end[0] + end[2]) - (times[0] + times[2]),
+            'cpu_system': (end[1] + end[3]) - (times[1] + times[3]),
+            # KiB
+            'max_rss': max_rss,
+            'subprocesses': _subprocesses[0] - subprocesses,
+        }
+        with open(_records_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    except (EnvironmentError, TypeError) as err:
+        _logger().debug('Cannot record profile of the {} actor: {}'.format(actor.name, err))
+
+
+def enable():
+    """
+    Start profiling of actors executed from now on in this process
+    """
+    global _records_path  # pylint: disable=global-statement
+    if _records_path:
+        return
+    fd, _records_path = tempfile.mkstemp(prefix='leapp-actor-profile-', suffix='.jsonl')
+    os.close(fd)
+    atexit.register(_remove_records)
+    _accounting[0] = os.getenv('LEAPP_COMMAND_ACCOUNTING', '0') == '1'
+    Actor.run = _profiled_run(Actor.run)
+    stdlib._call = _counting_call(stdlib._call)  # pylint: disable=protected-access
+
+
+def _remove_records():
+    try:
+        os.remove(_records_path)
+    except OSError:
+        pass
+
+
+def _create_tables(db):
+    db.execute(
+        'CREATE TABLE IF NOT EXISTS {} ('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, context VARCHAR(36) NOT NULL, phase VARCHAR(256), '
+        'actor VARCHAR(256), started REAL, wall_time REAL, cpu_user REAL, cpu_system REAL, '
+        'max_rss INTEGER, subprocesses INTEGER)'.format(PROFILE_TABLE)
+    )
+    db.execute(
+        'CREATE TABLE IF NOT EXISTS {} ('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, context VARCHAR(36) NOT NULL, phase VARCHAR(256), '
+        'actor VARCHAR(256), command VARCHAR(256), started REAL, duration REAL, exit_code INTEGER, '
+        'stdout_size INTEGER)'.format(COMMANDS_TABLE)
+    )
+
+
+def _insert(db, table, columns, context, records):
+    db.executemany(
+        'INSERT INTO {} (context, {}) VALUES (?, {})'.format(table, ', '.join(columns), ', '.join('?' * len(columns))),
+        [(context,) + tuple(r.get(c) for c in columns) for r in records]
+    )
+
+
+def store(context):
+    """
+    Store records of the actors profiled so far into leapp.db under the given execution context
+    """
+    if not _records_path:
+        return
+    records = []
+    try:
+        with open(_records_path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        # records are stored, start over for the next workflow run if any
+        open(_records_path, 'w').close()
+    except EnvironmentError as err:
+        _logger().debug('Cannot read profile of actors: {}'.format(err))
+        return
+
+    try:
+        with get_connection(None) as db:
+            _create_tables(db)
+            _insert(db, PROFILE_TABLE, PROFILE_COLUMNS, context,
+                    [r for r in records if r.get('type', 'actor') == 'actor'])
+            _insert(db, COMMANDS_TABLE, COMMANDS_COLUMNS, context,
+                    [r for r in records if r.get('type') == 'command'])
+    except sqlite3.Error as err:
+        _logger().debug('Cannot store profile of actors: {}'.format(err))
+
+
+def _select(table, columns, context):
+    with get_connection(None) as db:
+        _create_tables(db)
+        cursor = db.execute(
+            'SELECT {} FROM {} WHERE context = ? ORDER BY started, id'.format(', '.join(columns), table), (context,)
+        )
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_profile(context):
+    """
+    Return profile of actors executed within the context in order of their execution
+
+    :rtype: list of dict
+    """
+    return _select(PROFILE_TABLE, PROFILE_COLUMNS, context)
+
+
+def get_commands(context):
+    """
+    Return records of commands executed within the context in order of their execution
+
+    Commands are recorded only when LEAPP_COMMAND_ACCOUNTING=1 is set.
+
+    :rtype: list of dict
+    """
+    return _select(COMMANDS_TABLE, COMMANDS_COLUMNS, context)
+
+
+def summarize_commands(commands):
+    """
+    Return totals of executed commands per command name, the most expensive first
+
+    :rtype: list of dict
+    """
+    summary = {}
+    for record in commands:
+        command = summary.setdefault(record['command'], {
+            'command': record['command'], 'count': 0, 'duration': 0.0, 'max_duration': 0.0, 'failed': 0,
+            'stdout_size': 0, 'actors': set(),
+        })
+        command['count'] += 1
+        command['duration'] += record['duration'] or 0
+        command['max_duration'] = max(command['max_duration'], record['duration'] or 0)
+        command['failed'] += 1 if record['exit_code'] != 0 else 0
+        command['stdout_size'] += record['stdout_size'] or 0
+        command['actors'].add(record['actor'])
+    for command in summary.values():
+        command['actors'] = sorted(command['actors'])
+    return sorted(summary.values(), key=lambda c: (-c['duration'], -c['count'], c['command']))
+
+
+def summarize_phases(profile):
+    """
+    Return totals of the profile per phase in order of execution of phases
+
+    Wall and CPU times are summed, max_rss is the maximum over actors of the phase.
+
+    :rtype: list of dict
+    """
+    phases = OrderedDict()
+    for record in profile:
+        phase = phases.setdefault(record['phase'], {
+            'phase': record['phase'], 'actors': 0, 'wall_time': 0.0, 'cpu_user': 0.0, 'cpu_system': 0.0,
+            'max_rss': 0, 'subprocesses': 0,
+        })
+        phase['actors'] += 1
+        for key in ('wall_time', 'cpu_user', 'cpu_system', 'subprocesses'):
+            phase[key] += record[key] or 0
+        phase['max_rss'] = max(phase['max_rss'], record['max_rss'] or 0)
+    return list(phases.values())
+
+
+def generate_timing_file(context, path):
+    """
+    Generate the JSON file with profile of actors and phases executed within the context
+
+    Totals of executed commands are included when they have been recorded.
+    """
+    try:
+        profile = get_profile(context)
+        timing = {'context': context, 'phases': summarize_phases(profile), 'actors': profile}
+        commands = get_commands(context)
+        if commands:
+            timing['commands'] = summarize_commands(commands)
+        with open(path, 'w') as f:
+            json.dump(timing, f, indent=2)
+    except (EnvironmentError, sqlite3.Error) as err:
+        _logger().debug('Cannot generate {}: {}'.format(path, err))
@@ -3,14 +3,19 @@ import itertools
 import json
 import os
 import shutil
+import sqlite3
+import subprocess
 import sys
 import tarfile
+import tempfile
 from datetime import datetime
 
-from leapp.cli.commands import command_utils
+from leapp.cli.commands import command_utils, repository_manifest
 from leapp.cli.commands.config import get_config
+from leapp.cli.commands.upgrade import profiling
 from leapp.exceptions import CommandError
-from leapp.repository.scan import find_and_scan_repositories
+from leapp.repository.manager import RepositoryManager
+from leapp.repository.scan import find_and_scan_repositories, scan_repo
 from leapp.utils import audit
 from leapp.utils.audit import get_checkpoints, get_connection, get_messages
 from leapp.utils.output import report_unsupported
@@ -45,8 +50,215 @@ def restore_leapp_env_vars(context):
         os.environ[entry['name']] = entry['value']
 
 
-def archive_logfiles():
-    """ Archive log files from a previous run of Leapp """
+# Number of the most recent executions kept in leapp.db, 0 keeps all of them
+ARCHIVE_KEEP_EXECUTIONS = 10
+ARCHIVE_COMPRESSION = 'gz'
+# compression: (tarfile mode, external compressor, extension of the archive)
+ARCHIVE_COMPRESSIONS = {
+    'gz': ('w:gz', None, 'tar.gz'),
+    'bz2': ('w:bz2', None, 'tar.bz2'),
+    'xz': ('w:xz', None, 'tar.xz'),
+    # multi-threaded compressors, used when installed
+    'pigz': ('w|', ['pigz', '-c'], 'tar.gz'),
+    'zstd': ('w|', ['zstd', '-q', '-T0', '-c'], 'tar.zst'),
+}
+
+
+def _get_archive_option(name, default):
+    cfg = get_config()
+    if cfg.has_option('archive', name):
+        return cfg.get('archive', name)
+    return default
+
+
+def _get_archive_compression():
+    compression = _get_archive_option('compression', ARCHIVE_COMPRESSION)
+    mode, compressor, extension = ARCHIVE_COMPRESSIONS.get(compression, ARCHIVE_COMPRESSIONS[ARCHIVE_COMPRESSION])
+    if compressor and not any(os.access(os.path.join(p, compressor[0]), os.X_OK)
+                              for p in os.environ.get('PATH', os.defpath).split(os.pathsep)):
+        # the compressor is not installed
+        return ARCHIVE_COMPRESSIONS[ARCHIVE_COMPRESSION]
+    if mode.startswith('w:') and mode[2:] not in tarfile.TarFile.OPEN_METH:
+        # e.g. xz is not supported on python 2
+        return ARCHIVE_COMPRESSIONS[ARCHIVE_COMPRESSION]
+    return mode, compressor, extension
+
+
+# References to rows of tables, which are not declared by foreign keys in all versions of leapp.db
+DATA_REFERENCES = {
+    'message_data': [('message', 'message_data_hash', 'hash')],
+}
+
+
+def _get_tables(db):
+    return [row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+
+def _get_context_tables(db):
+    return [
+        table for table in _get_tables(db)
+        if 'context' in [row[1] for row in db.execute('PRAGMA table_info("{}")'.format(table))]
+    ]
+
+
+def _get_references(db):
+    """
+    Return references to rows of tables as {table: [(referencing table, column, referenced column)]}
+
+    References declared by foreign keys are returned together with DATA_REFERENCES.
+    """
+    tables = _get_tables(db)
+    references = {}
+    for table, refs in DATA_REFERENCES.items():
+        if table in tables:
+            references[table] = [ref for ref in refs if ref[0] in tables]
+    for table in tables:
+        for fk in db.execute('PRAGMA foreign_key_list("{}")'.format(table)):
+            # (id, seq, referenced table, column, referenced column, ...)
+            ref = (table, fk[3], fk[4])
+            if ref not in references.setdefault(fk[2], []):
+                references[fk[2]].append(ref)
+    return references
+
+
+def _delete_orphans(db, context_tables):
+    """
+    Delete rows of tables without the context column that are not referenced by any other row
+
+    E.g. data of messages (message_data) that have been removed. Rows are deleted repeatedly
+    until nothing is deleted, as removed rows could have referenced other rows as well.
+    """
+    references = _get_references(db)
+    deleted = 0
+    while True:
+        deleted_now = 0
+        for table, refs in references.items():
+            # NOTE: the referenced column is not known when the primary key is referenced implicitly
+            if table in context_tables or not refs or not all(ref_column for dummy_t, dummy_c, ref_column in refs):
+                continue
+            condition = ' AND '.join(
+                '"{}" NOT IN (SELECT "{}" FROM "{}" WHERE "{}" IS NOT NULL)'.format(
+                    ref_column, column, ref_table, column)
+                for ref_table, column, ref_column in refs
+            )
+            deleted_now += db.execute('DELETE FROM "{}" WHERE {}'.format(table, condition)).rowcount
+        if not deleted_now:
+            return deleted
+        deleted += deleted_now
+
+
+def delete_other_contexts(db, contexts):
+    """
+    Delete data of all execution contexts except the given ones, return True if anything has been deleted
+
+    Rows of tables without the context column, which are not referenced by any other row
+    anymore (e.g. data of removed messages), are deleted as well.
+    """
+    placeholders = ', '.join('?' * len(contexts))
+    deleted = 0
+    context_tables = _get_context_tables(db)
+    for table in context_tables:
+        deleted += db.execute(
+            'DELETE FROM "{}" WHERE context NOT IN ({})'.format(table, placeholders), tuple(contexts)).rowcount
+    deleted += _delete_orphans(db, context_tables)
+    return bool(deleted)
+
+
+def prune_database(current_context=None):
+    """
+    Remove data of old executions from leapp.db
+
+    Data of the last executions (see ARCHIVE_KEEP_EXECUTIONS, configurable as `keep_executions`
+    in the archive section of the leapp configuration), of the last upgrade and of the current
+    execution are kept. The database is compacted when anything has been removed.
+    """
+    try:
+        keep = int(_get_archive_option('keep_executions', ARCHIVE_KEEP_EXECUTIONS))
+    except ValueError:
+        keep = ARCHIVE_KEEP_EXECUTIONS
+    if keep <= 0:
+        return
+
+    with get_connection(None) as db:
+        contexts = [row[0] for row in db.execute('SELECT context FROM execution ORDER BY id DESC LIMIT ?', (keep,))]
+        contexts.extend(row[0] for row in db.execute(
+            "SELECT context FROM execution WHERE kind = 'upgrade' ORDER BY id DESC LIMIT 1"))
+        if current_context:
+            contexts.append(current_context)
+        if not contexts or not delete_other_contexts(db, set(contexts)):
+            return
+        db.commit()
+        db.execute('VACUUM')
+
+
+def _get_previous_context(current_context=None):
+    with get_connection(None) as db:
+        for row in db.execute('SELECT context FROM execution ORDER BY id DESC'):
+            if row[0] != current_context:
+                return row[0]
+    return None
+
+
+def create_context_database(db_path, context, dst):
+    """
+    Create copy of the database containing just data of the given execution context
+    """
+    shutil.copyfile(db_path, dst)
+    db = sqlite3.connect(dst)
+    try:
+        delete_other_contexts(db, {context})
+        db.commit()
+        db.execute('VACUUM')
+    finally:
+        db.close()
+
+
+def _open_archive(archive_path, mode, compressor):
+    if not compressor:
+        return tarfile.open(archive_path, mode), None
+    # the compressor runs in parallel with tar and uses multiple threads itself
+    with open(archive_path, 'wb') as f:
+        proc = subprocess.Popen(compressor, stdin=subprocess.PIPE, stdout=f)
+    return tarfile.open(fileobj=proc.stdin, mode=mode), proc
+
+
+def _close_archive(tar, proc):
+    """
+    Close the archive opened by _open_archive, return True if it has been written completely
+    """
+    written = True
+    try:
+        tar.close()
+    except EnvironmentError:
+        # e.g. the compressor has exited prematurely or the disk is full
+        written = False
+    if proc:
+        try:
+            proc.stdin.close()
+        except EnvironmentError:
+            written = False
+        written = proc.wait() == 0 and written
+    return written
+
+
+def _remove_archived(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def archive_logfiles(current_context=None):
+    """
+    Archive log files from a previous run of Leapp
+
+    The archive contains also the leapp.db with data of the previous execution only.
+    Data of old executions are removed from the leapp.db afterwards, see prune_database.
+
+    :param current_context: Context of the current execution, if already stored in the database
+    """
     cfg = get_config()
 
     if not os.path.isdir(cfg.get('files_to_archive', 'dir')):
@@ -59,31 +271,67 @@ def archive_logfiles():
     if not os.path.isdir(cfg.get('archive', 'dir')):
         os.makedirs(cfg.get('archive', 'dir'))
 
+    db_path = cfg.get('database', 'path')
     if files_to_archive:
         if os.path.isdir(cfg.get('debug', 'dir')):
             files_to_archive.append(cfg.get('debug', 'dir'))
 
+        mode, compressor, extension = _get_archive_compression()
         now = datetime.now().strftime('%Y%m%d%H%M%S')
-        archive_file = os.path.join(cfg.get('archive', 'dir'), 'leapp-{}-logs.tar.gz'.format(now))
+        archive_file = os.path.join(cfg.get('archive', 'dir'), 'leapp-{}-logs.{}'.format(now, extension))
 
-        with tarfile.open(archive_file, "w:gz") as tar:
+        tar, proc = _open_archive(archive_file, mode, compressor)
+        written = False
+        try:
             for file_to_add in files_to_archive:
                 tar.add(file_to_add)
-                if os.path.isdir(file_to_add):
-                    shutil.rmtree(file_to_add, ignore_errors=True)
-                try:
-                    os.remove(file_to_add)
-                except OSError:
-                    pass
             # leapp_db is not in files_to_archive to not have it removed
-            if os.path.isfile(cfg.get('database', 'path')):
-                tar.add(cfg.get('database', 'path'))
+            previous_context = _get_previous_context(current_context) if os.path.isfile(db_path) else None
+            if previous_context:
+                tmpdir = tempfile.mkdtemp()
+                try:
+                    context_db_path = os.path.join(tmpdir, os.path.basename(db_path))
+                    create_context_database(db_path, previous_context, context_db_path)
+                    tar.add(context_db_path, arcname=db_path)
+                finally:
+                    shutil.rmtree(tmpdir, ignore_errors=True)
+            written = True
+        except EnvironmentError:
+            # e.g. the compressor has exited prematurely, handled below
+            pass
+        finally:
+            written = _close_archive(tar, proc) and written
+            if not written:
+                _remove_archived(archive_file)
+        if not written:
+            raise CommandError(
+                'Failed to write the archive of log files {}. The log files have been kept.'.format(archive_file)
+            )
+        # the archived files are removed only once the archive is complete
+        for file_to_add in files_to_archive:
+            _remove_archived(file_to_add)
+
+    if os.path.isfile(db_path):
+        prune_database(current_context)
+
+
+def get_repo_path(name, repo_path):
+    if get_config().has_option('repositories', name):
+        repo_path = get_config().get('repositories', name)
+    return repo_path
 
 
 def load_repositories_from(name, repo_path, manager=None):
-    if get_config().has_option('repositories', name):
-        repo_path = get_config().get('repositories', name)
-    return find_and_scan_repositories(repo_path, manager=manager)
+    repo_path = get_repo_path(name, repo_path)
+    manifest = repository_manifest.load_manifest(repo_path)
+    if not manifest:
+        return find_and_scan_repositories(repo_path, manager=manager)
+
+    # repositories are known from the manifest, no need to search for them
+    manager = manager or RepositoryManager()
+    for repository in manifest['repositories']:
+        manager.add_repo(scan_repo(repository))
+    return manager
 
 
 def load_repositories():
@@ -129,6 +377,20 @@ def get_last_phase(context):
     return None
 
 
+def get_phase_actors(workflow, phases):
+    """
+    Return names of actors of the workflow in the given phases in order of the phases
+
+    :param phases: Names of phase classes of the workflow, e.g. 'ChecksPhase'
+    """
+    actors = []
+    for phase in workflow.phase_actors:
+        if phase[0].__name__ in phases:
+            for stage in phase[1:]:
+                actors.extend(actor.name for actor in stage.actors)
+    return actors
+
+
 def check_env_and_conf(env_var, conf_var, configuration):
     """
     Checks whether the given environment variable or the given configuration value are set to '1'
@@ -139,6 +401,8 @@ def check_env_and_conf(env_var, conf_var, configuration):
 def generate_report_files(context, report_schema):
     """
     Generates all report files for specific leapp run (txt and json format)
+
+    The leapp-timing.json file with the profile of executed actors is generated as well.
     """
     cfg = get_config()
     report_txt, report_json = [os.path.join(cfg.get('report', 'dir'),
@@ -147,6 +411,7 @@ def generate_report_files(context, report_schema):
     messages = fetch_upgrade_report_messages(context)
     generate_report_file(messages, context, report_txt, report_schema)
     generate_report_file(messages, context, report_json, report_schema)
+    profiling.generate_timing_file(context, os.path.join(cfg.get('report', 'dir'), 'leapp-timing.json'))
 
 
 def get_cfg_files(section, cfg, must_exist=True):
@@ -179,6 +444,16 @@ def handle_output_level(args):
         os.environ['LEAPP_VERBOSE'] = os.getenv('LEAPP_VERBOSE', '0')
 
 
+def handle_fact_cache(args):
+    """
+    Enable reuse of facts collected by the previous run unless a rescan is requested
+
+    Setting LEAPP_FACT_CACHE=0 disables the cache completely.
+    """
+    if os.getenv('LEAPP_FACT_CACHE') != '0':
+        os.environ['LEAPP_FACT_CACHE'] = 'rescan' if args.rescan else '1'
+
+
 # NOTE(ivasilev) Please make sure you are not calling prepare_configuration after first reboot.
 # If called as leapp upgrade --resume this will happily crash in target version container for
 # the latest supported release because of target_version discovery attempt.
@@ -290,6 +290,14 @@ done;
 %py_byte_compile %{__python3} %{buildroot}%{repositorydir}/*
 %endif
 
+# generate the manifest of installed repositories so leapp does not need
+# to search for them on each execution
+%if 0%{?rhel} == 7
+%{__python2} commands/repository_manifest.py %{buildroot}%{repositorydir} %{_sysconfdir}/leapp/repos.d/ %{buildroot}%{leapp_datadir}/repository-manifest.json
+%else
+%{__python3} commands/repository_manifest.py %{buildroot}%{repositorydir} %{_sysconfdir}/leapp/repos.d/ %{buildroot}%{leapp_datadir}/repository-manifest.json
+%endif
+
 
 %files -n %{lpr_name}
 %doc README.md
@@ -305,6 +313,7 @@ done;
 #%%config %%{_sysconfdir}/leapp/actor_conf.d/*
 %{_sysconfdir}/leapp/repos.d/*
 %{_sysconfdir}/leapp/transaction/*
+%{leapp_datadir}/repository-manifest.json
 %{repositorydir}/*
 %{leapp_python_sitelib}/leapp/cli/commands/*
 
@@ -1,4 +1,5 @@
 import os
+from collections import Counter
 
 from leapp import reporting
 from leapp.libraries.stdlib import api
@@ -29,19 +30,82 @@ def _get_common_path(path1, path2):
     return os.path.join('/', *common_path)
 
 
+def _split_path(path):
+    return path.strip('/').split('/') if path.strip('/') else []
+
+
+class _PathTrieNode(object):
+    """
+    Node of a trie of path components of mount points
+
+    Mount points already known to be overshadowing are kept in the trie, but only the other (pending) ones
+    are returned by pop_pending_mount_points.
+    """
+    __slots__ = ('children', 'pending', 'pending_count')
+
+    def __init__(self):
+        self.children = {}
+        self.pending = []
+        # number of pending mount points in the subtree of the node
+        self.pending_count = 0
+
+    def pop_pending_mount_points(self):
+        """
+        Remove and return all pending mount points in the subtree of the node
+        """
+        mount_points = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            mount_points.extend(node.pending)
+            node.pending = []
+            node.pending_count = 0
+            stack.extend(child for child in node.children.values() if child.pending_count)
+        return mount_points
+
+
 def _get_overshadowing_mount_points(mount_points):
     """
     Retrieve set of overshadowing and overshadowed mount points.
 
+    A mount point overshadows all previous mount points under its path (including itself). Previous mount points
+    are kept in a trie of their path components, so the mount points overshadowed by a mount point are found
+    by a lookup of its path instead of comparing it with all previous mount points.
+
     :param list[str] mount_points: absolute paths to mount points without trailing /
     :returns: set of unique mount points without trailing /
     """
     overshadowing = set()
+    root = _PathTrieNode()
     for i, mount_point in enumerate(mount_points):
-        for overshadowing_mount_point in mount_points[i+1:]:
-            if _get_common_path(mount_point, overshadowing_mount_point) == overshadowing_mount_point:
-                overshadowing.add(overshadowing_mount_point)
+        components = _split_path(mount_point)
+        # NOTE: only a normalized path can overshadow other mount points, e.g. /var//log does not overshadow
+        # /var//log/audit, the same as in case of the _get_common_path function
+        if i and os.path.join('/', *components) == mount_point:
+            path = [root]
+            for component in components:
+                if component not in path[-1].children:
+                    break
+                path.append(path[-1].children[component])
+            else:
+                # Nodes are created only for paths of previous mount points, so there is at least one previous
+                # mount point under the path
+                overshadowed = path[-1].pop_pending_mount_points()
+                for node in path[:-1]:
+                    node.pending_count -= len(overshadowed)
+                overshadowing.update(overshadowed)
                 overshadowing.add(mount_point)
+
+        is_pending = mount_point not in overshadowing
+        node = root
+        node.pending_count += is_pending
+        for component in components:
+            if component not in node.children:
+                node.children[component] = _PathTrieNode()
+            node = node.children[component]
+            node.pending_count += is_pending
+        if is_pending:
+            node.pending.append(mount_point)
     return overshadowing
 
 
@@ -60,7 +124,7 @@ def check_fstab_mount_order():
             mount_points.append(mount_point)
 
     overshadowing = _get_overshadowing_mount_points(mount_points)
-    duplicates = {mp for mp in mount_points if mount_points.count(mp) > 1}
+    duplicates = {mp for mp, count in Counter(mount_points).items() if count > 1}
 
     if not overshadowing:
         return
@@ -65,6 +65,17 @@ def test_get_overshadowing_mount_points(fstab_entries, expected_output):
     assert _get_overshadowing_mount_points(fstab_entries) == expected_output
 
 
+def test_get_overshadowing_mount_points_many_entries():
+    # e.g. a host with thousands of NFS exports bind mounted elsewhere, every other export mounted after its binds
+    mount_points = ['/srv/exports/{}/bind'.format(i) for i in range(10000)]
+    mount_points += ['/srv/exports/{}'.format(i) if i % 2 else '/mnt/nfs/{}'.format(i) for i in range(10000)]
+
+    expected = {'/srv/exports/{}'.format(i) for i in range(1, 10000, 2)}
+    expected |= {'/srv/exports/{}/bind'.format(i) for i in range(1, 10000, 2)}
+    assert _get_overshadowing_mount_points(mount_points) == expected
+    assert _get_overshadowing_mount_points(mount_points + ['/']) == set(mount_points + ['/'])
+
+
 @pytest.mark.parametrize(
     ('storage_info', 'should_inhibit', 'duplicates'),
     [
@@ -31,7 +31,23 @@ export LEAPP3_BIN=$LEAPPHOME/leapp3
 
 export NEWROOT=${NEWROOT:-"/sysroot"}
 
+#
+# Upgrade timeline
+#
+# Every stage of the upgrade is recorded with the current time and uptime
+# as one JSON object per line. The directory is bind mounted into the
+# upgrade container so actors can record their stages as well (see the
+# upgradetimeline library), the start of each workflow phase is recorded
+# by the mark_upgrade_phase actor. The timeline is stored in /var/log/leapp
+# together with the upgrade logs.
+#
+LEAPP_TIMELINE_DIR="/run/leapp-upgrade-timeline"
+LEAPP_TIMELINE_FILE="$LEAPP_TIMELINE_DIR/timeline.jsonl"
+LEAPP_TIMELINE_LOG="/var/log/leapp/leapp-upgrade-timeline.jsonl"
+mkdir -p "$LEAPP_TIMELINE_DIR"
+
 NSPAWN_OPTS="--capability=all --bind=/dev --bind=/dev/pts --bind=/proc --bind=/run/udev --bind=/run/lock"
+NSPAWN_OPTS="$NSPAWN_OPTS --bind=$LEAPP_TIMELINE_DIR"
 [ -d /dev/mapper ] && NSPAWN_OPTS="$NSPAWN_OPTS --bind=/dev/mapper"
 if [ "$RHEL_OS_MAJOR_RELEASE" == "8" ]; then
     # IPU 7 -> 8
@@ -61,6 +77,8 @@ LEAPP_DEBUG_TMP="/tmp/leapp-debug-root"
 # first emission is done immediately, second after 10s, and the
 # third one after 20s.
 #
+# Can be changed by the rd.upgrade.inband.iter=N kernel option.
+#
 IBDMP_ITER=3
 
 #
@@ -70,7 +88,87 @@ IBDMP_ITER=3
 # payload.   (By base64 standard, these characters are inherently ASCII,
 # so ie. they correspond to bytes.)
 #
-IBDMP_CHUNKSIZE=40
+# Every chunk carries a prefix of roughly 15 characters, so larger chunks
+# considerably reduce the time needed to dump the data on slow (serial)
+# consoles.  Can be changed by the rd.upgrade.inband.chunksize=N kernel
+# option; the value is rounded down to a multiple of 4, so every chunk
+# can be decoded on its own.
+#
+IBDMP_CHUNKSIZE=256
+
+#
+# Maximum size in bytes of every log file included in the dump
+#
+# Only the tail of the journal and leapp logs is dumped.  Can be changed
+# by the rd.upgrade.inband.logtail=BYTES kernel option, 0 means the whole
+# files are dumped.  With rd.upgrade.inband.filter=0 the whole leapp.db
+# is dumped as well, otherwise only data of the last leapp execution
+# (context) is included.
+#
+IBDMP_LOGTAIL=1048576
+
+timeline_mark() {
+    #
+    # Record the stage $1 of the upgrade into the timeline
+    #
+    local now uptime
+    printf -v now '%(%s)T' -1
+    read -r uptime _ </proc/uptime
+    echo "{\"stage\": \"$1\", \"time\": $now, \"uptime\": $uptime}" >>"$LEAPP_TIMELINE_FILE"
+}
+
+load_ibdmp_config() {
+    #
+    # Override the ibdmp defaults by rd.upgrade.inband.* kernel options
+    #
+    local kopt
+    kopt=$(getarg 'rd.upgrade.inband.iter=')
+    [[ "$kopt" =~ ^[1-9][0-9]*$ ]] && IBDMP_ITER=$kopt
+    kopt=$(getarg 'rd.upgrade.inband.chunksize=')
+    [[ "$kopt" =~ ^[0-9]+$ ]] && [ "$kopt" -ge 4 ] && IBDMP_CHUNKSIZE=$((kopt / 4 * 4))
+    kopt=$(getarg 'rd.upgrade.inband.logtail=')
+    [[ "$kopt" =~ ^[0-9]+$ ]] && IBDMP_LOGTAIL=$kopt
+    return 0
+}
+
+copy_log_tail() {
+    #
+    # Copy file $1 to $2, keeping only last $IBDMP_LOGTAIL bytes
+    #
+    if [ "$IBDMP_LOGTAIL" -eq 0 ]; then
+        cp "$1" "$2"
+    else
+        tail -c "$IBDMP_LOGTAIL" "$1" >"$2"
+    fi
+}
+
+collect_leapp_db() {
+    #
+    # Copy leapp.db into directory $1 keeping only data of the last execution
+    #
+    # The filtering is done inside the upgrade container by the python
+    # interpreter of leapp.  Whole database is copied when it is not possible.
+    #
+    local dst=$1
+    local tmp=$LEAPP_DEBUG_TMP
+    local filter="$tmp/ibdmp-filter-db.py"
+    if getargbool 1 rd.upgrade.inband.filter && [ -f /usr/lib/leapp/ibdmp-filter-db.py ]; then
+        cp /usr/lib/leapp/ibdmp-filter-db.py "$filter"
+        # NOTE: We disable shell-check since we want to word-break NSPAWN_OPTS
+        # shellcheck disable=SC2086
+        /usr/bin/systemd-nspawn $NSPAWN_OPTS --bind="$tmp" -D "$NEWROOT" /usr/bin/bash -c "
+            mount -a
+            # leapp is installed just for one of the interpreters
+            for py in /usr/bin/python3 /usr/libexec/platform-python /usr/bin/python2; do
+                [ -x \$py ] && \$py $filter /var/lib/leapp/leapp.db $dst/leapp.db && exit 0
+            done
+            exit 1
+        " && return 0
+        warn "cannot filter leapp.db for the in-band dump, dumping the whole database"
+        rm -f "$dst/leapp.db"
+    fi
+    cp -v "$NEWROOT/var/lib/leapp/leapp.db" "$dst"
+}
 
 collect_and_dump_debug_data() {
     #
@@ -78,14 +176,21 @@ collect_and_dump_debug_data() {
     #
     local tmp=$LEAPP_DEBUG_TMP
     local data=$tmp/data
+    local logfile
+    load_ibdmp_config
     mkdir -p "$data" || { echo >&2 "fatal: cannot create leapp dump data dir: $data"; exit 4; }
-    journalctl -amo verbose >"$data/journalctl.log"
+    journalctl -amo verbose >"$tmp/journalctl.log"
+    copy_log_tail "$tmp/journalctl.log" "$data/journalctl.log"
+    rm -f "$tmp/journalctl.log"
     mkdir -p "$data/var/lib/leapp"
-    mkdir -p "$data/var/log"
-    cp -vr "$NEWROOT/var/lib/leapp/leapp.db" \
-          "$data/var/lib/leapp"
-    cp -vr "$NEWROOT/var/log/leapp" \
-          "$data/var/log"
+    mkdir -p "$data/var/log/leapp"
+    collect_leapp_db "$data/var/lib/leapp"
+    # archived logs of previous executions are not interesting
+    for logfile in "$NEWROOT"/var/log/leapp/*; do
+        [ -f "$logfile" ] || continue
+        copy_log_tail "$logfile" "$data/var/log/leapp/${logfile##*/}"
+    done
+    # the default xz preset, higher presets need hundreds of MiB of memory in the initramfs
     tar -cJf "$tmp/data.tar.xz" "$data"
     ibdmp "$tmp/data.tar.xz"
     rm -r "$tmp"
@@ -182,11 +287,8 @@ ibdmp() {
     (
         set +x
         echo "chunks=$chunks,md5=$md5"
-        cnum=1
-        while read -r chunk; do
-            echo "$cnum:$chunk"
-            ((cnum++))
-        done <"$tmp/b64"
+        # number the chunks: "N:PAYLOAD"
+        sed = "$tmp/b64" | sed 'N; s/\n/:/'
     ) >"$tmp/report"
     i=0
     while test "$i" -lt "$IBDMP_ITER"; do
@@ -217,6 +319,7 @@ do_upgrade() {
     getargbool 0 rd.upgrade.debug && args="$args --debug"
 
     bring_up_network
+    timeline_mark "network-up"
 
     # Force selinux into permissive mode unless booted with 'enforcing=1'.
     # FIXME: THIS IS A BIG STUPID HAMMER AND WE SHOULD ACTUALLY SOLVE THE ROOT
@@ -236,8 +339,10 @@ do_upgrade() {
     # NOTE: in case we would need to run leapp before pivot, we would need to
     #       specify where the root is, e.g. --root=/sysroot
     # TODO: update: systemd-nspawn
+    timeline_mark "leapp-upgrade-start"
     /usr/bin/systemd-nspawn $NSPAWN_OPTS -D "$NEWROOT" /usr/bin/bash -c "mount -a; $LEAPPBIN upgrade --resume $args"
     rv=$?
+    timeline_mark "leapp-upgrade-end"
 
     # NOTE: flush the cached content to disk to ensure everything is written
     sync
@@ -272,8 +377,10 @@ do_upgrade() {
         # all FSTAB partitions. As mount was working before, hopefully will
         # work now as well. Later this should be probably modified as we will
         # need to handle more stuff around storage at all.
+        timeline_mark "leapp-post-upgrade-start"
         /usr/bin/systemd-nspawn $NSPAWN_OPTS -D "$NEWROOT" /usr/bin/bash -c "mount -a; /usr/bin/python3 -B $LEAPP3_BIN upgrade --resume $args"
         rv=$?
+        timeline_mark "leapp-post-upgrade-end"
     fi
 
     if [ "$rv" -ne 0 ]; then
@@ -320,6 +427,8 @@ save_journal() {
 
     # If file exists save the journal
     if [ -e $logfile ]; then
+        timeline_mark "save-logs"
+
         # Add a separator
         echo "### LEAPP reboot ###" > $logfile
 
@@ -328,8 +437,12 @@ save_journal() {
 
         # We need to run the actual saving of leapp-upgrade.log in a container and mount everything before, to be
         # sure /var/log is mounted in case it is on a separate partition.
+        # The timeline is stored as well. Only the remount of the root and sync follow the storing of logs,
+        # so the reboot is marked here as the last record stored before the reboot.
+        timeline_mark "reboot"
         local store_cmd="mount -a"
         local store_cmd="$store_cmd; cat /tmp-leapp-upgrade.log >> /var/log/leapp/leapp-upgrade.log"
+        local store_cmd="$store_cmd; cat $LEAPP_TIMELINE_FILE > $LEAPP_TIMELINE_LOG"
 
         /usr/bin/systemd-nspawn $NSPAWN_OPTS -D "$NEWROOT" /usr/bin/bash -c "$store_cmd"
 
@@ -339,6 +452,8 @@ save_journal() {
 
 
 ############################### MAIN #########################################
+timeline_mark "initramfs-start"
+
 # get current mount options of $NEWROOT
 # FIXME: obviously this is still wrong solution, but resolve that later, OK?
 old_opts=""
@@ -357,6 +472,7 @@ fi
 
 # enable read/write $NEWROOT
 mount -o "remount,rw" "$NEWROOT"
+timeline_mark "newroot-mounted-rw"
 
 ##### do the upgrade #######
 (
@@ -0,0 +1,36 @@
+#!/usr/bin/python
+#
+# Create a copy of the leapp.db containing only data of the last execution
+#
+# Used by ibdmp() in do-upgrade.sh to keep the in-band dump small. The script
+# is executed inside the upgrade container with any python interpreter
+# available there, so it has to be compatible with both python 2 and 3.
+# The filtering is the same as for the archived executions of leapp, rows
+# not referenced by data of the last execution (e.g. message_data) are
+# removed as well.
+#
+# usage: ibdmp-filter-db.py path/to/leapp.db path/to/filtered.db
+
+import sqlite3
+import sys
+
+from leapp.cli.commands.upgrade.util import create_context_database
+
+
+def filter_db(src, dst):
+    conn = sqlite3.connect(src)
+    try:
+        row = conn.execute('SELECT context FROM execution ORDER BY id DESC LIMIT 1').fetchone()
+    finally:
+        conn.close()
+    if not row:
+        sys.stderr.write('no execution found in {}\n'.format(src))
+        sys.exit(1)
+    create_context_database(src, row[0], dst)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.stderr.write('usage: {} path/to/leapp.db path/to/filtered.db\n'.format(sys.argv[0]))
+        sys.exit(2)
+    filter_db(sys.argv[1], sys.argv[2])
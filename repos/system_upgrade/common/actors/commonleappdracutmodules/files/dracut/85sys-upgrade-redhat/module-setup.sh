@@ -9,6 +9,7 @@ check() {
     require_binaries xz || return 1
     require_binaries md5sum || return 1
     require_binaries wc || return 1
+    require_binaries tail || return 1
     require_binaries grep || return 1
     # 0 enables by default, 255 only on request
     return 0
@@ -97,6 +98,8 @@ install() {
     inst_binary xz
     inst_binary md5sum
     inst_binary wc
+    inst_binary tail
+    inst_simple "$_moddir/ibdmp-filter-db.py" "/usr/lib/leapp/ibdmp-filter-db.py"
 
     # to be able to check what RHEL X we boot in (target system)
     inst_binary grep
@@ -1,6 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import detectkerneldrivers
-from leapp.models import ActiveKernelModulesFacts, DetectedDeviceOrDriver, DeviceDriverDeprecationData
+from leapp.models import ActiveKernelModulesFacts, DetectedDeviceOrDriver, DeviceDriverDeprecationDataIndex
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
@@ -10,7 +10,7 @@ class DetectKernelDrivers(Actor):
     """
 
     name = 'detect_kernel_drivers'
-    consumes = (DeviceDriverDeprecationData, ActiveKernelModulesFacts)
+    consumes = (DeviceDriverDeprecationDataIndex, ActiveKernelModulesFacts)
     produces = (DetectedDeviceOrDriver,)
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
@@ -1,5 +1,6 @@
+from leapp.libraries.common import devicedriverdeprecation
 from leapp.libraries.stdlib import api
-from leapp.models import ActiveKernelModulesFacts, DetectedDeviceOrDriver, DeviceDriverDeprecationData
+from leapp.models import ActiveKernelModulesFacts, DetectedDeviceOrDriver
 
 
 def process():
@@ -8,14 +9,9 @@ def process():
         for message in api.consume(ActiveKernelModulesFacts)
         for module in message.kernel_modules
     }
-    driver_data = {
-        entry.driver_name: entry
-        for message in api.consume(DeviceDriverDeprecationData)
-        for entry in message.entries
-        if not entry.device_id
-    }
+    index = devicedriverdeprecation.get_index()
+    entries = [index.find_driver(driver) for driver in loaded_drivers]
     api.produce(*[
-        DetectedDeviceOrDriver(**driver_data[driver].dump())
-        for driver in loaded_drivers
-        if driver in driver_data
+        DetectedDeviceOrDriver(**entry.dump())
+        for entry in entries if entry
     ])
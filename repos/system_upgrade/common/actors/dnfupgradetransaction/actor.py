@@ -1,7 +1,7 @@
 import shutil
 
 from leapp.actors import Actor
-from leapp.libraries.common import dnfplugin
+from leapp.libraries.common import dnfplugin, upgradetimeline
 from leapp.libraries.stdlib import run
 from leapp.models import (
     DNFPluginTask,
@@ -52,10 +52,12 @@ class DnfUpgradeTransaction(Actor):
         target_userspace_info = next(self.consume(TargetUserSpaceInfo), None)
         xfs_info = next(self.consume(XFSPresence), XFSPresence())
 
+        upgradetimeline.mark_stage('rpm-transaction-start')
         dnfplugin.perform_transaction_install(
             tasks=tasks, used_repos=used_repos, storage_info=storage_info, target_userspace_info=target_userspace_info,
             plugin_info=plugin_info, xfs_info=xfs_info
         )
+        upgradetimeline.mark_stage('rpm-transaction-end')
         self.produce(TransactionCompleted())
         userspace = next(self.consume(TargetUserSpaceInfo), None)
         if userspace:
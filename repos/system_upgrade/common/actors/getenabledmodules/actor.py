@@ -1,19 +1,25 @@
 from leapp.actors import Actor
-from leapp.libraries.common.module import get_enabled_modules
-from leapp.models import EnabledModules, Module
+from leapp.exceptions import StopActorExecutionError
+from leapp.models import EnabledModules, PkgManagerSnapshot
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
 class GetEnabledModules(Actor):
     """
     Provides data about which module streams are enabled on the source system.
+
+    The data are taken from the PkgManagerSnapshot message.
     """
 
     name = 'get_enabled_modules'
-    consumes = ()
+    consumes = (PkgManagerSnapshot,)
     produces = (EnabledModules,)
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
     def process(self):
-        modules = [Module(name=m.getName(), stream=m.getStream()) for m in get_enabled_modules()]
-        self.produce(EnabledModules(modules=modules))
+        snapshot = next(self.consume(PkgManagerSnapshot), None)
+        if not snapshot:
+            raise StopActorExecutionError('Could not check enabled modules', details={
+                'details': 'No PkgManagerSnapshot facts found.'
+            })
+        self.produce(EnabledModules(modules=snapshot.enabled_modules))
@@ -3,9 +3,13 @@ from leapp.libraries.actor import upgradeinitramfsgenerator
 from leapp.models import RequiredUpgradeInitramPackages  # deprecated
 from leapp.models import UpgradeDracutModule  # deprecated
 from leapp.models import (
+    ActiveKernelModulesFacts,
     BootContent,
     FIPSInfo,
     LiveModeConfig,
+    LuksDumps,
+    PCIDevices,
+    StorageInfo,
     TargetOSInstallationImage,
     TargetUserSpaceInfo,
     TargetUserSpaceUpgradeTasks,
@@ -25,13 +29,28 @@ class UpgradeInitramfsGenerator(Actor):
     what files or dracut modules should be installed in the upgrade initramfs)
 
     See the UpgradeInitramfsTasks model for more details.
+
+    The generated initramfs is cached under /var/lib/leapp and reused by next
+    leapp executions when none of its inputs (target kernel, packages installed
+    in the target userspace, dracut and kernel modules, included files)
+    changed. Set LEAPP_NO_INITRAMFS_CACHE=1 to always generate it from scratch.
+
+    With LEAPP_TRIMMED_INITRAMFS=1, a host specific initramfs is generated
+    instead of the generic one, containing only drivers and dracut modules
+    required by the host (derived from the StorageInfo, PCIDevices,
+    ActiveKernelModulesFacts and LuksDumps facts). The generic initramfs is
+    generated when the trimmed one cannot be created.
     """
 
     name = 'upgrade_initramfs_generator'
     consumes = (
+        ActiveKernelModulesFacts,
         FIPSInfo,
         LiveModeConfig,
+        LuksDumps,
+        PCIDevices,
         RequiredUpgradeInitramPackages,  # deprecated
+        StorageInfo,
         TargetOSInstallationImage,
         TargetUserSpaceInfo,
         TargetUserSpaceUpgradeTasks,
@@ -79,6 +79,22 @@ build() {
             )
     fi
 
+    # Trimmed (host specific) initramfs: let dracut detect drivers of the host
+    # in the hostonly mode, add drivers of the host storage resolved for the target
+    # kernel on top of that and omit dracut modules that are not needed on the host.
+    # The kernel cmdline of the container must not be stored in the initramfs.
+    DRACUT_HOSTONLY_ARGS=(--no-hostonly)
+    if [[ -n "$LEAPP_DRACUT_HOSTONLY" ]]; then
+        DRACUT_HOSTONLY_ARGS=(--hostonly --no-hostonly-cmdline)
+    fi
+    DRACUT_TRIM_ARGS=()
+    if [[ -n "$LEAPP_DRACUT_HOST_DRIVERS" ]]; then
+        DRACUT_TRIM_ARGS+=(--add-drivers "$LEAPP_DRACUT_HOST_DRIVERS")
+    fi
+    if [[ -n "$LEAPP_DRACUT_OMIT_MODULES" ]]; then
+        DRACUT_TRIM_ARGS+=(--omit "$LEAPP_DRACUT_OMIT_MODULES")
+    fi
+
     DRACUT_INSTALL="systemd-nspawn"
     if [[ -n "$LEAPP_DRACUT_INSTALL_FILES" ]]; then
         DRACUT_INSTALL="$DRACUT_INSTALL $LEAPP_DRACUT_INSTALL_FILES"
@@ -102,9 +118,10 @@ build() {
         --install "$DRACUT_INSTALL" \
         $DRACUT_MODULES_ADD \
         $KERNEL_MODULES_ADD \
+        "${DRACUT_TRIM_ARGS[@]}" \
         "$DRACUT_MDADMCONF_ARG" \
         "$DRACUT_LVMCONF_ARG" \
-        --no-hostonly \
+        "${DRACUT_HOSTONLY_ARGS[@]}" \
         --kver "$KERNEL_VERSION" \
         --kernel-image "vmlinuz-upgrade.$KERNEL_ARCH" \
         "initramfs-upgrade.${KERNEL_ARCH}.img"
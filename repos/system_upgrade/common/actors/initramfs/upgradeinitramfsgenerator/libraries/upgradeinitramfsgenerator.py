@@ -1,17 +1,25 @@
+import hashlib
 import itertools
+import json
 import os
 import shutil
+import time
 from collections import namedtuple
 
 from leapp.exceptions import StopActorExecutionError
-from leapp.libraries.common import dnfplugin, mounting
+from leapp.libraries.common import dnfplugin, kernelmodules, mounting
+from leapp.libraries.common.config import get_env
 from leapp.libraries.common.config.version import get_target_major_version
 from leapp.libraries.stdlib import api, CalledProcessError
 from leapp.models import RequiredUpgradeInitramPackages  # deprecated
 from leapp.models import UpgradeDracutModule  # deprecated
 from leapp.models import (
+    ActiveKernelModulesFacts,
     BootContent,
     LiveModeConfig,
+    LuksDumps,
+    PCIDevices,
+    StorageInfo,
     TargetOSInstallationImage,
     TargetUserSpaceInfo,
     TargetUserSpaceUpgradeTasks,
@@ -23,6 +31,13 @@ from leapp.utils.deprecation import suppress_deprecation
 INITRAM_GEN_SCRIPT_NAME = 'generate-initram.sh'
 DRACUT_DIR = '/dracut'
 DEDICATED_LEAPP_PART_URL = 'https://access.redhat.com/solutions/7011704'
+# Removed by the remove_boot_files actor once the upgrade is running
+INITRAMFS_CACHE_DIR = '/var/lib/leapp/upgrade-initramfs-cache'
+INITRAMFS_CACHE_KEY_FILE = 'cache-key'
+INITRAMFS_STATS_FILE = '/var/lib/leapp/upgrade-initramfs-stats.json'
+
+# Kernel drivers required by the upgrade environment itself, regardless of the host hardware
+UPGRADE_ENV_DRIVERS = ('overlay', 'loop', 'ext4', 'xfs', 'squashfs', 'dm_mod')
 
 
 def _get_target_kernel_version(context):
@@ -341,42 +356,495 @@ def collect_initramfs_includes():
                              kernel_modules=list(kernel_modules))
 
 
-def generate_initram_disk(context):
+HostInitramfsRequirements = namedtuple(
+    'HostInitramfsRequirements',
+    ('drivers', 'omit_dracut_modules', 'verified_drivers', 'verified_dracut_modules')
+)
+
+# Kernel modules (of the target kernel) providing the filesystem types, fs types not listed here are ignored
+FS_TYPE_MODULES = {
+    'btrfs': ('btrfs',),
+    'cifs': ('cifs',),
+    'ext2': ('ext4',),
+    'ext3': ('ext4',),
+    'ext4': ('ext4',),
+    'fuse': ('fuse',),
+    'gfs2': ('gfs2',),
+    'iso9660': ('isofs',),
+    'nfs': ('nfs', 'nfsv3', 'nfsv4'),
+    'nfs4': ('nfsv4',),
+    'overlay': ('overlay',),
+    'smb3': ('cifs',),
+    'squashfs': ('squashfs',),
+    'udf': ('udf',),
+    'vfat': ('vfat',),
+    'xfs': ('xfs',),
+}
+
+# PCI device classes (the class and subclass parts of the modalias) of storage controllers
+STORAGE_PCI_CLASSES = ('bc01', 'bc0Csc04')  # mass storage controllers, fibre channel
+NETWORK_PCI_CLASSES = ('bc02',)
+
+# Virtio devices are driven by virtio_pci, the storage drivers are bound on the virtio bus
+VIRTIO_STORAGE_DRIVERS = {
+    'v00001AF4d00001001': 'virtio_blk',
+    'v00001AF4d00001042': 'virtio_blk',
+    'v00001AF4d00001004': 'virtio_scsi',
+    'v00001AF4d00001048': 'virtio_scsi',
+}
+
+# Dracut modules checked in the trimmed initramfs when used on the host
+VERIFIED_DRACUT_MODULES = ('crypt', 'lvm', 'mdraid', 'multipath')
+
+
+def _get_fs_type_modules(fs_type):
+    if fs_type.startswith('fuse.'):
+        fs_type = 'fuse'
+    return FS_TYPE_MODULES.get(fs_type, ())
+
+
+def _get_root_fs_type(storage_info):
+    for entry in storage_info.fstab:
+        if entry.fs_file == '/':
+            return entry.fs_vfstype
+    for entry in storage_info.mount:
+        if entry.mount == '/':
+            return entry.tp
+    return None
+
+
+def _get_pci_storage_drivers(pci_devices, aliases, network_storage):
+    """
+    Return drivers of storage controllers of the host as provided by the target kernel
+    """
+    pci_classes = STORAGE_PCI_CLASSES + (NETWORK_PCI_CLASSES if network_storage else ())
+    drivers = set()
+    for device in pci_devices.devices if pci_devices else []:
+        if not device.modalias:
+            continue
+        device_class = 'bc' + device.modalias.rpartition('bc')[2]
+        if device_class.startswith(pci_classes):
+            drivers.update(aliases.modules(device.modalias))
+        for device_id, driver in VIRTIO_STORAGE_DRIVERS.items():
+            if device_id in device.modalias:
+                drivers.update(aliases.modules(device.modalias))
+                drivers.add(driver)
+    return {kernelmodules.normalize_module_name(driver) for driver in drivers}
+
+
+def get_host_initramfs_requirements(context, kernel_version, required_dracut_modules):
     """
-    Function to actually execute the init ramdisk creation.
+    Derive kernel drivers and dracut modules needed by this host from the collected facts.
 
-    Includes handling of specified dracut and kernel modules from the host when
-    needed. The check for the 'conflicting' modules is in a separate actor.
+    The initramfs is generated in the dracut hostonly mode. Drivers added on top
+    of the detected ones are drivers of the host storage controllers, modules of
+    used filesystems and drivers required by the upgrade environment. All of them
+    are resolved for the target kernel: PCI devices are matched against modules.alias
+    of the target kernel and drivers that the target kernel does not provide as
+    loadable modules are dropped. Dracut modules for storage technologies that are
+    not used on the host (LUKS, multipath, iSCSI, ...) are omitted, unless they are
+    explicitly requested to be included in the upgrade initramfs.
+
+    The drivers and dracut modules needed to mount the root filesystem are
+    returned separately, so the generated initramfs can be verified.
+
+    :param context: The context of the target userspace
+    :type context: mounting.IsolatedActions class
+    :param kernel_version: The version of the target kernel
+    :type kernel_version: str
+    :param required_dracut_modules: Dracut modules requested to be included in the initramfs
+    :type required_dracut_modules: list of DracutModule
+    :rtype: HostInitramfsRequirements
+    """
+    storage_info = next(api.consume(StorageInfo), None) or StorageInfo()
+    kernel_modules_facts = next(api.consume(ActiveKernelModulesFacts), None)
+    pci_devices = next(api.consume(PCIDevices), None)
+    luks_dumps = next(api.consume(LuksDumps), None)
+
+    modules_dir = context.full_path(os.path.join('/lib/modules', kernel_version))
+    target_modules = kernelmodules.get_kernel_modules(modules_dir)
+
+    # modules loaded by the source kernel are used only to detect the used storage technologies
+    active_modules = set()
+    if kernel_modules_facts:
+        active_modules = {mod.filename for mod in kernel_modules_facts.kernel_modules}
+
+    fs_types = {entry.fs_vfstype for entry in storage_info.fstab} | {entry.tp for entry in storage_info.mount}
+    blk_types = {entry.tp for entry in storage_info.lsblk}
+
+    used_dracut_modules = {
+        'crypt': bool(luks_dumps and luks_dumps.dumps) or 'crypt' in blk_types,
+        'lvm': bool(storage_info.pvs) or 'lvm' in blk_types,
+        'mdraid': any(tp.startswith('raid') for tp in blk_types),
+        'multipath': 'mpath' in blk_types,
+        'iscsi': bool(active_modules & {'iscsi_tcp', 'libiscsi', 'ib_iser'}),
+        'fcoe': bool(active_modules & {'fcoe', 'libfcoe'}),
+        'nvmf': bool(active_modules & {'nvme_fabrics', 'nvme_tcp', 'nvme_rdma', 'nvme_fc'}),
+        'nfs': any(fs_type.startswith('nfs') for fs_type in fs_types),
+        'cifs': bool(fs_types & {'cifs', 'smb3'}),
+    }
+    required = {mod.name for mod in required_dracut_modules}
+    omit = {name for name, used in used_dracut_modules.items() if not used and name not in required}
+
+    network_storage = any(used_dracut_modules[name] for name in ('iscsi', 'fcoe', 'nvmf', 'nfs', 'cifs'))
+    storage_drivers = _get_pci_storage_drivers(
+        pci_devices, kernelmodules.PCIModuleAliases(modules_dir), network_storage
+    )
+    fs_drivers = set(itertools.chain.from_iterable(_get_fs_type_modules(fs_type) for fs_type in fs_types))
+    root_fs_drivers = set(_get_fs_type_modules(_get_root_fs_type(storage_info) or ''))
+    crypt_drivers = {'dm_crypt'} if used_dracut_modules['crypt'] else set()
+
+    drivers = set(UPGRADE_ENV_DRIVERS) | storage_drivers | fs_drivers | crypt_drivers
+    verified_drivers = root_fs_drivers | storage_drivers | crypt_drivers
+    unavailable = drivers - target_modules.loadable - target_modules.builtin
+    if unavailable:
+        api.current_logger().debug(
+            'Drivers not provided by the target kernel: {}'.format(', '.join(sorted(unavailable)))
+        )
+
+    return HostInitramfsRequirements(
+        drivers=sorted(drivers & target_modules.loadable),
+        omit_dracut_modules=sorted(omit),
+        verified_drivers=sorted(verified_drivers & target_modules.loadable),
+        verified_dracut_modules=sorted(name for name in VERIFIED_DRACUT_MODULES if used_dracut_modules[name]),
+    )
+
+
+def _get_missing_in_initramfs(context, host_requirements):
+    """
+    Return drivers and dracut modules required by the host that are missing in the generated initramfs
+
+    :returns: Names of missing drivers and dracut modules or None if the initramfs cannot be inspected
+    :rtype: list of str or None
+    """
+    initram = os.path.join('/artifacts', get_boot_artifact_names()[1])
+    try:
+        lines = context.call(['lsinitrd', initram], split=True)['stdout']
+    except CalledProcessError as err:
+        api.current_logger().warning('Cannot inspect the generated upgrade initramfs: {}'.format(err))
+        return None
+
+    dracut_modules = set()
+    drivers = set()
+    in_dracut_modules = False
+    for line in lines:
+        if line.startswith('dracut modules:'):
+            in_dracut_modules = True
+        elif in_dracut_modules and line.startswith('===='):
+            in_dracut_modules = False
+        elif in_dracut_modules:
+            dracut_modules.add(line.strip())
+        elif line.strip():
+            driver = kernelmodules.get_module_name(line.split()[-1])
+            if driver:
+                drivers.add(driver)
+
+    missing = [driver for driver in host_requirements.verified_drivers if driver not in drivers]
+    missing.extend(mod for mod in host_requirements.verified_dracut_modules if mod not in dracut_modules)
+    return missing
+
+
+def _hash_path(hasher, path):
+    """
+    Update the hasher with the content of the given file or directory tree.
+
+    Names of files are hashed together with their content so renaming
+    of a file changes the result as well. Nonexistent paths are hashed just
+    by their name.
+    """
+    hasher.update(path.encode('utf-8'))
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            _hash_path(hasher, os.path.join(root, name))
+
+
+def _get_initramfs_cache_key(context, initramfs_includes, kernel_version, host_requirements=None):
+    """
+    Compute the key identifying the upgrade initramfs that would be generated.
+
+    The key is a hash of everything that influences the content of the
+    upgrade initramfs: the target kernel version and architecture, the list
+    of packages installed inside the target userspace (kernel, dracut,
+    systemd, ...), the generator script with its dracut configuration,
+    sources of the dracut and kernel modules, the files requested
+    to be installed into the initramfs, the files copied into the target
+    userspace (e.g. storage configuration picked up by dracut) and the host
+    requirements in case the trimmed initramfs is generated.
+
+    :returns: The cache key or None if the cache should not be used
+    :rtype: str or None
+    """
+    if get_env('LEAPP_NO_INITRAMFS_CACHE', '0') == '1':
+        api.current_logger().debug('The upgrade initramfs cache is disabled by LEAPP_NO_INITRAMFS_CACHE.')
+        return None
+
+    try:
+        rpms = context.call(['rpm', '-qa', '--queryformat', r'%{NEVRA}\n'], split=True)['stdout']
+    except CalledProcessError:
+        api.current_logger().warning(
+            'Cannot list packages installed in the target userspace. Skipping the upgrade initramfs cache.'
+        )
+        return None
+
+    hasher = hashlib.sha256()
+    hasher.update(kernel_version.encode('utf-8'))
+    hasher.update(api.current_actor().configuration.architecture.encode('utf-8'))
+    for rpm in sorted(rpms):
+        hasher.update(rpm.encode('utf-8'))
+
+    generator_script = api.get_actor_file_path(INITRAM_GEN_SCRIPT_NAME)
+    if generator_script:
+        _hash_path(hasher, generator_script)
+
+    for kind, modules in (('dracut', initramfs_includes.dracut_modules),
+                          ('kernel', initramfs_includes.kernel_modules)):
+        for module in sorted(modules, key=lambda mod: mod.name):
+            hasher.update('{}:{}'.format(kind, module.name).encode('utf-8'))
+            if module.module_path:
+                _hash_path(hasher, module.module_path)
+
+    for include_file in sorted(initramfs_includes.files):
+        hasher.update(include_file.encode('utf-8'))
+        _hash_path(hasher, context.full_path(include_file))
+
+    copied_files = {
+        copy_file.dst or copy_file.src
+        for msg in api.consume(TargetUserSpaceUpgradeTasks) for copy_file in msg.copy_files
+    }
+    for copied_file in sorted(copied_files):
+        _hash_path(hasher, context.full_path(copied_file))
+
+    if host_requirements:
+        hasher.update('trimmed:{}'.format(
+            ':'.join(','.join(value) for value in host_requirements)).encode('utf-8'))
+
+    return hasher.hexdigest()
+
+
+def _get_upgrade_artifact_names():
+    kernel, initram = get_boot_artifact_names()
+    return (kernel, '.{0}.hmac'.format(kernel), initram)
+
+
+def _restore_initramfs_from_cache(context, cache_key):
+    """
+    Copy the cached upgrade boot artifacts into /artifacts inside the context
+
+    :returns: True if artifacts matching the cache_key have been restored
+    :rtype: bool
+    """
+    key_path = os.path.join(INITRAMFS_CACHE_DIR, INITRAMFS_CACHE_KEY_FILE)
+    try:
+        with open(key_path) as f:
+            cached_key = f.read().strip()
+    except EnvironmentError:
+        api.current_logger().debug('No cached upgrade initramfs found.')
+        return False
+
+    artifacts = _get_upgrade_artifact_names()
+    if cached_key != cache_key or not all(os.path.isfile(os.path.join(INITRAMFS_CACHE_DIR, artifact))
+                                          for artifact in artifacts):
+        api.current_logger().debug('The cached upgrade initramfs is outdated.')
+        return False
+
+    api.current_logger().info('Reusing the cached upgrade initramfs from {}.'.format(INITRAMFS_CACHE_DIR))
+    try:
+        context.remove_tree('/artifacts')
+    except EnvironmentError:
+        pass
+    context.makedirs('/artifacts')
+    for artifact in artifacts:
+        context.copy_to(os.path.join(INITRAMFS_CACHE_DIR, artifact), os.path.join('/artifacts', artifact))
+    return True
+
+
+def _store_initramfs_in_cache(context, cache_key):
+    """
+    Store the generated upgrade boot artifacts to be reused by next leapp runs
+
+    Only the last generated initramfs is kept. The key file is written as
+    the last one, so an incomplete cache entry is never considered valid.
+    Failures are not fatal, the cache is just dropped.
+    """
+    shutil.rmtree(INITRAMFS_CACHE_DIR, ignore_errors=True)
+    try:
+        os.makedirs(INITRAMFS_CACHE_DIR)
+        for artifact in _get_upgrade_artifact_names():
+            shutil.copy2(context.full_path(os.path.join('/artifacts', artifact)),
+                         os.path.join(INITRAMFS_CACHE_DIR, artifact))
+        with open(os.path.join(INITRAMFS_CACHE_DIR, INITRAMFS_CACHE_KEY_FILE), 'w') as f:
+            f.write(cache_key)
+    except EnvironmentError as err:
+        api.current_logger().warning('Cannot store the upgrade initramfs in the cache: {}'.format(err))
+        shutil.rmtree(INITRAMFS_CACHE_DIR, ignore_errors=True)
+
+
+def _report_initramfs_stats(context, mode, duration):
+    """
+    Log the size and build time of the generated initramfs and compare it with the other mode
+
+    The stats of the last build in each mode ('generic', 'trimmed') are kept
+    in INITRAMFS_STATS_FILE, so the comparison is available once the initramfs
+    has been generated in both modes.
+    """
+    initram = get_boot_artifact_names()[1]
+    try:
+        size = os.path.getsize(context.full_path(os.path.join('/artifacts', initram)))
+    except OSError:
+        api.current_logger().debug('Cannot get the size of the generated upgrade initramfs.')
+        return
+
+    stats = {}
+    try:
+        with open(INITRAMFS_STATS_FILE) as f:
+            stats = json.load(f)
+    except (EnvironmentError, ValueError):
+        pass
+
+    stats[mode] = {'size': size, 'duration': round(duration, 2)}
+    api.current_logger().info(
+        'Generated the {} upgrade initramfs in {:.2f}s, size: {} MiB.'.format(mode, duration, size // 2**20)
+    )
+    other_mode = 'generic' if mode == 'trimmed' else 'trimmed'
+    if other_mode in stats:
+        other = stats[other_mode]
+        api.current_logger().info(
+            'The last {} upgrade initramfs has been generated in {:.2f}s, size: {} MiB.'
+            .format(other_mode, other['duration'], other['size'] // 2**20)
+        )
+
+    try:
+        with open(INITRAMFS_STATS_FILE, 'w') as f:
+            json.dump(stats, f)
+    except EnvironmentError as err:
+        api.current_logger().debug('Cannot store the upgrade initramfs stats: {}'.format(err))
+
+
+def _run_initram_generator(context, initramfs_includes, kernel_version, host_requirements=None):
+    """
+    Execute the generator script inside the context
+
+    :param host_requirements: Generate the trimmed initramfs with only the drivers
+                              and dracut modules needed by the host when set
+    :type host_requirements: HostInitramfsRequirements or None
     """
-    _check_free_space(context)
     env = {}
     if get_target_major_version() == '9':
         env = {'SYSTEMD_SECCOMP': '0'}
 
-    # TODO(pstodulk): Add possibility to add particular drivers
-    # Issue #645
-    initramfs_includes = collect_initramfs_includes()
-
-    copy_dracut_modules(context, initramfs_includes.dracut_modules)
-    copy_kernel_modules(context, initramfs_includes.kernel_modules)
-
     def fmt_module_list(module_list):
         return ','.join(mod.name for mod in module_list)
 
+    trimmed_vars = ''
+    if host_requirements:
+        trimmed_vars = (
+            'LEAPP_DRACUT_HOSTONLY=1 LEAPP_DRACUT_HOST_DRIVERS="{drivers}" LEAPP_DRACUT_OMIT_MODULES="{omit}" '
+        ).format(
+            drivers=' '.join(host_requirements.drivers),
+            omit=' '.join(host_requirements.omit_dracut_modules))
+
+    start = time.time()
     # FIXME: issue #376
     context.call([
         '/bin/sh', '-c',
         'LEAPP_KERNEL_VERSION={kernel_version} '
         'LEAPP_ADD_DRACUT_MODULES="{dracut_modules}" LEAPP_KERNEL_ARCH={arch} '
-        'LEAPP_ADD_KERNEL_MODULES="{kernel_modules}" '
+        'LEAPP_ADD_KERNEL_MODULES="{kernel_modules}" {trimmed_vars}'
         'LEAPP_DRACUT_INSTALL_FILES="{files}" {cmd}'.format(
-            kernel_version=_get_target_kernel_version(context),
+            kernel_version=kernel_version,
             dracut_modules=fmt_module_list(initramfs_includes.dracut_modules),
             kernel_modules=fmt_module_list(initramfs_includes.kernel_modules),
+            trimmed_vars=trimmed_vars,
             arch=api.current_actor().configuration.architecture,
             files=' '.join(initramfs_includes.files),
             cmd=os.path.join('/', INITRAM_GEN_SCRIPT_NAME))
     ], env=env)
+    _report_initramfs_stats(context, 'trimmed' if host_requirements else 'generic', time.time() - start)
+
+
+def _generate_trimmed_initramfs(context, initramfs_includes, kernel_version, host_requirements):
+    """
+    Generate the trimmed initramfs and verify it contains everything needed to boot the host
+
+    :returns: True if the trimmed initramfs has been generated and verified
+    :rtype: bool
+    """
+    try:
+        _run_initram_generator(context, initramfs_includes, kernel_version, host_requirements)
+    except CalledProcessError as err:
+        api.current_logger().warning(
+            'Failed to generate the trimmed upgrade initramfs, falling back to the generic one: {}'.format(err)
+        )
+        return False
+
+    missing = _get_missing_in_initramfs(context, host_requirements)
+    if missing is None:
+        api.current_logger().warning(
+            'Cannot verify the trimmed upgrade initramfs, falling back to the generic one.'
+        )
+        return False
+    if missing:
+        api.current_logger().warning(
+            'The trimmed upgrade initramfs is missing drivers or dracut modules required by the host ({}),'
+            ' falling back to the generic one.'.format(', '.join(missing))
+        )
+        return False
+    return True
+
+
+def generate_initram_disk(context):
+    """
+    Function to actually execute the init ramdisk creation.
+
+    Includes handling of specified dracut and kernel modules from the host when
+    needed. The check for the 'conflicting' modules is in a separate actor.
+
+    When LEAPP_TRIMMED_INITRAMFS=1 is set, the initramfs contains only
+    drivers and dracut modules required by the host. If the generation of the
+    trimmed initramfs fails or the generated image misses drivers or dracut
+    modules needed to mount the root filesystem, the generic one is generated
+    instead.
+
+    The generated initramfs is cached in INITRAMFS_CACHE_DIR and reused by
+    following leapp executions when nothing that affects its content changed.
+    """
+    _check_free_space(context)
+
+    # TODO(pstodulk): Add possibility to add particular drivers
+    # Issue #645
+    initramfs_includes = collect_initramfs_includes()
+    kernel_version = _get_target_kernel_version(context)
+
+    host_requirements = None
+    if get_env('LEAPP_TRIMMED_INITRAMFS', '0') == '1':
+        host_requirements = get_host_initramfs_requirements(
+            context, kernel_version, initramfs_includes.dracut_modules
+        )
+
+    cache_key = _get_initramfs_cache_key(context, initramfs_includes, kernel_version, host_requirements)
+    if cache_key and _restore_initramfs_from_cache(context, cache_key):
+        return copy_boot_files(context)
+
+    copy_dracut_modules(context, initramfs_includes.dracut_modules)
+    copy_kernel_modules(context, initramfs_includes.kernel_modules)
+
+    if host_requirements:
+        if not _generate_trimmed_initramfs(context, initramfs_includes, kernel_version, host_requirements):
+            host_requirements = None
+            if cache_key:
+                cache_key = _get_initramfs_cache_key(context, initramfs_includes, kernel_version)
+
+    if not host_requirements:
+        _run_initram_generator(context, initramfs_includes, kernel_version)
+
+    if cache_key:
+        _store_initramfs_in_cache(context, cache_key)
 
     boot_files_info = copy_boot_files(context)
     return boot_files_info
@@ -7,10 +7,20 @@ from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.actor import upgradeinitramfsgenerator
 from leapp.libraries.common.config import architecture
 from leapp.libraries.common.testutils import CurrentActorMocked, logger_mocked, produce_mocked
+from leapp.libraries.stdlib import CalledProcessError
 from leapp.utils.deprecation import suppress_deprecation
 
 from leapp.models import (  # isort:skip
+    ActiveKernelModule,
+    ActiveKernelModulesFacts,
     FIPSInfo,
+    FstabEntry,
+    LsblkEntry,
+    LuksDump,
+    LuksDumps,
+    PCIDevice,
+    PCIDevices,
+    StorageInfo,
     RequiredUpgradeInitramPackages,  # deprecated
     UpgradeDracutModule,  # deprecated
     BootContent,
@@ -286,6 +296,7 @@ def test_generate_initram_disk(monkeypatch, input_msgs, dracut_modules, kernel_m
     monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_kernel_modules', MockedCopyArgs())
     monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_boot_files', lambda dummy: None)
     monkeypatch.setattr(upgradeinitramfsgenerator, '_get_fspace', MockedGetFspace(2*2**30))
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_initramfs_cache_key', lambda *dummy: None)
     upgradeinitramfsgenerator.generate_initram_disk(context)
 
     # TODO(pstodulk): add tests for the check of the free space (sep. from this func)
@@ -313,6 +324,314 @@ def test_generate_initram_disk(monkeypatch, input_msgs, dracut_modules, kernel_m
     # similar to the files...
 
 
+class MockedRpmContext(MockedContext):
+    def __init__(self, rpms):
+        super(MockedRpmContext, self).__init__()
+        self.rpms = rpms
+
+    def call(self, *args, **kwargs):
+        self.called_call.append((args, kwargs))
+        return {'stdout': self.rpms}
+
+
+def test_initramfs_cache_key(monkeypatch, adjust_cwd):
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked())
+    includes = upgradeinitramfsgenerator.InitramfsIncludes(
+        files=['/etc/foo'],
+        dracut_modules=[DracutModule(name='moduleA')],
+        kernel_modules=[]
+    )
+    rpms = ['kernel-core-5.14.0-1.el9.x86_64', 'dracut-057-1.el9.x86_64']
+
+    key = upgradeinitramfsgenerator._get_initramfs_cache_key(MockedRpmContext(rpms), includes, '5.14.0-1')
+    assert key
+    # order of the rpms list does not matter
+    assert key == upgradeinitramfsgenerator._get_initramfs_cache_key(
+        MockedRpmContext(list(reversed(rpms))), includes, '5.14.0-1')
+
+    # any change of the inputs changes the key
+    changed_rpms = ['kernel-core-5.14.0-1.el9.x86_64', 'dracut-057-2.el9.x86_64']
+    assert key != upgradeinitramfsgenerator._get_initramfs_cache_key(
+        MockedRpmContext(changed_rpms), includes, '5.14.0-1')
+    assert key != upgradeinitramfsgenerator._get_initramfs_cache_key(MockedRpmContext(rpms), includes, '5.14.0-2')
+    assert key != upgradeinitramfsgenerator._get_initramfs_cache_key(
+        MockedRpmContext(rpms), includes._replace(files=[]), '5.14.0-1')
+    assert key != upgradeinitramfsgenerator._get_initramfs_cache_key(
+        MockedRpmContext(rpms), includes._replace(dracut_modules=[]), '5.14.0-1')
+
+
+def test_initramfs_cache_key_copied_files(monkeypatch, tmpdir):
+    copy_files = [CopyFile(src='/etc/dasd.conf'), CopyFile(src='/host/multipath', dst='/etc/multipath')]
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked(
+        msgs=[TargetUserSpaceUpgradeTasks(copy_files=copy_files)]))
+    includes = upgradeinitramfsgenerator.InitramfsIncludes(files=[], dracut_modules=[], kernel_modules=[])
+    context = MockedRpmContext(['kernel-core-5.14.0-1.el9.x86_64'])
+    context.base_dir = tmpdir.strpath
+    tmpdir.join('etc', 'dasd.conf').write('0.0.0100', ensure=True)
+    tmpdir.join('etc', 'multipath', 'conf.d', 'custom.conf').write('defaults {}', ensure=True)
+
+    key = upgradeinitramfsgenerator._get_initramfs_cache_key(context, includes, '5.14.0-1')
+
+    # the storage configuration copied into the userspace is baked into the initramfs
+    tmpdir.join('etc', 'dasd.conf').write('0.0.0200')
+    dasd_key = upgradeinitramfsgenerator._get_initramfs_cache_key(context, includes, '5.14.0-1')
+    assert dasd_key != key
+    tmpdir.join('etc', 'multipath', 'conf.d', 'custom.conf').write('defaults { find_multipaths yes }')
+    assert upgradeinitramfsgenerator._get_initramfs_cache_key(context, includes, '5.14.0-1') != dasd_key
+
+
+def test_initramfs_cache_key_disabled(monkeypatch):
+    curr_actor = CurrentActorMocked(envars={'LEAPP_NO_INITRAMFS_CACHE': '1'})
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', curr_actor)
+    includes = upgradeinitramfsgenerator.InitramfsIncludes(files=[], dracut_modules=[], kernel_modules=[])
+    context = MockedRpmContext(['kernel-core-5.14.0-1.el9.x86_64'])
+
+    assert upgradeinitramfsgenerator._get_initramfs_cache_key(context, includes, '5.14.0-1') is None
+    assert not context.called_call
+
+
+def test_initramfs_cache_store_and_restore(monkeypatch, tmpdir):
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked())
+    cache_dir = tmpdir.join('cache')
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'INITRAMFS_CACHE_DIR', str(cache_dir))
+
+    context = MockedContext()
+    context.base_dir = str(tmpdir.join('userspace'))
+    artifacts = upgradeinitramfsgenerator._get_upgrade_artifact_names()
+    for artifact in artifacts:
+        tmpdir.join('userspace', 'artifacts', artifact).write(artifact, ensure=True)
+
+    assert not upgradeinitramfsgenerator._restore_initramfs_from_cache(context, 'key1')
+
+    upgradeinitramfsgenerator._store_initramfs_in_cache(context, 'key1')
+    assert cache_dir.join(upgradeinitramfsgenerator.INITRAMFS_CACHE_KEY_FILE).read() == 'key1'
+    for artifact in artifacts:
+        assert cache_dir.join(artifact).read() == artifact
+
+    assert not upgradeinitramfsgenerator._restore_initramfs_from_cache(context, 'key2')
+    assert not context.called_copy_to
+
+    assert upgradeinitramfsgenerator._restore_initramfs_from_cache(context, 'key1')
+    expected_copies = [(str(cache_dir.join(artifact)), os.path.join('/artifacts', artifact)) for artifact in artifacts]
+    assert sorted(context.called_copy_to) == sorted(expected_copies)
+
+    # incomplete cache is never used
+    cache_dir.join(artifacts[-1]).remove()
+    assert not upgradeinitramfsgenerator._restore_initramfs_from_cache(context, 'key1')
+
+
+@pytest.mark.parametrize('cache_hit', [True, False])
+def test_generate_initram_disk_cache(monkeypatch, cache_hit):
+    context = MockedContext()
+    curr_actor = CurrentActorMocked(msgs=[gen_UIT(MODULES, [], [])], arch=architecture.ARCH_X86_64)
+    stored = []
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', curr_actor)
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_dracut_modules', MockedCopyArgs())
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_target_kernel_version', lambda _: '')
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_kernel_modules', MockedCopyArgs())
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_boot_files', lambda dummy: None)
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_fspace', MockedGetFspace(2*2**30))
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_initramfs_cache_key', lambda *dummy: 'key')
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_restore_initramfs_from_cache', lambda *dummy: cache_hit)
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_store_initramfs_in_cache',
+                        lambda _context, key: stored.append(key))
+
+    upgradeinitramfsgenerator.generate_initram_disk(context)
+
+    if cache_hit:
+        assert not context.called_call
+        assert upgradeinitramfsgenerator.copy_dracut_modules.args is None
+        assert not stored
+    else:
+        assert len(context.called_call) == 1
+        assert upgradeinitramfsgenerator.copy_dracut_modules.args is not None
+        assert stored == ['key']
+
+
+def _gen_lsblk_entry(name, tp):
+    return LsblkEntry(name=name, kname=name, maj_min='253:0', rm='0', size='10G', bsize=10*2**30, ro='0',
+                      tp=tp, mountpoint='', parent_name='', parent_path='')
+
+
+TARGET_KERNEL = '5.14.0-1'
+TARGET_MODULES = ['ahci', 'bochs', 'dm-mod', 'ext4', 'loop', 'nfs', 'nfsv3', 'nfsv4', 'overlay', 'squashfs',
+                  'virtio_blk', 'virtio_pci', 'xfs']
+TARGET_PCI_ALIASES = [
+    ('pci:v*d*sv*sd*bc01sc06i01*', 'ahci'),
+    ('pci:v00001234d00001111sv*sd*bc03sc00i00*', 'bochs'),
+    ('pci:v00001AF4d*sv*sd*bc*sc*i*', 'virtio_pci'),
+]
+
+
+def _gen_target_modules_context(tmpdir):
+    modules_dir = tmpdir.mkdir('lib').mkdir('modules').mkdir(TARGET_KERNEL)
+    modules_dir.join('modules.dep').write(''.join(
+        'kernel/{}.ko.xz:\n'.format(module) for module in TARGET_MODULES
+    ))
+    modules_dir.join('modules.alias').write(''.join(
+        'alias {} {}\n'.format(alias, module) for alias, module in TARGET_PCI_ALIASES
+    ))
+    context = MockedContext()
+    context.base_dir = tmpdir.strpath
+    return context
+
+
+def _gen_pci_device(slot, dev_cls, modalias, driver=''):
+    return PCIDevice(slot=slot, dev_cls=dev_cls, vendor='', name='', driver=driver, modules=[driver] if driver else [],
+                     pci_id='', modalias=modalias)
+
+
+def test_get_host_initramfs_requirements(monkeypatch, tmpdir):
+    msgs = [
+        StorageInfo(
+            fstab=[FstabEntry(fs_spec='/dev/mapper/rhel-root', fs_file='/', fs_vfstype='xfs', fs_mntops='defaults',
+                              fs_freq='0', fs_passno='0'),
+                   FstabEntry(fs_spec='srv:/export', fs_file='/mnt', fs_vfstype='nfs4', fs_mntops='defaults',
+                              fs_freq='0', fs_passno='0'),
+                   FstabEntry(fs_spec='/dev/shm', fs_file='/dev/shm', fs_vfstype='tmpfs', fs_mntops='defaults',
+                              fs_freq='0', fs_passno='0')],
+            lsblk=[_gen_lsblk_entry('sda', 'disk'), _gen_lsblk_entry('rhel-root', 'lvm')],
+        ),
+        ActiveKernelModulesFacts(kernel_modules=[
+            ActiveKernelModule(filename='ahci', parameters=[], signature=None),
+            ActiveKernelModule(filename='iscsi_tcp', parameters=[], signature=None),
+        ]),
+        PCIDevices(devices=[
+            _gen_pci_device('00:1f.2', 'SATA controller', 'pci:v00008086d00002922sv00001AF4sd00001100bc01sc06i01',
+                            driver='ahci'),
+            _gen_pci_device('00:04.0', 'SCSI storage controller',
+                            'pci:v00001AF4d00001001sv00001AF4sd00000002bc01sc00i00', driver='virtio-pci'),
+            _gen_pci_device('00:03.0', 'Ethernet controller',
+                            'pci:v00001AF4d00001000sv00001AF4sd00000001bc02sc00i00', driver='virtio-pci'),
+            _gen_pci_device('00:02.0', 'VGA compatible controller',
+                            'pci:v00001234d00001111sv00001AF4sd00001100bc03sc00i00', driver='bochs-drm'),
+            _gen_pci_device('00:1c.0', 'PCI bridge', None, driver='pcieport'),
+        ]),
+        LuksDumps(dumps=[]),
+    ]
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked(msgs=msgs))
+    context = _gen_target_modules_context(tmpdir)
+
+    reqs = upgradeinitramfsgenerator.get_host_initramfs_requirements(
+        context, TARGET_KERNEL, [DracutModule(name='multipath')]
+    )
+
+    # only modules of the target kernel, no fs type names or names of the source drivers
+    assert reqs.drivers == ['ahci', 'dm_mod', 'ext4', 'loop', 'nfsv4', 'overlay', 'squashfs', 'virtio_blk',
+                            'virtio_pci', 'xfs']
+    assert reqs.verified_drivers == ['ahci', 'virtio_blk', 'virtio_pci', 'xfs']
+    assert reqs.verified_dracut_modules == ['lvm']
+    # used on the host
+    for module in ('lvm', 'iscsi', 'nfs'):
+        assert module not in reqs.omit_dracut_modules
+    # multipath is explicitly required
+    assert 'multipath' not in reqs.omit_dracut_modules
+    for module in ('crypt', 'mdraid', 'fcoe', 'nvmf', 'cifs'):
+        assert module in reqs.omit_dracut_modules
+
+
+def test_get_host_initramfs_requirements_no_facts(monkeypatch, tmpdir):
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked())
+    context = _gen_target_modules_context(tmpdir)
+
+    reqs = upgradeinitramfsgenerator.get_host_initramfs_requirements(context, TARGET_KERNEL, [])
+
+    assert reqs.drivers == sorted(upgradeinitramfsgenerator.UPGRADE_ENV_DRIVERS)
+    assert not reqs.verified_drivers
+    assert 'crypt' in reqs.omit_dracut_modules
+
+
+LSINITRD_OUTPUT = """Image: /artifacts/initramfs-upgrade.x86_64.img: 38M
+========================================================================
+Version: dracut-057-21.git20230214.el9
+
+dracut modules:
+systemd
+lvm
+crypt
+========================================================================
+drwxr-xr-x  12 root     root            0 Jan  1 00:00 .
+-rw-r--r--   1 root     root        27312 Jan  1 00:00 usr/lib/modules/5.14.0-1/kernel/drivers/ata/ahci.ko.xz
+-rw-r--r--   1 root     root       512964 Jan  1 00:00 usr/lib/modules/5.14.0-1/kernel/fs/xfs/xfs.ko.xz
+-rw-r--r--   1 root     root        20496 Jan  1 00:00 usr/lib/modules/5.14.0-1/kernel/drivers/md/dm-crypt.ko.xz
+========================================================================
+""".splitlines()
+
+
+@pytest.mark.parametrize('verified_drivers,verified_dracut_modules,missing', [
+    (['ahci', 'dm_crypt', 'xfs'], ['crypt', 'lvm'], []),
+    (['ahci', 'virtio_blk', 'xfs'], ['lvm', 'mdraid'], ['virtio_blk', 'mdraid']),
+])
+def test_get_missing_in_initramfs(monkeypatch, verified_drivers, verified_dracut_modules, missing):
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked(arch='x86_64'))
+    context = MockedRpmContext(LSINITRD_OUTPUT)
+    reqs = upgradeinitramfsgenerator.HostInitramfsRequirements(
+        drivers=[], omit_dracut_modules=[], verified_drivers=verified_drivers,
+        verified_dracut_modules=verified_dracut_modules)
+
+    assert upgradeinitramfsgenerator._get_missing_in_initramfs(context, reqs) == missing
+    assert context.called_call[0][0][0] == ['lsinitrd', '/artifacts/initramfs-upgrade.x86_64.img']
+
+
+@pytest.mark.parametrize('trimmed_result', ['ok', 'fails', 'missing', 'unverified'])
+def test_generate_initram_disk_trimmed(monkeypatch, trimmed_result):
+    context = MockedContext()
+    curr_actor = CurrentActorMocked(msgs=[gen_UIT(MODULES, [], [])], arch=architecture.ARCH_X86_64,
+                                    envars={'LEAPP_TRIMMED_INITRAMFS': '1'})
+    reqs = upgradeinitramfsgenerator.HostInitramfsRequirements(
+        drivers=['ahci', 'xfs'], omit_dracut_modules=['crypt'], verified_drivers=['ahci', 'xfs'],
+        verified_dracut_modules=[])
+    generator_calls = []
+
+    def mocked_run_initram_generator(_context, _includes, _kernel_version, host_requirements=None):
+        generator_calls.append(host_requirements)
+        if host_requirements and trimmed_result == 'fails':
+            raise CalledProcessError(message='dracut failed', command=['dracut'], result={'exit_code': 1})
+
+    missing = {'ok': [], 'missing': ['ahci'], 'unverified': None}.get(trimmed_result)
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', curr_actor)
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_dracut_modules', MockedCopyArgs())
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_target_kernel_version', lambda _: '')
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_kernel_modules', MockedCopyArgs())
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'copy_boot_files', lambda dummy: None)
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_fspace', MockedGetFspace(2*2**30))
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_initramfs_cache_key', lambda *dummy: None)
+    monkeypatch.setattr(upgradeinitramfsgenerator, 'get_host_initramfs_requirements', lambda *dummy: reqs)
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_run_initram_generator', mocked_run_initram_generator)
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_get_missing_in_initramfs', lambda *dummy: missing)
+
+    upgradeinitramfsgenerator.generate_initram_disk(context)
+
+    if trimmed_result == 'ok':
+        assert generator_calls == [reqs]
+        assert not upgradeinitramfsgenerator.api.current_logger.warnmsg
+    else:
+        assert generator_calls == [reqs, None]
+        assert upgradeinitramfsgenerator.api.current_logger.warnmsg
+
+
+def test_run_initram_generator_trimmed(monkeypatch):
+    context = MockedContext()
+    monkeypatch.setattr(upgradeinitramfsgenerator.api, 'current_actor', CurrentActorMocked())
+    monkeypatch.setattr(upgradeinitramfsgenerator, '_report_initramfs_stats', lambda *dummy: None)
+    includes = upgradeinitramfsgenerator.InitramfsIncludes(files=[], dracut_modules=[], kernel_modules=[])
+    reqs = upgradeinitramfsgenerator.HostInitramfsRequirements(
+        drivers=['ahci', 'xfs'], omit_dracut_modules=['crypt', 'nfs'], verified_drivers=['ahci', 'xfs'],
+        verified_dracut_modules=[])
+
+    upgradeinitramfsgenerator._run_initram_generator(context, includes, '5.14.0-1', reqs)
+    cmd = context.called_call[0][0][0][2]
+    assert 'LEAPP_DRACUT_HOSTONLY=1' in cmd
+    assert 'LEAPP_DRACUT_HOST_DRIVERS="ahci xfs"' in cmd
+    assert 'LEAPP_DRACUT_OMIT_MODULES="crypt nfs"' in cmd
+
+    upgradeinitramfsgenerator._run_initram_generator(context, includes, '5.14.0-1')
+    cmd = context.called_call[1][0][0][2]
+    assert 'LEAPP_DRACUT_HOSTONLY' not in cmd
+    assert 'LEAPP_DRACUT_HOST_DRIVERS' not in cmd
+
+
 def test_copy_dracut_modules_rmtree_ignore(monkeypatch):
     context = MockedContext()
 
@@ -1,6 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import deviceanddriverdeprecationdataload
-from leapp.models import ConsumedDataAsset, DeviceDriverDeprecationData
+from leapp.models import ConsumedDataAsset, DeviceDriverDeprecationData, DeviceDriverDeprecationDataIndex
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
@@ -9,12 +9,14 @@ class LoadDeviceDriverDeprecationData(Actor):
     Loads deprecation data for drivers and devices (PCI & CPU)
 
     The data will either be loaded from the local /etc/leapp/files location or
-    fetched from the Red Hat remote service providing this data.
+    fetched from the Red Hat remote service providing this data. The index of
+    the data used to look up particular devices and drivers is stored on the
+    disk and described by the DeviceDriverDeprecationDataIndex message.
     """
 
     name = 'load_device_driver_deprecation_data'
     consumes = ()
-    produces = (DeviceDriverDeprecationData, ConsumedDataAsset)
+    produces = (DeviceDriverDeprecationData, DeviceDriverDeprecationDataIndex, ConsumedDataAsset)
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
     def process(self, *args, **kwargs):
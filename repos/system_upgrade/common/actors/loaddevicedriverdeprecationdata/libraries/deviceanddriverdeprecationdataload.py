@@ -1,5 +1,5 @@
 from leapp.exceptions import StopActorExecutionError
-from leapp.libraries.common import fetch
+from leapp.libraries.common import devicedriverdeprecation, fetch
 from leapp.libraries.common.rpms import get_leapp_packages, LeappComponents
 from leapp.libraries.stdlib import api
 from leapp.models import DeviceDriverDeprecationData, DeviceDriverDeprecationEntry
@@ -10,7 +10,8 @@ def process():
     """
     Loads the device and driver deprecation data and produces a DeviceDriverDeprecationData message with its content.
     It will filter the data on the device_type field, based on the choices set in the StringEnum on the
-    DeviceDriverDeprecationEntry model
+    DeviceDriverDeprecationEntry model. The index of the data used by actors looking up particular devices
+    and drivers is stored as well, see the devicedriverdeprecation library.
     """
     # This is how you get the StringEnum choices value, so we can filter based on the model definition
     supported_device_types = set(DeviceDriverDeprecationEntry.device_type.serialize()['choices'])
@@ -26,14 +27,12 @@ def process():
                                              docs_title='')
 
     try:
-        api.produce(
-            DeviceDriverDeprecationData(
-                entries=[
-                    DeviceDriverDeprecationEntry(**entry)
-                    for entry in deprecation_data['data']
-                    if entry.get('device_type') in supported_device_types
-                ]
-            )
+        data = DeviceDriverDeprecationData(
+            entries=[
+                DeviceDriverDeprecationEntry(**entry)
+                for entry in deprecation_data['data']
+                if entry.get('device_type') in supported_device_types
+            ]
         )
     except (ModelViolationError, ValueError, KeyError, AttributeError, TypeError) as err:
         # For the listed errors, we expect this to happen only when data is malformed
@@ -51,3 +50,12 @@ def process():
             )
         )
         raise StopActorExecutionError(msg, details={'hint': hint})
+
+    api.produce(data)
+    try:
+        api.produce(devicedriverdeprecation.store_index([entry.dump() for entry in data.entries]))
+    except EnvironmentError as err:
+        raise StopActorExecutionError(
+            'Cannot store the index of the device and driver deprecation data',
+            details={'details': str(err)}
+        )
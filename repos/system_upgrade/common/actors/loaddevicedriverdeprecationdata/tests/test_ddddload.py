@@ -1,9 +1,12 @@
+import os
+
 import pytest
 
 from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.actor import deviceanddriverdeprecationdataload as ddddload
-from leapp.libraries.common import fetch
+from leapp.libraries.common import devicedriverdeprecation, fetch
 from leapp.libraries.common.testutils import CurrentActorMocked
+from leapp.models import DeviceDriverDeprecationDataIndex
 
 TEST_DATA = {
     'data': [
@@ -47,7 +50,7 @@ TEST_DATA = {
 }
 
 
-def test_filtered_load(monkeypatch):
+def test_filtered_load(monkeypatch, tmpdir):
     produced = []
 
     def load_data_asset_mock(*args, **kwargs):
@@ -55,12 +58,15 @@ def test_filtered_load(monkeypatch):
 
     monkeypatch.setattr(fetch, 'load_data_asset', load_data_asset_mock)
     monkeypatch.setattr(ddddload.api, 'produce', lambda *v: produced.extend(v))
+    monkeypatch.setattr(devicedriverdeprecation, 'INDEX_DIR', tmpdir.strpath)
 
     ddddload.process()
 
-    assert produced
+    assert len(produced) == 2
     assert len(produced[0].entries) == 3
     assert not any([e.device_type == 'unsupported' for e in produced[0].entries])
+    assert isinstance(produced[1], DeviceDriverDeprecationDataIndex)
+    assert os.listdir(tmpdir.strpath) == [produced[1].checksum]
 
 
 @pytest.mark.parametrize('data', (
@@ -0,0 +1,40 @@
+from leapp.actors import Actor
+from leapp.libraries.common import upgradetimeline
+from leapp.tags import (
+    ApplicationsPhaseTag,
+    FinalizationPhaseTag,
+    InitRamStartPhaseTag,
+    IPUWorkflowTag,
+    LateTestsPhaseTag,
+    PreparationPhaseTag,
+    RPMUpgradePhaseTag,
+    ThirdPartyApplicationsPhaseTag
+)
+
+
+class MarkUpgradePhase(Actor):
+    """
+    Record the start of each phase executed in the upgrade initramfs into the upgrade timeline
+
+    The actor is executed in the Before stage of every phase executed in the
+    upgrade initramfs, so the duration of each phase is visible in the upgrade
+    timeline (see the upgradetimeline library and the report_upgrade_timeline
+    actor).
+    """
+
+    name = 'mark_upgrade_phase'
+    consumes = ()
+    produces = ()
+    tags = (
+        InitRamStartPhaseTag.Before,
+        LateTestsPhaseTag.Before,
+        PreparationPhaseTag.Before,
+        RPMUpgradePhaseTag.Before,
+        ApplicationsPhaseTag.Before,
+        ThirdPartyApplicationsPhaseTag.Before,
+        FinalizationPhaseTag.Before,
+        IPUWorkflowTag,
+    )
+
+    def process(self):
+        upgradetimeline.mark_phase_start()
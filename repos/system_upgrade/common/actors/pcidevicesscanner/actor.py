@@ -1,6 +1,7 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import pcidevicesscanner
-from leapp.models import DetectedDeviceOrDriver, DeviceDriverDeprecationData, PCIDevices
+from leapp.libraries.common import factcache
+from leapp.models import DetectedDeviceOrDriver, DeviceDriverDeprecationDataIndex, PCIDevices
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
@@ -12,9 +13,10 @@ class PCIDevicesScanner(Actor):
     """
 
     name = 'pci_devices_scanner'
-    consumes = (DeviceDriverDeprecationData,)
+    consumes = (DeviceDriverDeprecationDataIndex,)
     produces = (PCIDevices, DetectedDeviceOrDriver)
     tags = (IPUWorkflowTag, FactsPhaseTag,)
 
     def process(self):
-        pcidevicesscanner.scan_pci_devices(self.produce)
+        factcache.run_cached('pci_devices', pcidevicesscanner.get_fact_cache_key,
+                             lambda: pcidevicesscanner.scan_pci_devices(self.produce))
@@ -1,10 +1,13 @@
+import os
 import re
 
+from leapp.libraries.common import devicedriverdeprecation, factcache
+from leapp.libraries.common.kernelmodules import format_pci_modalias, PCIModuleAliases
 from leapp.libraries.stdlib import api, run
 from leapp.models import (
     ActiveKernelModulesFacts,
     DetectedDeviceOrDriver,
-    DeviceDriverDeprecationData,
+    DeviceDriverDeprecationDataIndex,
     PCIDevice,
     PCIDevices
 )
@@ -12,6 +15,11 @@ from leapp.models import (
 # Regex to capture Vendor, Device and SVendor and SDevice values
 PCI_ID_REG = re.compile(r"(?<=Vendor:\t|Device:\t)\w+")
 
+SYSFS_PCI_DEVICES = '/sys/bus/pci/devices'
+SYSFS_PCI_SLOTS = '/sys/bus/pci/slots'
+PCI_IDS_PATHS = ('/usr/share/hwdata/pci.ids', '/usr/share/misc/pci.ids')
+MODULES_DIR = '/lib/modules'
+
 
 # TODO this could be solved more efficiently and error prune via python re
 #   and groupdict
@@ -60,10 +68,23 @@ def parse_pci_device(textual_block, numeric_block):
         driver=device['Driver'],
         modules=device['Module'],
         numa_node=device['NUMANode'],
-        pci_id=":".join(PCI_ID_REG.findall(numeric_block))
+        pci_id=":".join(PCI_ID_REG.findall(numeric_block)),
+        modalias=_get_lspci_modalias(numeric_block)
     )
 
 
+def _get_lspci_modalias(numeric_block):
+    """ Return the modalias of the device described by the block of `lspci -vmmkn` output, None if unknown """
+    values = dict(line.split(':\t', 1) for line in numeric_block.splitlines() if ':\t' in line)
+    try:
+        return format_pci_modalias(
+            int(values['Vendor'], 16), int(values['Device'], 16),
+            int(values.get('SVendor', '0'), 16), int(values.get('SDevice', '0'), 16),
+            int(values['Class'], 16) << 8 | int(values.get('ProgIf', '0'), 16))
+    except (KeyError, ValueError):
+        return None
+
+
 def parse_pci_devices(pci_textual, pci_numeric):
     """ Parse lspci output and return a list of PCI devices """
     return [
@@ -75,36 +96,187 @@ def parse_pci_devices(pci_textual, pci_numeric):
     ]
 
 
-def produce_detected_devices(devices):
-    prefix_re = re.compile('0x')
-    entry_lookup = {
-        prefix_re.sub('', entry.device_id): entry
-        for message in api.consume(DeviceDriverDeprecationData) for entry in message.entries
-    }
-    api.produce(*[
-        DetectedDeviceOrDriver(**entry_lookup[device.pci_id].dump())
-        for device in devices
-        if device.pci_id in entry_lookup
-    ])
+def _read_sysfs_attr(device_path, attr):
+    try:
+        with open(os.path.join(device_path, attr)) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return ''
+
+
+def _read_sysfs_id(device_path, attr):
+    """ Return numeric value of the attribute (e.g. '0x8086' -> 0x8086), None if not available """
+    try:
+        return int(_read_sysfs_attr(device_path, attr), 16)
+    except ValueError:
+        return None
+
+
+class PCIIds(object):
+    """
+    Names of PCI vendors, devices and classes from the pci.ids database
+
+    Only entries of the requested vendors are loaded. Unknown ids are formatted
+    the same way as lspci does.
+    """
+
+    def __init__(self, vendors):
+        self._vendors = {}
+        self._devices = {}
+        self._subsystems = {}
+        self._classes = {}
+        self._subclasses = {}
+        path = next((p for p in PCI_IDS_PATHS if os.path.exists(p)), None)
+        if path:
+            self._load(path, {'{:04x}'.format(vendor) for vendor in vendors})
+        else:
+            api.current_logger().debug('The pci.ids database is not available, PCI names cannot be resolved.')
+
+    def _load(self, path, vendors):
+        vendor, device, cls = None, None, None
+        with open(path, 'rb') as f:
+            for line in f:
+                line = line.decode('utf-8', 'replace').rstrip()
+                if not line or line.startswith('#'):
+                    continue
+                if not line.startswith('\t'):
+                    device = None
+                    if line.startswith('C '):
+                        vendor = None
+                        cls, dummy_sep, name = line[2:].partition('  ')
+                        self._classes[cls] = name
+                        continue
+                    cls = None
+                    vendor, dummy_sep, name = line.partition('  ')
+                    if vendor in vendors:
+                        self._vendors[vendor] = name
+                    else:
+                        vendor = None
+                elif cls and not line.startswith('\t\t'):
+                    subclass, dummy_sep, name = line[1:].partition('  ')
+                    self._subclasses[cls + subclass] = name
+                elif vendor and not line.startswith('\t\t'):
+                    device, dummy_sep, name = line[1:].partition('  ')
+                    self._devices[(vendor, device)] = name
+                elif vendor and device:
+                    subsystem, dummy_sep, name = line[2:].partition('  ')
+                    self._subsystems[(vendor, device) + tuple(subsystem.split())] = name
+
+    def vendor(self, vendor):
+        return self._vendors.get(vendor, 'Vendor {}'.format(vendor))
+
+    def device(self, vendor, device):
+        return self._devices.get((vendor, device), 'Device {}'.format(device))
 
+    def subsystem(self, vendor, device, subsystem_vendor, subsystem_device):
+        name = self._subsystems.get((vendor, device, subsystem_vendor, subsystem_device))
+        if name:
+            return name
+        if (vendor, device) == (subsystem_vendor, subsystem_device):
+            return self.device(vendor, device)
+        return 'Device {}'.format(subsystem_device)
 
-def produce_detected_drivers(devices):
+    def device_class(self, cls):
+        if cls in self._subclasses:
+            return self._subclasses[cls]
+        if cls[:2] in self._classes:
+            return '{} [{}]'.format(self._classes[cls[:2]], cls)
+        return 'Class {}'.format(cls)
+
+
+def _get_physical_slots():
+    """ Return mapping of addresses (domain:bus:device) to names of physical slots """
+    slots = {}
+    try:
+        names = os.listdir(SYSFS_PCI_SLOTS)
+    except OSError:
+        return slots
+    for name in names:
+        address = _read_sysfs_attr(os.path.join(SYSFS_PCI_SLOTS, name), 'address')
+        if address:
+            slots[address] = name
+    return slots
+
+
+def read_pci_devices():
+    """
+    Return the list of PCI devices read from sysfs
+
+    The devices are described the same way as by `lspci -vmmk` and `lspci -vmmkn`.
+    """
+    addresses = sorted(os.listdir(SYSFS_PCI_DEVICES))
+    attrs = {}
+    for address in addresses:
+        path = os.path.join(SYSFS_PCI_DEVICES, address)
+        attrs[address] = {
+            attr: _read_sysfs_id(path, attr)
+            for attr in ('vendor', 'device', 'subsystem_vendor', 'subsystem_device', 'class', 'revision')
+        }
+    vendors = {a[key] for a in attrs.values() for key in ('vendor', 'subsystem_vendor') if a[key] is not None}
+    pci_ids = PCIIds(vendors)
+    aliases = PCIModuleAliases(os.path.join(MODULES_DIR, os.uname()[2]))
+    slots = _get_physical_slots()
+    # lspci shows domains only when there is a device outside of the domain 0000
+    show_domain = any(not address.startswith('0000:') for address in addresses)
+
+    devices = []
+    for address in addresses:
+        path = os.path.join(SYSFS_PCI_DEVICES, address)
+        attr = attrs[address]
+        vendor = '{:04x}'.format(attr['vendor'] or 0)
+        device = '{:04x}'.format(attr['device'] or 0)
+        cls = attr['class'] or 0
+        pci_id = [vendor, device]
+        subsystem_vendor, subsystem_name = '', ''
+        if attr['subsystem_vendor'] and attr['subsystem_vendor'] != 0xffff:
+            pci_id += ['{:04x}'.format(attr['subsystem_vendor']), '{:04x}'.format(attr['subsystem_device'] or 0)]
+            subsystem_vendor = pci_ids.vendor(pci_id[2])
+            subsystem_name = pci_ids.subsystem(*pci_id)
+        driver = ''
+        if os.path.islink(os.path.join(path, 'driver')):
+            driver = os.path.basename(os.readlink(os.path.join(path, 'driver')))
+        numa_node = _read_sysfs_attr(path, 'numa_node')
+        modalias = _read_sysfs_attr(path, 'modalias')
+
+        devices.append(PCIDevice(
+            slot=address if show_domain else address[5:],
+            dev_cls=pci_ids.device_class('{:04x}'.format(cls >> 8)),
+            vendor=pci_ids.vendor(vendor),
+            name=pci_ids.device(vendor, device),
+            subsystem_vendor=subsystem_vendor,
+            subsystem_name=subsystem_name,
+            physical_slot=slots.get(address.rsplit('.', 1)[0], ''),
+            rev='{:02x}'.format(attr['revision']) if attr['revision'] else '',
+            progif='{:02x}'.format(cls & 0xff) if cls & 0xff else '',
+            driver=driver,
+            modules=aliases.modules(modalias),
+            numa_node=numa_node if numa_node and numa_node != '-1' else '',
+            pci_id=':'.join(pci_id),
+            modalias=modalias or None
+        ))
+    return devices
+
+
+def produce_detected_devices(devices, index):
+    entries = [index.find_pci_device(device.pci_id) for device in devices]
+    api.produce(*[DetectedDeviceOrDriver(**entry.dump()) for entry in entries if entry])
+
+
+def produce_detected_drivers(devices, index):
     active_modules = {
         module.file_name
         for message in api.consume(ActiveKernelModulesFacts) for module in message.kernel_modules
     }
 
-    # Create a lookup by driver_name and filter out the kernel that are active
-    entry_lookup = {
-        entry.driver_name: entry
-        for message in api.consume(DeviceDriverDeprecationData) for entry in message.entries
-        if not entry.device_id and entry.driver_name and entry.driver_name not in active_modules
+    # Look up drivers of the devices, except the kernel modules that are active
+    entries = {
+        driver: index.find_driver(driver)
+        for driver in {device.driver for device in devices}
+        if driver and driver not in active_modules
     }
-
-    drivers = {device.driver for device in devices if device.driver in entry_lookup}
     api.produce(*[
-        DetectedDeviceOrDriver(**entry_lookup[driver].dump())
-        for driver in drivers
+        DetectedDeviceOrDriver(**entry.dump())
+        for entry in entries.values() if entry
     ])
 
 
@@ -113,11 +285,30 @@ def produce_pci_devices(producer, devices):
     producer(PCIDevices(devices=devices))
 
 
+def get_fact_cache_key():
+    """ Return key invalidating cached PCI devices and detected devices and drivers """
+    try:
+        devices = sorted(os.listdir(SYSFS_PCI_DEVICES))
+    except OSError:
+        devices = None
+    return [
+        devices,
+        factcache.file_digest('/proc/modules'),
+        [message.checksum for message in api.consume(DeviceDriverDeprecationDataIndex)],
+        factcache.message_digest(*api.consume(ActiveKernelModulesFacts)),
+    ]
+
+
 def scan_pci_devices(producer):
     """ Scan system PCI Devices """
-    pci_textual = run(['lspci', '-vmmk'], checked=False)['stdout']
-    pci_numeric = run(['lspci', '-vmmkn'], checked=False)['stdout']
-    devices = parse_pci_devices(pci_textual, pci_numeric)
-    produce_detected_devices(devices)
-    produce_detected_drivers(devices)
+    if os.path.isdir(SYSFS_PCI_DEVICES):
+        devices = read_pci_devices()
+    else:
+        api.current_logger().debug('{} is not available, using lspci.'.format(SYSFS_PCI_DEVICES))
+        pci_textual = run(['lspci', '-vmmk'], checked=False)['stdout']
+        pci_numeric = run(['lspci', '-vmmkn'], checked=False)['stdout']
+        devices = parse_pci_devices(pci_textual, pci_numeric)
+    index = devicedriverdeprecation.get_index()
+    produce_detected_devices(devices, index)
+    produce_detected_drivers(devices, index)
     produce_pci_devices(producer, devices)
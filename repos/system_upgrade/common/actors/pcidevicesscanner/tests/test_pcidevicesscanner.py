@@ -2,7 +2,10 @@ import os
 
 import pytest
 
+from leapp.libraries.actor import pcidevicesscanner
 from leapp.libraries.actor.pcidevicesscanner import parse_pci_devices, produce_pci_devices
+from leapp.libraries.common.testutils import CurrentActorMocked
+from leapp.libraries.stdlib import api
 from leapp.models import PCIDevice, PCIDevices
 
 
@@ -108,6 +111,17 @@ Module:	ata_generic
     assert dev.pci_id == '15b45:0724:15b46:0725'
 
 
+@pytest.mark.parametrize('numeric_block,modalias', [
+    ('Slot:\t00:1f.2\nClass:\t0106\nVendor:\t8086\nDevice:\t2922\nSVendor:\t1af4\nSDevice:\t1100\nProgIf:\t01',
+     'pci:v00008086d00002922sv00001AF4sd00001100bc01sc06i01'),
+    ('Slot:\t00:00.0\nClass:\t0600\nVendor:\t8086\nDevice:\t1237',
+     'pci:v00008086d00001237sv00000000sd00000000bc06sc00i00'),
+    ('Slot:\t00:01.1\nClass:\tIDE interface\nVendor:\t15b43\nDevice:\t0722', None),
+])
+def test_get_lspci_modalias(numeric_block, modalias):
+    assert pcidevicesscanner._get_lspci_modalias(numeric_block) == modalias
+
+
 def test_parse_empty_list():
     output = parse_pci_devices('', '')
     assert isinstance(output, list)
@@ -206,6 +220,171 @@ def test_produce_no_devices():
     assert not output[0].devices
 
 
+PCI_IDS = """# Synthetic pci.ids
+1af4  Red Hat, Inc.
+8086  Intel Corporation
+\t1237  440FX - 82441FX PMC [Natoma]
+\t\t1af4 1100  Qemu virtual machine
+\t7010  82371SB PIIX3 IDE [Natoma/Triton II]
+\t1572  Ethernet Controller X710 for 10GbE SFP+
+\t154c  Ethernet Virtual Function 700 Series
+C 01  Mass storage controller
+\t01  IDE interface
+\t\t80  ISA Compatibility mode-only controller, supports bus mastering
+C 02  Network controller
+\t00  Ethernet controller
+C 06  Bridge
+\t00  Host bridge
+"""
+
+MODULES_ALIAS = """# Aliases extracted from modules themselves.
+alias pci:v00008086d00007010sv*sd*bc*sc*i* ata_piix
+alias pci:v*d*sv*sd*bc01sc01i* ata_generic
+alias pci:v00008086d00001572sv*sd*bc*sc*i* i40e
+alias pci:v00008086d0000154Csv*sd*bc*sc*i* iavf
+alias fs-xfs xfs
+"""
+
+LSPCI_TEXTUAL = """Slot:\t00:00.0
+Class:\tHost bridge
+Vendor:\tIntel Corporation
+Device:\t440FX - 82441FX PMC [Natoma]
+SVendor:\tRed Hat, Inc.
+SDevice:\tQemu virtual machine
+PhySlot:\t3
+Rev:\t02
+NUMANode:\t0
+
+Slot:\t00:01.1
+Class:\tIDE interface
+Vendor:\tIntel Corporation
+Device:\t82371SB PIIX3 IDE [Natoma/Triton II]
+SVendor:\tRed Hat, Inc.
+SDevice:\tDevice 1100
+ProgIf:\t80
+Driver:\tata_piix
+Module:\tata_piix
+Module:\tata_generic
+
+"""
+
+LSPCI_NUMERIC = """Slot:\t00:00.0
+Class:\t0600
+Vendor:\t8086
+Device:\t1237
+SVendor:\t1af4
+SDevice:\t1100
+PhySlot:\t3
+Rev:\t02
+NUMANode:\t0
+
+Slot:\t00:01.1
+Class:\t0101
+Vendor:\t8086
+Device:\t7010
+SVendor:\t1af4
+SDevice:\t1100
+ProgIf:\t80
+Driver:\tata_piix
+Module:\tata_piix
+Module:\tata_generic
+
+"""
+
+
+def _make_device(sysfs, address, vendor, device, cls, subsystem=(0, 0), revision=0, driver=None, numa_node=-1):
+    path = sysfs.join('devices').mkdir(address)
+    path.join('vendor').write('0x{:04x}\n'.format(vendor))
+    path.join('device').write('0x{:04x}\n'.format(device))
+    path.join('subsystem_vendor').write('0x{:04x}\n'.format(subsystem[0]))
+    path.join('subsystem_device').write('0x{:04x}\n'.format(subsystem[1]))
+    path.join('class').write('0x{:06x}\n'.format(cls))
+    path.join('revision').write('0x{:02x}\n'.format(revision))
+    path.join('numa_node').write('{}\n'.format(numa_node))
+    path.join('modalias').write('pci:v{:08X}d{:08X}sv{:08X}sd{:08X}bc{:02X}sc{:02X}i{:02X}\n'.format(
+        vendor, device, subsystem[0], subsystem[1], cls >> 16, (cls >> 8) & 0xff, cls & 0xff))
+    if driver:
+        path.join('driver').mksymlinkto(sysfs.join('drivers', driver))
+
+
+@pytest.fixture
+def sysfs(monkeypatch, tmpdir):
+    sysfs = tmpdir.mkdir('sys')
+    sysfs.mkdir('devices')
+    sysfs.mkdir('slots').mkdir('3').join('address').write('0000:00:00\n')
+    tmpdir.join('pci.ids').write(PCI_IDS)
+    tmpdir.mkdir('modules').mkdir(os.uname()[2]).join('modules.alias').write(MODULES_ALIAS)
+    monkeypatch.setattr(pcidevicesscanner, 'SYSFS_PCI_DEVICES', str(sysfs.join('devices')))
+    monkeypatch.setattr(pcidevicesscanner, 'SYSFS_PCI_SLOTS', str(sysfs.join('slots')))
+    monkeypatch.setattr(pcidevicesscanner, 'PCI_IDS_PATHS', (str(tmpdir.join('missing')), str(tmpdir.join('pci.ids'))))
+    monkeypatch.setattr(pcidevicesscanner, 'MODULES_DIR', str(tmpdir.join('modules')))
+    return sysfs
+
+
+def test_read_pci_devices_as_lspci(sysfs):
+    _make_device(sysfs, '0000:00:00.0', 0x8086, 0x1237, 0x060000, subsystem=(0x1af4, 0x1100), revision=2,
+                 numa_node=0)
+    _make_device(sysfs, '0000:00:01.1', 0x8086, 0x7010, 0x010180, subsystem=(0x1af4, 0x1100), driver='ata_piix')
+
+    devices = pcidevicesscanner.read_pci_devices()
+
+    assert [dev.dump() for dev in devices] == [dev.dump() for dev in parse_pci_devices(LSPCI_TEXTUAL, LSPCI_NUMERIC)]
+
+
+def test_read_pci_devices_sriov(sysfs):
+    _make_device(sysfs, '0000:00:00.0', 0x8086, 0x1237, 0x060000)
+    _make_device(sysfs, '0000:3b:00.0', 0x8086, 0x1572, 0x020000, subsystem=(0x8086, 0x0001), driver='i40e')
+    for vf in range(256):
+        _make_device(sysfs, '0000:3c:{:02x}.{}'.format(vf // 8, vf % 8), 0x8086, 0x154c, 0x020000,
+                     subsystem=(0x8086, 0x0001), driver='iavf' if vf % 2 else None)
+    _make_device(sysfs, '0001:00:00.0', 0x1b36, 0x0008, 0x060000)
+
+    devices = pcidevicesscanner.read_pci_devices()
+
+    assert len(devices) == 259
+    assert [dev.slot for dev in devices[:3]] == ['0000:00:00.0', '0000:3b:00.0', '0000:3c:00.0']
+    assert devices[0].physical_slot == '3'
+    assert devices[0].pci_id == '8086:1237'
+    assert devices[0].subsystem_vendor == ''
+
+    pf = devices[1]
+    assert pf.dev_cls == 'Ethernet controller'
+    assert pf.name == 'Ethernet Controller X710 for 10GbE SFP+'
+    assert pf.subsystem_name == 'Device 0001'
+    assert pf.driver == 'i40e'
+    assert pf.modules == ['i40e']
+    assert pf.numa_node == ''
+    assert pf.pci_id == '8086:1572:8086:0001'
+
+    vfs = devices[2:-1]
+    assert {vf.name for vf in vfs} == {'Ethernet Virtual Function 700 Series'}
+    assert {vf.driver for vf in vfs} == {'', 'iavf'}
+    assert all(vf.modules == ['iavf'] for vf in vfs)
+
+    unknown = devices[-1]
+    assert unknown.slot == '0001:00:00.0'
+    assert unknown.vendor == 'Vendor 1b36'
+    assert unknown.name == 'Device 0008'
+    assert unknown.modules == []
+
+
+def test_scan_pci_devices_without_lspci(monkeypatch, sysfs):
+    _make_device(sysfs, '0000:00:01.1', 0x8086, 0x7010, 0x010180, driver='ata_piix')
+    produced = []
+
+    def run_mocked(*args, **kwargs):
+        raise AssertionError('lspci should not be executed')
+
+    monkeypatch.setattr(pcidevicesscanner, 'run', run_mocked)
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked())
+    monkeypatch.setattr(pcidevicesscanner, 'produce_detected_devices', lambda devices, index: None)
+    monkeypatch.setattr(pcidevicesscanner, 'produce_detected_drivers', lambda devices, index: None)
+    pcidevicesscanner.scan_pci_devices(produced.append)
+
+    assert len(produced) == 1
+    assert produced[0].devices[0].modules == ['ata_piix', 'ata_generic']
+
+
 # TODO(pstodulk): update the test - drop current_actor_context and use monkeypatch
 @pytest.mark.skipif(not os.path.exists('/usr/sbin/lspci'), reason='lspci not installed on the system')
 def test_actor_execution(current_actor_context):
@@ -60,11 +60,140 @@ class Action(IntEnum):
     RENAMED = 7
 
 
-def get_pes_events(pes_json_directory, pes_json_filename):
+def _report_invalid_pes_data(pes_json_directory, pes_json_filename):
+    local_path = os.path.join(pes_json_directory, pes_json_filename)
+    title = 'Missing/Invalid PES data file ({})'.format(local_path)
+    summary = (
+        'All official data files are nowadays part of the installed rpms.'
+        ' This issue is usually encountered when the data files are incorrectly customized, replaced, or removed'
+        ' (e.g. by custom scripts).'
+    )
+    hint = (
+        ' In case you want to recover the original {lp} file, remove it (if it still exists)'
+        ' and reinstall the following rpms: {rpms}.'
+        .format(
+            lp=local_path,
+            rpms=', '.join(get_leapp_packages(component=LeappComponents.REPOSITORY))
+        )
+    )
+    reporting.create_report([
+        reporting.Title(title),
+        reporting.Summary(summary),
+        reporting.Remediation(hint=hint),
+        reporting.Severity(reporting.Severity.HIGH),
+        reporting.Groups([reporting.Groups.SANITY, reporting.Groups.INHIBITOR]),
+        reporting.RelatedResource('file', os.path.join(pes_json_directory, pes_json_filename))
+    ])
+    raise StopActorExecution()
+
+
+def _get_packageset_names(packageset):
+    packageset = packageset or {}
+    return frozenset(pkg['name'] for pkg in packageset.get('package', packageset.get('packages', [])))
+
+
+_IndexedEntry = namedtuple('_IndexedEntry', ['in_names', 'out_names', 'to_release', 'data'])
+
+
+class PESEventsIndex(object):
     """
-    Get all the events from the source JSON file exported from PES.
+    PES events indexed by names of their input packages
 
-    :return: List of Event tuples, where each event contains event type and input/output pkgs
+    Most of the PES events are not relevant for the system as their input packages are not installed. Entries
+    of the PES data are indexed by names of their input packages and only the entries relevant for the given
+    packages are parsed into events.
+    """
+
+    def __init__(self, entries, pes_json_directory='', pes_json_filename=''):
+        """
+        :param entries: list of _IndexedEntry, data of each entry is either a PES data entry or a list of events
+        """
+        self._entries = entries
+        self._pes_json_directory = pes_json_directory
+        self._pes_json_filename = pes_json_filename
+        self._by_in_name = defaultdict(list)
+        for idx, entry in enumerate(entries):
+            for name in entry.in_names:
+                self._by_in_name[name].append(idx)
+
+    @classmethod
+    def from_pes_data(cls, packageinfo, arch, pes_json_directory='', pes_json_filename=''):
+        """
+        Index the PES data entries (the packageinfo list) of events applicable to the given architecture
+
+        :raises: ValueError, KeyError in case of invalid data
+        """
+        entries = []
+        for entry in packageinfo:
+            architectures = entry.get('architectures') or []
+            if architectures and arch not in architectures:
+                continue
+            in_names = _get_packageset_names(entry.get('in_packageset'))
+            # NOTE: an entry without input packages does not generate any event
+            if in_names:
+                entries.append(_IndexedEntry(in_names, _get_packageset_names(entry.get('out_packageset')),
+                                             parse_release(entry.get('release')), entry))
+        return cls(entries, pes_json_directory, pes_json_filename)
+
+    @classmethod
+    def from_events(cls, events):
+        return cls([_IndexedEntry(frozenset(pkg.name for pkg in event.in_pkgs),
+                                  frozenset(pkg.name for pkg in event.out_pkgs),
+                                  event.to_release, [event]) for event in events])
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def releases(self):
+        """ Set of releases (to_release) of all the events """
+        return {entry.to_release for entry in self._entries}
+
+    def _get_relevant_entries(self, pkg_names):
+        """
+        Return indexes of entries with input packages having any of the names or the names of the output
+        packages of these entries (transitively), as such packages can appear on the system during the upgrade.
+        """
+        names = set(pkg_names)
+        to_visit = list(names)
+        relevant = set()
+        while to_visit:
+            for idx in self._by_in_name.get(to_visit.pop(), ()):
+                if idx in relevant:
+                    continue
+                relevant.add(idx)
+                new_names = self._entries[idx].out_names - names
+                names.update(new_names)
+                to_visit.extend(new_names)
+        return sorted(relevant)
+
+    def get_events(self, pkg_names=None):
+        """
+        Get events relevant for packages with the given names
+
+        :param pkg_names: Names of packages, all events are returned when None
+        :return: List of Event tuples
+        """
+        if pkg_names is None:
+            relevant = range(len(self._entries))
+        else:
+            relevant = self._get_relevant_entries(pkg_names)
+
+        events = []
+        try:
+            for idx in relevant:
+                data = self._entries[idx].data
+                events.extend(data if isinstance(data, list) else parse_entry(data))
+        except (ValueError, KeyError):
+            _report_invalid_pes_data(self._pes_json_directory, self._pes_json_filename)
+        return events
+
+
+def get_pes_events_index(pes_json_directory, pes_json_filename):
+    """
+    Get the index of events from the source JSON file exported from PES, applicable to the system architecture.
+
+    :return: PESEventsIndex or None if the data are outdated
     """
     try:
         # NOTE(pstodulk): load_data_assert raises StopActorExecutionError, see
@@ -81,35 +210,21 @@ def get_pes_events(pes_json_directory, pes_json_filename):
         if not events_data.get('packageinfo'):
             raise ValueError('Found PES data with invalid structure')
 
-        all_events = list(chain(*[parse_entry(entry) for entry in events_data['packageinfo']]))
         arch = api.current_actor().configuration.architecture
-        events_matching_arch = [e for e in all_events if not e.architectures or arch in e.architectures]
-        return events_matching_arch
+        return PESEventsIndex.from_pes_data(events_data['packageinfo'], arch, pes_json_directory, pes_json_filename)
     except (ValueError, KeyError):
-        local_path = os.path.join(pes_json_directory, pes_json_filename)
-        title = 'Missing/Invalid PES data file ({})'.format(local_path)
-        summary = (
-            'All official data files are nowadays part of the installed rpms.'
-            ' This issue is usually encountered when the data files are incorrectly customized, replaced, or removed'
-            ' (e.g. by custom scripts).'
-        )
-        hint = (
-            ' In case you want to recover the original {lp} file, remove it (if it still exists)'
-            ' and reinstall the following rpms: {rpms}.'
-            .format(
-                lp=local_path,
-                rpms=', '.join(get_leapp_packages(component=LeappComponents.REPOSITORY))
-            )
-        )
-        reporting.create_report([
-            reporting.Title(title),
-            reporting.Summary(summary),
-            reporting.Remediation(hint=hint),
-            reporting.Severity(reporting.Severity.HIGH),
-            reporting.Groups([reporting.Groups.SANITY, reporting.Groups.INHIBITOR]),
-            reporting.RelatedResource('file', os.path.join(pes_json_directory, pes_json_filename))
-        ])
-        raise StopActorExecution()
+        _report_invalid_pes_data(pes_json_directory, pes_json_filename)
+    return None
+
+
+def get_pes_events(pes_json_directory, pes_json_filename):
+    """
+    Get all the events from the source JSON file exported from PES.
+
+    :return: List of Event tuples, where each event contains event type and input/output pkgs
+    """
+    events_index = get_pes_events_index(pes_json_directory, pes_json_filename)
+    return events_index.get_events() if events_index is not None else None
 
 
 def generate_event_for_ms_mapping_entry(from_ms_to_ms_entry, event):
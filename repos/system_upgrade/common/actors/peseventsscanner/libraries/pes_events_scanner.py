@@ -4,7 +4,7 @@ from functools import partial
 from leapp import reporting
 from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.actor import peseventsscanner_repomap
-from leapp.libraries.actor.pes_event_parsing import Action, get_pes_events, Package
+from leapp.libraries.actor.pes_event_parsing import Action, get_pes_events_index, Package
 from leapp.libraries.common import rpms
 from leapp.libraries.common.config import version
 from leapp.libraries.stdlib import api
@@ -97,18 +97,19 @@ def get_transaction_configuration():
     return transaction_configuration
 
 
-def get_relevant_releases(events):
+def get_relevant_releases(releases):
     """
     Get releases present in the PES Events that are relevant for this IPU.
 
     Relevant release happened between the source OS version and the target OS version.
+
+    :param releases: Releases (to_release) of all PES events
     """
     # Collect releases that happened between source OS version and target OS version
     relevant_releases_match_list = [
         '> {0}'.format(api.current_actor().configuration.version.source),
         '<= {0}'.format(api.current_actor().configuration.version.target)
     ]
-    releases = {event.to_release for event in events}
     releases = [r for r in releases if version.matches_version(relevant_releases_match_list, '{}.{}'.format(*r))]
     return sorted(releases)
 
@@ -125,58 +126,107 @@ def _get_enabled_modules():
     return enabled_modules_msg.modules
 
 
+class _PackageIds(object):
+    """
+    Interning of packages into small integers
+
+    Packages are identified by their name and modulestream (see Package.__eq__), the repository of a package is kept
+    separately, so the computation of the target system works with sets of ints and dicts mapping ints
+    to repositories instead of sets of Packages.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._keys = []
+
+    def get_id(self, pkg):
+        key = (pkg.name, pkg.modulestream)
+        pkg_id = self._ids.get(key)
+        if pkg_id is None:
+            pkg_id = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+        return pkg_id
+
+    def get_ids(self, pkgs):
+        """
+        Return a dict mapping IDs of the packages to their repositories
+        """
+        return {self.get_id(pkg): pkg.repository for pkg in pkgs}
+
+    def get_package(self, pkg_id, repository):
+        name, modulestream = self._keys[pkg_id]
+        return Package(name, repository, modulestream)
+
+    def get_packages(self, pkgs):
+        return {self.get_package(pkg_id, repository) for pkg_id, repository in pkgs.items()}
+
+
+# Event with packages represented by dicts of package IDs to repositories
+_InternedEvent = namedtuple('_InternedEvent', ('event', 'in_pkgs', 'out_pkgs'))
+
+
+def _intern_events(events, releases, pkg_ids):
+    """
+    Return events of the releases interned using pkg_ids, grouped by their to_release
+    """
+    release_events = {release: [] for release in releases}
+    for event in events:
+        if event.to_release in release_events:
+            release_events[event.to_release].append(
+                _InternedEvent(event, pkg_ids.get_ids(event.in_pkgs), pkg_ids.get_ids(event.out_pkgs))
+            )
+    return release_events
+
+
 def compute_pkg_changes_between_consequent_releases(source_installed_pkgs,
-                                                    events,
-                                                    release,
+                                                    release_events,
                                                     seen_pkgs,
-                                                    pkgs_to_demodularize):
+                                                    pkgs_to_demodularize,
+                                                    pkg_ids):
+    """
+    Apply events of a single release
+
+    :param source_installed_pkgs: Dict mapping IDs of the packages present before the release to their repositories
+    :param release_events: Interned events of the release
+    :param seen_pkgs: Set of IDs of the packages present on the system before the release
+    :param pkgs_to_demodularize: Set of IDs of the packages to demodularize
+    :param pkg_ids: _PackageIds the packages have been interned with
+    :returns: Tuple of the dict of packages present after the release and the updated set of packages to demodularize
+    """
     logger = api.current_logger()
-    # Start with the installed packages and modify the set according to release events
-    target_pkgs = set(source_installed_pkgs)
-
-    release_events = [e for e in events if e.to_release == release]
+    # Start with the installed packages and modify them according to release events. The events are applied
+    # in the order given, conditions of the events are evaluated on the packages present before the release.
+    target_pkgs = dict(source_installed_pkgs)
 
-    for event in release_events:
+    for event, in_pkgs, out_pkgs in release_events:
         # PRESENCE events have a different semantics than the other events - they add a package to a target state
         # only if it had been seen (installed) during the course of the overall target packages
         if event.action == Action.PRESENT:
-            for pkg in event.in_pkgs:
-                if pkg in seen_pkgs:
-                    # First remove the package with the old repository and add it back, but now with the new
-                    # repository. As the Package class has a custom __hash__ and __eq__ comparing only name
-                    # and modulestream, the pkg.repository field is ignore and therefore the add() call
-                    # does not update the entry.
-                    if pkg in target_pkgs:
-                        target_pkgs.remove(pkg)
-                    target_pkgs.add(pkg)
+            # Add the package, or update its repository if it is present already
+            target_pkgs.update((pkg_id, repository) for pkg_id, repository in in_pkgs.items() if pkg_id in seen_pkgs)
         elif event.action == Action.DEPRECATED:
-            if event.in_pkgs.intersection(source_installed_pkgs):
-                # Remove packages with old repositories add packages with the new one
-                target_pkgs = target_pkgs.difference(event.in_pkgs)
-                target_pkgs = target_pkgs.union(event.in_pkgs)
+            if any(pkg_id in source_installed_pkgs for pkg_id in in_pkgs):
+                # Replace the repositories of the packages with the new ones
+                target_pkgs.update(in_pkgs)
         else:
             # All other packages have the same semantics - they remove their in_pkgs from the system with given
             # from_release and add out_pkgs to the system matching to_release
-            are_all_in_pkgs_present = all(in_pkg in source_installed_pkgs for in_pkg in event.in_pkgs)
-            is_any_in_pkg_present = any(in_pkg in source_installed_pkgs for in_pkg in event.in_pkgs)
+            are_all_in_pkgs_present = all(pkg_id in source_installed_pkgs for pkg_id in in_pkgs)
+            is_any_in_pkg_present = any(pkg_id in source_installed_pkgs for pkg_id in in_pkgs)
 
             # For MERGE to be relevant it is sufficient for only one of its in_pkgs to be installed
             if are_all_in_pkgs_present or (event.action == Action.MERGED and is_any_in_pkg_present):
-                removed_pkgs = target_pkgs.intersection(event.in_pkgs)
+                removed_pkgs = [pkg_ids.get_package(pkg_id, target_pkgs.pop(pkg_id))
+                                for pkg_id in in_pkgs if pkg_id in target_pkgs]
                 removed_pkgs_str = ', '.join(str(pkg) for pkg in removed_pkgs) if removed_pkgs else '[]'
                 added_pkgs_str = ', '.join(str(pkg) for pkg in event.out_pkgs) if event.out_pkgs else '[]'
                 logger.debug('Applying event %d (%s): replacing packages %s with %s',
                              event.id, event.action, removed_pkgs_str, added_pkgs_str)
 
-                # In pkgs are present, event can be applied
-                # Note: We do a .difference(event.out_packages) followed by an .union(event.out_packages) to overwrite
-                # #     repositories of the packages (Package has overwritten __hash__ and __eq__, ignoring
-                # #     the repository field)
-                target_pkgs = target_pkgs.difference(event.in_pkgs)
-                target_pkgs = target_pkgs.difference(event.out_pkgs)
-                target_pkgs = target_pkgs.union(event.out_pkgs)
+                # In pkgs are present, event can be applied, out pkgs overwrite repositories of present packages
+                target_pkgs.update(out_pkgs)
 
-        pkgs_to_demodularize = pkgs_to_demodularize.difference(event.in_pkgs)
+        pkgs_to_demodularize.difference_update(in_pkgs)
 
     return (target_pkgs, pkgs_to_demodularize)
 
@@ -231,26 +281,38 @@ def remove_undesired_events(events, relevant_to_releases):
 
 
 def compute_packages_on_target_system(source_pkgs, events, releases):
+    # Packages are interned into ints during the computation, Packages are created again only for the result
+    pkg_ids = _PackageIds()
+    target_pkgs = pkg_ids.get_ids(source_pkgs)
+    release_events = _intern_events(events, releases, pkg_ids)
 
-    seen_pkgs = set(source_pkgs)  # Used to track whether PRESENCE events can be applied
-    target_pkgs = set(source_pkgs)
+    seen_pkgs = set(target_pkgs)  # Used to track whether PRESENCE events can be applied
 
     source_major_version = int(version.get_source_major_version())
     did_processing_cross_major_version = False
     pkgs_to_demodularize = set()  # Modified by compute_pkg_changes
+    demodularized_repositories = {}
 
     for release in releases:
         if not did_processing_cross_major_version and release[0] > source_major_version:
             did_processing_cross_major_version = True
-            pkgs_to_demodularize = {pkg for pkg in target_pkgs if pkg.modulestream}
-
-        target_pkgs, pkgs_to_demodularize = compute_pkg_changes_between_consequent_releases(target_pkgs, events,
-                                                                                            release, seen_pkgs,
-                                                                                            pkgs_to_demodularize)
-        seen_pkgs = seen_pkgs.union(target_pkgs)
-
+            demodularized_repositories = {pkg_id: repository for pkg_id, repository in target_pkgs.items()
+                                          if pkg_ids.get_package(pkg_id, repository).modulestream}
+            pkgs_to_demodularize = set(demodularized_repositories)
+
+        target_pkgs, pkgs_to_demodularize = compute_pkg_changes_between_consequent_releases(target_pkgs,
+                                                                                            release_events[release],
+                                                                                            seen_pkgs,
+                                                                                            pkgs_to_demodularize,
+                                                                                            pkg_ids)
+        seen_pkgs.update(target_pkgs)
+
+    pkgs_to_demodularize = {pkg_ids.get_package(pkg_id, demodularized_repositories[pkg_id])
+                            for pkg_id in pkgs_to_demodularize}
     demodularized_pkgs = {Package(pkg.name, pkg.repository, None) for pkg in pkgs_to_demodularize}
-    demodularized_target_pkgs = target_pkgs.difference(pkgs_to_demodularize).union(demodularized_pkgs)
+    demodularized_target_pkgs = pkg_ids.get_packages(target_pkgs).difference(pkgs_to_demodularize).union(
+        demodularized_pkgs
+    )
 
     return (demodularized_target_pkgs, pkgs_to_demodularize)
 
@@ -549,15 +611,18 @@ def include_instructions_from_transaction_configuration(rpm_tasks, transaction_c
 
 def process():
     # Retrieve data - installed_pkgs, transaction configuration, pes events
-    events = get_pes_events('/etc/leapp/files', 'pes-events.json')
-    if not events:
+    events_index = get_pes_events_index('/etc/leapp/files', 'pes-events.json')
+    if not events_index:
         return
 
-    releases = get_relevant_releases(events)
+    releases = get_relevant_releases(events_index.releases)
     installed_pkgs = get_installed_pkgs()
     transaction_configuration = get_transaction_configuration()
     pkgs_to_begin_computation_with = apply_transaction_configuration(installed_pkgs, transaction_configuration)
 
+    # Only events of the packages that are (or will be, due to other events) on the system can have an effect
+    events = events_index.get_events({pkg.name for pkg in pkgs_to_begin_computation_with})
+
     # Keep track of what repoids have the source packages to be able to determine what are the PESIDs of the computed
     # packages of the target system, so we can distinguish what needs to be repomapped
     repoids_of_source_pkgs = {pkg.repository for pkg in pkgs_to_begin_computation_with}
@@ -12,7 +12,8 @@ from leapp.libraries.actor.pes_event_parsing import (
     Package,
     parse_entry,
     parse_packageset,
-    parse_pes_events
+    parse_pes_events,
+    PESEventsIndex
 )
 from leapp.libraries.common import fetch
 from leapp.libraries.common.testutils import create_report_mocked, CurrentActorMocked
@@ -168,3 +169,61 @@ def test_get_pes_events_invalid_data_reported(monkeypatch):
         get_pes_events("doesn't", "matter")
 
     assert created_reports.called
+
+
+def _pes_entry(event_id, action, in_names, out_names, release, architectures=None):
+    def packageset(names):
+        return {'package': [{'name': name, 'repository': 'repo'} for name in names]} if names else None
+
+    return {
+        'id': event_id,
+        'action': action,
+        'in_packageset': packageset(in_names),
+        'out_packageset': packageset(out_names),
+        'release': {'major_version': release[0], 'minor_version': release[1]},
+        'architectures': architectures or [],
+    }
+
+
+def test_pes_events_index():
+    packageinfo = [
+        _pes_entry(1, Action.RENAMED, ['installed'], ['renamed'], (8, 0)),
+        _pes_entry(2, Action.SPLIT, ['renamed'], ['split01', 'split02'], (8, 2)),
+        _pes_entry(3, Action.REMOVED, ['split02'], [], (9, 0)),
+        _pes_entry(4, Action.REMOVED, ['not-installed'], [], (9, 1)),
+        _pes_entry(5, Action.REMOVED, ['installed'], [], (8, 1), architectures=['s390x']),
+        _pes_entry(6, Action.MERGED, ['installed', 'not-installed'], ['merged'], (8, 3), architectures=['x86_64']),
+        _pes_entry(7, Action.REMOVED, [], [], (9, 2)),
+        # invalid, but not relevant entry, does not need to be parsed at all
+        _pes_entry(8, 42, ['not-installed'], [], (9, 3)),
+    ]
+    index = PESEventsIndex.from_pes_data(packageinfo, 'x86_64')
+
+    assert index.releases == {(8, 0), (8, 2), (8, 3), (9, 0), (9, 1), (9, 3)}
+    assert [event.id for event in index.get_events({'installed', 'other'})] == [1, 2, 3, 6]
+    assert [event.id for event in index.get_events({'split01'})] == []
+    assert [event.id for event in index.get_events(set())] == []
+
+
+def test_pes_events_index_invalid_relevant_event(monkeypatch):
+    created_reports = create_report_mocked()
+    monkeypatch.setattr(reporting, "create_report", created_reports)
+    monkeypatch.setattr(api, "current_actor", CurrentActorMocked())
+    index = PESEventsIndex.from_pes_data([_pes_entry(1, 42, ['installed'], [], (8, 0))], 'x86_64')
+
+    with pytest.raises(StopActorExecution):
+        index.get_events({'installed'})
+    assert created_reports.called
+
+
+def test_pes_events_index_from_events():
+    events = [
+        Event(1, Action.RENAMED, {Package('a', 'repo', None)}, {Package('b', 'repo', None)}, (7, 9), (8, 0), []),
+        Event(2, Action.REMOVED, {Package('b', 'repo', None)}, set(), (8, 0), (8, 1), []),
+        Event(3, Action.REMOVED, {Package('c', 'repo', None)}, set(), (8, 0), (8, 2), []),
+    ]
+    index = PESEventsIndex.from_events(events)
+
+    assert index.releases == {(8, 0), (8, 1), (8, 2)}
+    assert index.get_events() == events
+    assert index.get_events({'a'}) == events[:2]
@@ -3,7 +3,7 @@ from functools import partial
 import pytest
 
 from leapp.libraries.actor import pes_events_scanner
-from leapp.libraries.actor.pes_event_parsing import Event
+from leapp.libraries.actor.pes_event_parsing import Event, PESEventsIndex
 from leapp.libraries.actor.pes_events_scanner import (
     Action,
     api,
@@ -232,7 +232,8 @@ def test_actor_performs(monkeypatch):
               (8, 0), (8, 1), []),
     ]
 
-    monkeypatch.setattr(pes_events_scanner, 'get_pes_events', lambda data_folder, json_filename: events)
+    monkeypatch.setattr(pes_events_scanner, 'get_pes_events_index',
+                        lambda data_folder, json_filename: PESEventsIndex.from_events(events))
 
     _RPM = partial(RPM, epoch='', packager='', version='', release='', arch='', pgpsig='')
 
@@ -334,7 +335,8 @@ def test_blacklisted_repoid_is_not_produced(monkeypatch):
     ]
 
     monkeypatch.setattr(pes_events_scanner, 'get_installed_pkgs', lambda: installed_pkgs)
-    monkeypatch.setattr(pes_events_scanner, 'get_pes_events', lambda folder, filename: events)
+    monkeypatch.setattr(pes_events_scanner, 'get_pes_events_index',
+                        lambda folder, filename: PESEventsIndex.from_events(events))
     monkeypatch.setattr(pes_events_scanner, 'apply_transaction_configuration', lambda pkgs, transaction_cfg: pkgs)
     monkeypatch.setattr(pes_events_scanner, 'get_blacklisted_repoids', lambda: {'blacklisted-rhel8'})
     monkeypatch.setattr(pes_events_scanner, 'replace_pesids_with_repoids_in_packages',
@@ -408,6 +410,42 @@ def test_pkgs_are_demodularized_when_crossing_major_version(monkeypatch):
     assert target_pkgs == expected_target_pkgs
 
 
+def test_compute_packages_on_target_system_large_inventory(monkeypatch):
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked(src_ver='7.9'))
+
+    installed_pkgs = {Package('pkg{}'.format(i), 'rhel7-repo', ('module', 'stream') if i % 10 == 0 else None)
+                      for i in range(10000)}
+    events = []
+    for i in range(10000):
+        if i % 3 == 0:
+            events.append(Event(i, Action.RENAMED,
+                                {Package('pkg{}'.format(i), 'rhel7-repo', None)},
+                                {Package('renamed{}'.format(i), 'rhel8-repo', None)},
+                                (7, 9), (8, 0), []))
+        elif i % 3 == 1:
+            events.append(Event(i, Action.REMOVED,
+                                {Package('pkg{}'.format(i), 'rhel7-repo', None)}, set(),
+                                (7, 9), (8, 0), []))
+        else:
+            events.append(Event(i, Action.PRESENT,
+                                {Package('pkg{}'.format(i), 'rhel9-repo', None)}, set(),
+                                (8, 0), (9, 0), []))
+
+    target_pkgs, demodularized_pkgs = compute_packages_on_target_system(installed_pkgs, events, [(8, 0), (9, 0)])
+
+    expected_target_pkgs = set()
+    for i in range(10000):
+        if i % 10 == 0:
+            # Events do not match modular packages, these are only demodularized
+            expected_target_pkgs.add(Package('pkg{}'.format(i), 'rhel7-repo', None))
+        elif i % 3 == 0:
+            expected_target_pkgs.add(Package('renamed{}'.format(i), 'rhel8-repo', None))
+        elif i % 3 == 2:
+            expected_target_pkgs.add(Package('pkg{}'.format(i), 'rhel9-repo', None))
+    assert pkgs_into_tuples(target_pkgs) == pkgs_into_tuples(expected_target_pkgs)
+    assert len(demodularized_pkgs) == 1000
+
+
 def test_remove_leapp_related_events(monkeypatch):
     # NOTE(ivasilev) That's required to use leapp library functions that rely on calls to
     # get_source/target_system_version functions
@@ -490,7 +528,8 @@ def test_transaction_configuration_is_applied(monkeypatch):
               {Pkg('moved-in', 'rhel7-base')}, {Pkg('moved-out', 'rhel8-BaseOS')},
               (7, 9), (8, 0), []),
     ]
-    monkeypatch.setattr(pes_events_scanner, 'get_pes_events', lambda *args, **kwargs: events)
+    monkeypatch.setattr(pes_events_scanner, 'get_pes_events_index',
+                        lambda *args, **kwargs: PESEventsIndex.from_events(events))
     monkeypatch.setattr(pes_events_scanner, 'remove_leapp_related_events', lambda events: events)
     monkeypatch.setattr(pes_events_scanner, 'remove_undesired_events', lambda events, releases: events)
     monkeypatch.setattr(pes_events_scanner, '_get_enabled_modules', lambda *args: [])
@@ -0,0 +1,26 @@
+from leapp.actors import Actor
+from leapp.libraries.actor import pkgmanagersnapshotscanner
+from leapp.libraries.common import factcache
+from leapp.models import PkgManagerSnapshot
+from leapp.tags import FactsPhaseTag, IPUWorkflowTag
+
+
+class PkgManagerSnapshotScanner(Actor):
+    """
+    Provides data about installed packages and modules known to the package manager.
+
+    Repositories the installed packages come from, module streams of installed modular
+    packages and enabled module streams are collected at once, using just the rpmdb,
+    cached repository metadata and /etc/dnf/modules.d when possible. Actors that need
+    this information consume the produced message instead of initializing
+    the package manager again.
+    """
+
+    name = 'pkg_manager_snapshot_scanner'
+    consumes = ()
+    produces = (PkgManagerSnapshot,)
+    tags = (IPUWorkflowTag, FactsPhaseTag)
+
+    def process(self):
+        factcache.run_cached('pkg_manager_snapshot', pkgmanagersnapshotscanner.get_fact_cache_key,
+                             pkgmanagersnapshotscanner.process)
@@ -0,0 +1,146 @@
+import glob
+import warnings
+
+from leapp.exceptions import StopActorExecutionError
+from leapp.libraries.common import factcache
+from leapp.libraries.common import module as module_lib
+from leapp.libraries.stdlib import api
+from leapp.models import InstalledPackageOrigin, ModularRPM, Module, PkgManagerSnapshot
+
+no_yum = False
+no_yum_warning_msg = "package `yum` is unavailable"
+try:
+    import yum
+except ImportError:
+    no_yum = True
+    warnings.warn(no_yum_warning_msg, ImportWarning)
+
+
+def _raise_invalid_locale_error(err):
+    if 'locale' not in str(err):  # reraise if error is not related to locales
+        raise err
+    raise StopActorExecutionError(
+        message='Failed to get installed RPM packages because of an invalid locale',
+        details={
+            'hint': 'Please run leapp with a valid locale. ' +
+                    'You can get a list of installed locales by running `locale -a`.'
+        })
+
+
+def _get_package_repository_data_yum():
+    yum_base = yum.YumBase()
+    pkg_repos = {}
+
+    try:
+        for pkg in yum_base.doPackageLists().installed:
+            pkg_repos[pkg.name] = pkg.ui_from_repo.lstrip('@')
+    except ValueError as e:
+        _raise_invalid_locale_error(e)
+
+    return pkg_repos
+
+
+def _get_package_repository_data_dnf(base):
+    return {pkg.name: pkg._from_repo.lstrip('@') for pkg in base.sack.query().installed()}
+
+
+def _get_installed_rpm_keys(base):
+    return {(pkg.name, str(pkg.epoch), pkg.version, pkg.release, pkg.arch) for pkg in base.sack.query().installed()}
+
+
+def map_modular_rpms_to_modules(modules, installed=None):
+    """
+    Map modular packages to the module streams they come from.
+
+    :param modules: Module streams as a list of libdnf.module.ModulePackage objects
+    :param installed: If specified, map only RPMs present in the set of (name, epoch, version, release, arch)
+    :type installed: set
+    :returns: dict mapping (name, epoch, version, release, arch) of an RPM to (module, stream)
+    """
+    # create a reverse mapping from the RPMS to module streams
+    # key: tuple of 5 strings representing a NEVRA (name, epoch, version, release, arch) of an RPM
+    # value: tuple of 2 strings representing a module and its stream
+    rpm_streams = {}
+    for module in modules:
+        for rpm in module.getArtifacts():
+            # we transform the NEVRA string into a tuple
+            name, epoch_version, release_arch = rpm.rsplit('-', 2)
+            epoch, version = epoch_version.split(':', 1)
+            release, arch = release_arch.rsplit('.', 1)
+            rpm_key = (name, epoch, version, release, arch)
+            if installed is not None and rpm_key not in installed:
+                continue
+            # stream could be int or float, convert it to str just in case
+            rpm_streams[rpm_key] = (module.getName(), str(module.getStream()))
+    return rpm_streams
+
+
+def _get_dnf_data():
+    """
+    Return repository data of installed packages, mapping of modular RPMs and enabled modules
+    using a single dnf.Base loaded preferably from the local data only.
+    """
+    base = module_lib.create_local_dnf_base()
+    pkg_repos = _get_package_repository_data_dnf(base)
+    modules = module_lib.get_modules(base)
+    # empty on RHEL 7 because of no modules
+    if not modules:
+        return pkg_repos, {}, []
+
+    rpm_streams = map_modular_rpms_to_modules(modules, _get_installed_rpm_keys(base))
+    # if modules are not supported (RHEL 7), base.sack._moduleContainer won't exist,
+    # in such a case the modules are empty and we would not get here
+    enabled = [m for m in modules if base.sack._moduleContainer.isEnabled(m)]
+    return pkg_repos, rpm_streams, enabled
+
+
+def create_snapshot():
+    """
+    Create the snapshot of the package manager data about installed packages and modules.
+
+    Note:
+        There's no yum module for py3. The dnf module can be used only on RHEL 8+,
+        on RHEL 7 there's a bug in dnf preventing us to do so:
+        https://bugzilla.redhat.com/show_bug.cgi?id=1789840
+    """
+    if no_yum and not module_lib.dnf:
+        raise StopActorExecutionError(message=no_yum_warning_msg)
+
+    pkg_repos, rpm_streams, enabled = {}, {}, []
+    if module_lib.dnf:
+        try:
+            pkg_repos, rpm_streams, enabled = _get_dnf_data()
+        except ValueError as e:
+            _raise_invalid_locale_error(e)
+    if not no_yum:
+        pkg_repos = _get_package_repository_data_yum()
+
+    return PkgManagerSnapshot(
+        package_origins=[
+            InstalledPackageOrigin(name=name, repository=repository)
+            for name, repository in sorted(pkg_repos.items())
+        ],
+        modular_rpms=[
+            ModularRPM(name=key[0], epoch=key[1], version=key[2], release=key[3], arch=key[4],
+                       module=module, stream=stream)
+            for key, (module, stream) in sorted(rpm_streams.items())
+        ],
+        enabled_modules=[Module(name=m.getName(), stream=str(m.getStream())) for m in enabled],
+    )
+
+
+def get_fact_cache_key():
+    """
+    Return key invalidating the cached snapshot
+
+    Installed packages are covered by the fact cache itself, modules and repositories
+    of packages depend on the configuration and the metadata cache of the package manager.
+    """
+    return [
+        factcache.path_state('/etc/yum.conf', '/etc/dnf/dnf.conf', *sorted(glob.glob('/var/cache/dnf/*.solv*'))),
+        factcache.tree_state('/etc/yum.repos.d', '/etc/dnf/modules.d', '/etc/dnf/modules.defaults.d'),
+    ]
+
+
+def process():
+    api.produce(create_snapshot())
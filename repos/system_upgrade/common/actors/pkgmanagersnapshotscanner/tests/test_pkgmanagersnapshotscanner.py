@@ -0,0 +1,175 @@
+import pytest
+
+from leapp.exceptions import StopActorExecutionError
+from leapp.libraries.actor import pkgmanagersnapshotscanner
+from leapp.libraries.common import module as module_lib
+from leapp.libraries.common import testutils
+from leapp.libraries.stdlib import api
+from leapp.models import PkgManagerSnapshot
+
+# real module streams taken from Fedora 31
+ARTIFACTS_AFTERBURN = [
+    'afterburn-0:4.2.0-1.module_f31+6825+8330d585.x86_64',
+    'afterburn-debuginfo-0:4.2.0-1.module_f31+6825+8330d585.x86_64',
+    'rust-afterburn-0:4.2.0-1.module_f31+6825+8330d585.src',
+    'rust-afterburn-debugsource-0:4.2.0-1.module_f31+6825+8330d585.x86_64'
+]
+ARTIFACTS_SUBVERSION_110 = [
+    'mod_dav_svn-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'mod_dav_svn-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'python2-subversion-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'python2-subversion-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-0:1.10.6-1.module_f31+5204+aeb0fc0d.src',
+    'subversion-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-debugsource-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-devel-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-devel-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-gnome-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-gnome-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-javahl-0:1.10.6-1.module_f31+5204+aeb0fc0d.noarch',
+    'subversion-kde-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-kde-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-libs-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-libs-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-perl-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-perl-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-tools-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
+    'subversion-tools-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64'
+]
+ARTIFACTS_SUBVERSION_113 = [
+    'mod_dav_svn-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'mod_dav_svn-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'python2-subversion-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'python2-subversion-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-0:1.13.0-1.module_f31+6955+7c448939.src',
+    'subversion-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-debugsource-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-devel-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-devel-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-gnome-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-gnome-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-javahl-0:1.13.0-1.module_f31+6955+7c448939.noarch',
+    'subversion-kde-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-kde-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-libs-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-libs-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-perl-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-perl-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-tools-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
+    'subversion-tools-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64'
+]
+
+
+class ModuleMocked(object):
+    def __init__(self, name, stream, artifacts):
+        self.name = name
+        self.stream = stream
+        self.artifacts = artifacts
+
+    def getName(self):
+        return self.name
+
+    def getStream(self):
+        return self.stream
+
+    def getArtifacts(self):
+        return self.artifacts
+
+
+MODULES = [
+    ModuleMocked('afterburn', 'rolling', ARTIFACTS_AFTERBURN),
+    ModuleMocked('subversion', '1.10', ARTIFACTS_SUBVERSION_110),
+    ModuleMocked('subversion', '1.13', ARTIFACTS_SUBVERSION_113)
+]
+
+
+def test_map_modular_rpms_to_modules_empty():
+    assert not pkgmanagersnapshotscanner.map_modular_rpms_to_modules([])
+
+
+def test_map_modular_rpms_to_modules():
+    mapping = pkgmanagersnapshotscanner.map_modular_rpms_to_modules(MODULES)
+    assert mapping[
+        ('afterburn', '0', '4.2.0', '1.module_f31+6825+8330d585', 'x86_64')
+    ] == ('afterburn', 'rolling')
+    assert mapping[
+        ('subversion', '0', '1.10.6', '1.module_f31+5204+aeb0fc0d', 'x86_64')
+    ] == ('subversion', '1.10')
+    assert mapping[
+        ('subversion', '0', '1.13.0', '1.module_f31+6955+7c448939', 'x86_64')
+    ] == ('subversion', '1.13')
+    assert not mapping.get(('subversion', '0', '1.13.0', '1.module_f31+6955+7c448939', 'noarch'))
+    assert not mapping.get(('subversion', '0', '1.13.1', '1.module_f31+6955+7c448939', 'x86_64'))
+    assert not mapping.get(('subversion', '1', '1.13.0', '1.module_f31+6955+7c448939', 'x86_64'))
+
+
+def test_map_modular_rpms_to_modules_installed_only():
+    installed = {
+        ('afterburn', '0', '4.2.0', '1.module_f31+6825+8330d585', 'x86_64'),
+        ('subversion', '0', '1.10.6', '1.module_f31+5204+aeb0fc0d', 'x86_64'),
+        ('passwd', '0', '0.80', '7.fc31', 'x86_64'),
+    }
+    mapping = pkgmanagersnapshotscanner.map_modular_rpms_to_modules(MODULES, installed)
+    assert mapping == {
+        ('afterburn', '0', '4.2.0', '1.module_f31+6825+8330d585', 'x86_64'): ('afterburn', 'rolling'),
+        ('subversion', '0', '1.10.6', '1.module_f31+5204+aeb0fc0d', 'x86_64'): ('subversion', '1.10'),
+    }
+
+
+def _mock_dnf_data(monkeypatch, pkg_repos, rpm_streams, enabled):
+    monkeypatch.setattr(module_lib, 'dnf', object())
+    monkeypatch.setattr(pkgmanagersnapshotscanner, 'no_yum', True)
+    monkeypatch.setattr(pkgmanagersnapshotscanner, '_get_dnf_data', lambda: (pkg_repos, rpm_streams, enabled))
+
+
+def test_create_snapshot(monkeypatch):
+    rpm_key = ('afterburn', '0', '4.2.0', '1.module_f31+6825+8330d585', 'x86_64')
+    rpm_streams = {rpm_key: ('afterburn', 'rolling')}
+    _mock_dnf_data(monkeypatch, {'afterburn': 'repo1', 'passwd': 'anaconda'}, rpm_streams, [MODULES[0]])
+
+    snapshot = pkgmanagersnapshotscanner.create_snapshot()
+
+    assert [(o.name, o.repository) for o in snapshot.package_origins] == [
+        ('afterburn', 'repo1'), ('passwd', 'anaconda')
+    ]
+    assert len(snapshot.modular_rpms) == 1
+    rpm = snapshot.modular_rpms[0]
+    assert (rpm.name, rpm.epoch, rpm.version, rpm.release, rpm.arch) == rpm_key
+    assert (rpm.module, rpm.stream) == ('afterburn', 'rolling')
+    assert [(m.name, m.stream) for m in snapshot.enabled_modules] == [('afterburn', 'rolling')]
+
+
+def test_create_snapshot_yum_repository_data(monkeypatch):
+    _mock_dnf_data(monkeypatch, {'passwd': 'from-dnf'}, {}, [])
+    monkeypatch.setattr(pkgmanagersnapshotscanner, 'no_yum', False)
+    monkeypatch.setattr(pkgmanagersnapshotscanner, '_get_package_repository_data_yum', lambda: {'passwd': 'rhel-7'})
+
+    snapshot = pkgmanagersnapshotscanner.create_snapshot()
+
+    assert [(o.name, o.repository) for o in snapshot.package_origins] == [('passwd', 'rhel-7')]
+    assert not snapshot.modular_rpms
+    assert not snapshot.enabled_modules
+
+
+def test_create_snapshot_invalid_locale(monkeypatch):
+    def _raise_locale_error():
+        raise ValueError('unsupported locale setting')
+
+    monkeypatch.setattr(module_lib, 'dnf', object())
+    monkeypatch.setattr(pkgmanagersnapshotscanner, 'no_yum', True)
+    monkeypatch.setattr(pkgmanagersnapshotscanner, '_get_dnf_data', _raise_locale_error)
+
+    with pytest.raises(StopActorExecutionError):
+        pkgmanagersnapshotscanner.create_snapshot()
+
+
+def test_process(monkeypatch):
+    _mock_dnf_data(monkeypatch, {'passwd': 'anaconda'}, {}, [])
+    monkeypatch.setattr(api, 'produce', testutils.produce_mocked())
+
+    pkgmanagersnapshotscanner.process()
+
+    assert api.produce.called == 1
+    assert isinstance(api.produce.model_instances[0], PkgManagerSnapshot)
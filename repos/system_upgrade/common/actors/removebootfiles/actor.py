@@ -1,5 +1,5 @@
 from leapp.actors import Actor
-from leapp.libraries.actor.removebootfiles import remove_boot_files
+from leapp.libraries.actor.removebootfiles import remove_boot_files, remove_upgrade_initramfs_cache
 from leapp.models import BootContent
 from leapp.tags import IPUWorkflowTag, PreparationPhaseTag
 
@@ -9,7 +9,8 @@ class RemoveBootFiles(Actor):
     Remove Leapp provided initramfs from boot partition.
 
     Since Leapp provided initramfs and kernel are already loaded into RAM at this phase, remove
-    them to have as little space requirements for boot partition as possible.
+    them to have as little space requirements for boot partition as possible. Their copy cached
+    in /var/lib/leapp/upgrade-initramfs-cache for following leapp executions is removed as well.
     """
 
     name = 'remove_boot_files'
@@ -18,4 +19,5 @@ class RemoveBootFiles(Actor):
     tags = (IPUWorkflowTag, PreparationPhaseTag)
 
     def process(self):
+        remove_upgrade_initramfs_cache()
         remove_boot_files()
@@ -1,9 +1,14 @@
 import os
+import shutil
 
 from leapp.exceptions import StopActorExecution
 from leapp.libraries.stdlib import api
 from leapp.models import BootContent
 
+# Copy of the upgrade kernel and initramfs kept by the upgrade_initramfs_generator actor
+# to be reused by following leapp executions, see INITRAMFS_CACHE_DIR there
+UPGRADE_INITRAMFS_CACHE_DIR = '/var/lib/leapp/upgrade-initramfs-cache'
+
 
 def remove_boot_files():
     boot_content_msgs = api.consume(BootContent)
@@ -23,3 +28,14 @@ def remove_file(filepath):
         os.remove(filepath)
     except OSError as err:
         api.current_logger().error('Could not remove {0}: {1}.'.format(filepath, err))
+
+
+def remove_upgrade_initramfs_cache():
+    """
+    Remove the cached upgrade initramfs as it is not needed once the upgrade is running
+    """
+    try:
+        shutil.rmtree(UPGRADE_INITRAMFS_CACHE_DIR)
+    except OSError as err:
+        if os.path.exists(UPGRADE_INITRAMFS_CACHE_DIR):
+            api.current_logger().error('Could not remove {0}: {1}.'.format(UPGRADE_INITRAMFS_CACHE_DIR, err))
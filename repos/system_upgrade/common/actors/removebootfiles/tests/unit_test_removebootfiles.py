@@ -54,3 +54,17 @@ def test_remove_file_that_does_not_exist(monkeypatch):
     removebootfiles.remove_file('/filepath')
 
     assert any("Could not remove /filepath" in msg for msg in api.current_logger.errmsg)
+
+
+def test_remove_upgrade_initramfs_cache(monkeypatch, tmpdir):
+    cache_dir = tmpdir.join('upgrade-initramfs-cache')
+    cache_dir.join('initramfs-upgrade.x86_64.img').write('initramfs', ensure=True)
+    monkeypatch.setattr(removebootfiles, 'UPGRADE_INITRAMFS_CACHE_DIR', cache_dir.strpath)
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+
+    removebootfiles.remove_upgrade_initramfs_cache()
+    assert not cache_dir.exists()
+
+    # nothing to remove
+    removebootfiles.remove_upgrade_initramfs_cache()
+    assert not api.current_logger.errmsg
@@ -0,0 +1,24 @@
+from leapp.actors import Actor
+from leapp.libraries.actor import reportupgradetimeline
+from leapp.reporting import Report
+from leapp.tags import FirstBootPhaseTag, IPUWorkflowTag
+
+
+class ReportUpgradeTimeline(Actor):
+    """
+    Report how long the particular stages of the upgrade took
+
+    The upgrade timeline is recorded in the upgrade initramfs (see the
+    upgradetimeline library) and stored in
+    /var/log/leapp/leapp-upgrade-timeline.jsonl. The actor records the first
+    boot into the upgraded system and produces a report with the duration
+    of each stage, so the downtime of the upgrade can be evaluated.
+    """
+
+    name = 'report_upgrade_timeline'
+    consumes = ()
+    produces = (Report,)
+    tags = (FirstBootPhaseTag, IPUWorkflowTag)
+
+    def process(self):
+        reportupgradetimeline.process()
@@ -0,0 +1,47 @@
+from leapp import reporting
+from leapp.libraries.common import upgradetimeline
+from leapp.libraries.stdlib import api
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}:{:02d}:{:02d}'.format(hours, minutes, seconds)
+
+
+def process():
+    records = upgradetimeline.read_timeline()
+    if not records:
+        api.current_logger().debug(
+            'No upgrade timeline found in {}. Skipping.'.format(upgradetimeline.TIMELINE_LOG_PATH)
+        )
+        return
+
+    # the actor can be executed again when the FirstBoot phase is retried
+    if records[-1]['stage'] != 'first-boot':
+        upgradetimeline.mark_stage('first-boot', path=upgradetimeline.TIMELINE_LOG_PATH)
+        records = upgradetimeline.read_timeline()
+
+    durations = upgradetimeline.get_stage_durations(records)
+    total = records[-1]['time'] - records[0]['time']
+    summary = (
+        'The upgrade took {total} from the start of the upgrade initramfs'
+        ' until the first boot into the upgraded system.'
+        ' Duration of particular stages:\n{stages}\n\n'
+        'The machine-readable timeline is stored in {path}.'
+        .format(
+            total=_format_duration(total),
+            stages='\n'.join(
+                '    - {}: {}'.format(stage, _format_duration(duration)) for stage, duration in durations
+            ),
+            path=upgradetimeline.TIMELINE_LOG_PATH,
+        )
+    )
+
+    reporting.create_report([
+        reporting.Title('Upgrade downtime timeline'),
+        reporting.Summary(summary),
+        reporting.Severity(reporting.Severity.INFO),
+        reporting.Groups([reporting.Groups.UPGRADE_PROCESS]),
+        reporting.RelatedResource('file', upgradetimeline.TIMELINE_LOG_PATH),
+    ])
@@ -0,0 +1,61 @@
+import json
+
+from leapp import reporting
+from leapp.libraries.actor import reportupgradetimeline
+from leapp.libraries.common import upgradetimeline
+from leapp.libraries.common.testutils import create_report_mocked, logger_mocked
+from leapp.libraries.stdlib import api
+
+
+def test_no_timeline(monkeypatch, tmpdir):
+    monkeypatch.setattr(upgradetimeline, 'TIMELINE_LOG_PATH', str(tmpdir.join('timeline.jsonl')))
+    monkeypatch.setattr(reporting, 'create_report', create_report_mocked())
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+
+    reportupgradetimeline.process()
+
+    assert not reporting.create_report.called
+
+
+def test_report_timeline(monkeypatch, tmpdir):
+    timeline = tmpdir.join('timeline.jsonl')
+    timeline.write('\n'.join([
+        json.dumps({'stage': 'initramfs-start', 'time': 1000, 'uptime': 5.0}),
+        json.dumps({'stage': 'leapp-upgrade-start', 'time': 1010, 'uptime': 15.0}),
+        json.dumps({'stage': 'save-logs', 'time': 4610, 'uptime': 3615.0}),
+    ]) + '\n')
+    monkeypatch.setattr(upgradetimeline, 'TIMELINE_LOG_PATH', str(timeline))
+    monkeypatch.setattr(reporting, 'create_report', create_report_mocked())
+
+    reportupgradetimeline.process()
+
+    assert reporting.create_report.called == 1
+    summary = reporting.create_report.report_fields['summary']
+    assert 'initramfs-start: 0:00:10' in summary
+    assert 'leapp-upgrade-start: 1:00:00' in summary
+    assert 'save-logs:' in summary
+    # the first boot is recorded into the timeline
+    assert upgradetimeline.read_timeline(str(timeline))[-1]['stage'] == 'first-boot'
+
+
+def test_report_timeline_first_boot_recorded_once(monkeypatch, tmpdir):
+    timeline = tmpdir.join('timeline.jsonl')
+    timeline.write('\n'.join([
+        json.dumps({'stage': 'initramfs-start', 'time': 1000, 'uptime': 5.0}),
+        json.dumps({'stage': 'reboot', 'time': 4610, 'uptime': 3615.0}),
+    ]) + '\n')
+    monkeypatch.setattr(upgradetimeline, 'TIMELINE_LOG_PATH', str(timeline))
+    monkeypatch.setattr(reporting, 'create_report', create_report_mocked())
+
+    reportupgradetimeline.process()
+    reportupgradetimeline.process()
+
+    assert reporting.create_report.called == 2
+    stages = [record['stage'] for record in upgradetimeline.read_timeline(str(timeline))]
+    assert stages == ['initramfs-start', 'reboot', 'first-boot']
+
+
+def test_format_duration():
+    assert reportupgradetimeline._format_duration(0) == '0:00:00'
+    assert reportupgradetimeline._format_duration(61.4) == '0:01:01'
+    assert reportupgradetimeline._format_duration(3725) == '1:02:05'
@@ -1,6 +1,7 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import rpmscanner
-from leapp.models import InstalledRPM
+from leapp.libraries.common import factcache
+from leapp.models import InstalledRPM, PkgManagerSnapshot
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
@@ -9,12 +10,13 @@ class RpmScanner(Actor):
     Provides data about installed RPM Packages.
 
     After collecting data from RPM query, a message with relevant data will be produced.
+    Repositories and module streams of the packages are taken from the PkgManagerSnapshot message.
     """
 
     name = 'rpm_scanner'
-    consumes = ()
+    consumes = (PkgManagerSnapshot,)
     produces = (InstalledRPM,)
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
     def process(self):
-        rpmscanner.process()
+        factcache.run_cached('installed_rpms', rpmscanner.get_fact_cache_key, rpmscanner.process)
@@ -1,136 +1,12 @@
-import sys
-
 import pytest
 
+from leapp.exceptions import StopActorExecutionError
 from leapp.libraries.actor import rpmscanner
-from leapp.libraries.common import module as module_lib
 from leapp.libraries.common import rpms, testutils
 from leapp.libraries.stdlib import api
-from leapp.models import InstalledRPM, RPM
+from leapp.models import InstalledPackageOrigin, InstalledRPM, ModularRPM, PkgManagerSnapshot
 from leapp.snactor.fixture import current_actor_context
 
-no_yum = False
-try:
-    import yum
-except ImportError:
-    no_yum = True
-
-no_dnf = False
-try:
-    import dnf
-except ImportError:
-    no_dnf = True
-
-
-# real module streams taken from Fedora 31
-ARTIFACTS_AFTERBURN = [
-    'afterburn-0:4.2.0-1.module_f31+6825+8330d585.x86_64',
-    'afterburn-debuginfo-0:4.2.0-1.module_f31+6825+8330d585.x86_64',
-    'rust-afterburn-0:4.2.0-1.module_f31+6825+8330d585.src',
-    'rust-afterburn-debugsource-0:4.2.0-1.module_f31+6825+8330d585.x86_64'
-]
-ARTIFACTS_SUBVERSION_110 = [
-    'mod_dav_svn-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'mod_dav_svn-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'python2-subversion-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'python2-subversion-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-0:1.10.6-1.module_f31+5204+aeb0fc0d.src',
-    'subversion-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-debugsource-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-devel-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-devel-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-gnome-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-gnome-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-javahl-0:1.10.6-1.module_f31+5204+aeb0fc0d.noarch',
-    'subversion-kde-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-kde-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-libs-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-libs-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-perl-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-perl-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-tools-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64',
-    'subversion-tools-debuginfo-0:1.10.6-1.module_f31+5204+aeb0fc0d.x86_64'
-]
-ARTIFACTS_SUBVERSION_113 = [
-    'mod_dav_svn-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'mod_dav_svn-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'python2-subversion-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'python2-subversion-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-0:1.13.0-1.module_f31+6955+7c448939.src',
-    'subversion-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-debugsource-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-devel-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-devel-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-gnome-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-gnome-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-javahl-0:1.13.0-1.module_f31+6955+7c448939.noarch',
-    'subversion-kde-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-kde-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-libs-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-libs-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-perl-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-perl-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-tools-0:1.13.0-1.module_f31+6955+7c448939.x86_64',
-    'subversion-tools-debuginfo-0:1.13.0-1.module_f31+6955+7c448939.x86_64'
-]
-
-
-class ModuleMocked(object):
-    def __init__(self, name, stream, artifacts):
-        self.name = name
-        self.stream = stream
-        self.artifacts = artifacts
-
-    def getName(self):
-        return self.name
-
-    def getStream(self):
-        return self.stream
-
-    def getArtifacts(self):
-        return self.artifacts
-
-
-MODULES = [
-    ModuleMocked('afterburn', 'rolling', ARTIFACTS_AFTERBURN),
-    ModuleMocked('subversion', '1.10', ARTIFACTS_SUBVERSION_110),
-    ModuleMocked('subversion', '1.13', ARTIFACTS_SUBVERSION_113)
-]
-
-
-@pytest.mark.skipif(no_yum and no_dnf, reason='yum/dnf is unavailable')
-def test_actor_execution(monkeypatch, current_actor_context):
-    monkeypatch.setattr(rpmscanner.module_lib, 'get_modules', lambda: [])
-    current_actor_context.run()
-    assert current_actor_context.consume(InstalledRPM)
-    assert current_actor_context.consume(InstalledRPM)[0].items
-
-
-def test_map_modular_rpms_to_modules_empty(monkeypatch):
-    monkeypatch.setattr(module_lib, 'get_modules', lambda: [])
-    mapping = rpmscanner.map_modular_rpms_to_modules()
-    assert not mapping
-
-
-def test_map_modular_rpms_to_modules(monkeypatch):
-    monkeypatch.setattr(module_lib, 'get_modules', lambda: MODULES)
-    mapping = rpmscanner.map_modular_rpms_to_modules()
-    assert mapping[
-        ('afterburn', '0', '4.2.0', '1.module_f31+6825+8330d585', 'x86_64')
-    ] == ('afterburn', 'rolling')
-    assert mapping[
-        ('subversion', '0', '1.10.6', '1.module_f31+5204+aeb0fc0d', 'x86_64')
-    ] == ('subversion', '1.10')
-    assert mapping[
-        ('subversion', '0', '1.13.0', '1.module_f31+6955+7c448939', 'x86_64')
-    ] == ('subversion', '1.13')
-    assert not mapping.get(('subversion', '0', '1.13.0', '1.module_f31+6955+7c448939', 'noarch'))
-    assert not mapping.get(('subversion', '0', '1.13.1', '1.module_f31+6955+7c448939', 'x86_64'))
-    assert not mapping.get(('subversion', '1', '1.13.0', '1.module_f31+6955+7c448939', 'x86_64'))
-
-
 INSTALLED_RPMS = [
     ('afterburn|4.2.0|1.module_f31+6825+8330d585|0|Fedora Project|x86_64|'
      'RSA/SHA256, Wed 16 Oct 2019 12:49:08 AM CEST, Key ID 50cb390b3c3359c4'),
@@ -145,17 +21,38 @@ INSTALLED_RPMS = [
 ]
 
 
-PACKAGE_REPOS = {
-    'afterburn': 'repo1',
-    'subversion': 'repo2',
-    'tcpdump': 'repo2'
-}
+SNAPSHOT = PkgManagerSnapshot(
+    package_origins=[
+        InstalledPackageOrigin(name='afterburn', repository='repo1'),
+        InstalledPackageOrigin(name='subversion', repository='repo2'),
+        InstalledPackageOrigin(name='tcpdump', repository='repo2'),
+    ],
+    modular_rpms=[
+        ModularRPM(name='afterburn', epoch='0', version='4.2.0', release='1.module_f31+6825+8330d585',
+                   arch='x86_64', module='afterburn', stream='rolling'),
+        ModularRPM(name='subversion', epoch='0', version='1.10.6', release='1.module_f31+5204+aeb0fc0d',
+                   arch='x86_64', module='subversion', stream='1.10'),
+    ],
+)
+
+
+def test_actor_execution(current_actor_context):
+    current_actor_context.feed(SNAPSHOT)
+    current_actor_context.run()
+    assert current_actor_context.consume(InstalledRPM)
+    assert current_actor_context.consume(InstalledRPM)[0].items
+
+
+def test_missing_snapshot(monkeypatch):
+    monkeypatch.setattr(rpms, 'get_installed_rpms', lambda: INSTALLED_RPMS)
+    monkeypatch.setattr(api, 'current_actor', testutils.CurrentActorMocked())
+    with pytest.raises(StopActorExecutionError):
+        rpmscanner.process()
 
 
 def test_process(monkeypatch):
-    monkeypatch.setattr(module_lib, 'get_modules', lambda: MODULES)
-    monkeypatch.setattr(rpmscanner, 'get_package_repository_data', lambda: PACKAGE_REPOS)
     monkeypatch.setattr(rpms, 'get_installed_rpms', lambda: INSTALLED_RPMS)
+    monkeypatch.setattr(api, 'current_actor', testutils.CurrentActorMocked(msgs=[SNAPSHOT]))
     monkeypatch.setattr(api, 'produce', testutils.produce_mocked())
 
     rpmscanner.process()
@@ -1,4 +1,6 @@
 from leapp.actors import Actor
+from leapp.libraries.actor import satellite_upgrader
+from leapp.libraries.common import config
 from leapp.libraries.stdlib import api, CalledProcessError, run
 from leapp.models import SatelliteFacts
 from leapp.tags import FirstBootPhaseTag, IPUWorkflowTag
@@ -7,6 +9,10 @@ from leapp.tags import FirstBootPhaseTag, IPUWorkflowTag
 class SatelliteUpgrader(Actor):
     """
     Execute installer in the freshly booted system, to finalize Satellite configuration
+
+    A local PostgreSQL database is re-indexed first, as the collation of text changes with glibc.
+    All indexes are rebuilt by default, with LEAPP_SATELLITE_COLLATION_REINDEX=1 only indexes using
+    a collation provided by glibc or ICU (including pulp_ansible_semver) are rebuilt, in parallel.
     """
 
     name = 'satellite_upgrader'
@@ -24,8 +30,15 @@ class SatelliteUpgrader(Actor):
             try:
                 run(['sed', '-i', '/data_directory/d', '/var/lib/pgsql/data/postgresql.conf'])
                 run(['systemctl', 'start', 'postgresql'])
-                run(['runuser', '-u', 'postgres', '--', 'reindexdb', '-a'])
-                if facts.postgresql.has_pulp_ansible_semver:
+                reindexed = True
+                if config.get_env('LEAPP_SATELLITE_COLLATION_REINDEX', '0') == '1':
+                    reindexed = satellite_upgrader.reindex_collatable_indexes()
+                    if not reindexed:
+                        api.current_logger().error('Failed to reindex the database: some indexes were not rebuilt')
+                else:
+                    run(['runuser', '-u', 'postgres', '--', 'reindexdb', '-a'])
+                # Refresh the collation version only when the indexes using it were rebuilt
+                if reindexed and facts.postgresql.has_pulp_ansible_semver:
                     run(['runuser', '-c',
                          'echo "ALTER COLLATION pulp_ansible_semver REFRESH VERSION;" | psql pulpcore',
                          'postgres'])
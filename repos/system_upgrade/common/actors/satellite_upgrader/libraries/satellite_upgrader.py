@@ -0,0 +1,73 @@
+import multiprocessing
+import time
+from multiprocessing.pool import ThreadPool
+
+from leapp.libraries.stdlib import api, CalledProcessError, run
+
+# Indexes using a collation provided by glibc (the database default or a libc collation) or by ICU (e.g. the
+# pulp_ansible_semver collation), which are affected by the glibc and ICU collation changes between major
+# versions of the system. See https://wiki.postgresql.org/wiki/Locale_data_changes
+COLLATABLE_INDEXES_QUERY = (
+    "SELECT DISTINCT s.indexrelid::regclass::text"
+    " FROM (SELECT indexrelid, indcollation[i] coll FROM pg_index, generate_subscripts(indcollation, 1) g(i)) s"
+    " JOIN pg_collation c ON s.coll = c.oid"
+    " WHERE c.collprovider IN ('d', 'c', 'i') AND c.collname NOT IN ('C', 'POSIX')"
+    " ORDER BY 1"
+)
+DATABASES_QUERY = 'SELECT datname FROM pg_database WHERE datallowconn ORDER BY datname'
+
+
+def _psql(database, query):
+    """
+    Execute the query in the database and return rows of the result
+    """
+    cmd = ['runuser', '-u', 'postgres', '--', 'psql', '--no-psqlrc', '--tuples-only', '--no-align',
+           '--dbname', database, '--command', query]
+    return [line for line in run(cmd, split=True)['stdout'] if line]
+
+
+def get_collatable_indexes(database):
+    return _psql(database, COLLATABLE_INDEXES_QUERY)
+
+
+def _reindex_index(database_index):
+    database, index = database_index
+    try:
+        _psql(database, 'REINDEX INDEX {}'.format(index))
+    except CalledProcessError as e:
+        api.current_logger().error('Failed to reindex {} in the {} database: {}'.format(index, database, str(e)))
+        return False
+    return True
+
+
+def reindex_collatable_indexes(jobs=None):
+    """
+    Rebuild indexes affected by the glibc and ICU collation changes in all databases
+
+    Only indexes using a collation provided by glibc or ICU are rebuilt, instead of all indexes in all databases.
+    Indexes of each database are rebuilt by the given number of concurrent jobs (number of CPUs by default).
+
+    :return: True if all the indexes have been rebuilt
+    """
+    jobs = jobs or multiprocessing.cpu_count()
+    success = True
+    for database in _psql('postgres', DATABASES_QUERY):
+        start = time.time()
+        indexes = get_collatable_indexes(database)
+        if not indexes:
+            api.current_logger().info('No indexes to rebuild in the {} database.'.format(database))
+            continue
+        api.current_actor().show_message(
+            'Re-indexing {} indexes in the {} database using {} jobs.'.format(
+                len(indexes), database, min(jobs, len(indexes))))
+
+        pool = ThreadPool(min(jobs, len(indexes)))
+        try:
+            results = pool.map(_reindex_index, [(database, index) for index in indexes])
+        finally:
+            pool.close()
+            pool.join()
+        success = success and all(results)
+        api.current_logger().info('Rebuilt {} of {} indexes in the {} database in {:.1f}s.'.format(
+            results.count(True), len(indexes), database, time.time() - start))
+    return success
@@ -0,0 +1,78 @@
+import pytest
+
+from leapp.libraries.actor import satellite_upgrader
+from leapp.libraries.common.testutils import CurrentActorMocked, logger_mocked
+from leapp.libraries.stdlib import api, CalledProcessError
+
+
+class MockedActor(CurrentActorMocked):
+    def __init__(self):
+        super(MockedActor, self).__init__()
+        self.messages = []
+
+    def show_message(self, message):
+        self.messages.append(message)
+
+
+class MockedPsql(object):
+    def __init__(self, indexes, failing=()):
+        self.indexes = indexes
+        self.failing = failing
+        self.reindexed = []
+
+    def __call__(self, cmd, split=False):
+        assert cmd[:4] == ['runuser', '-u', 'postgres', '--'] and split
+        database, query = cmd[cmd.index('--dbname') + 1], cmd[cmd.index('--command') + 1]
+        if query == satellite_upgrader.DATABASES_QUERY:
+            return {'stdout': sorted(self.indexes)}
+        if query == satellite_upgrader.COLLATABLE_INDEXES_QUERY:
+            return {'stdout': self.indexes[database] + ['']}
+        assert query.startswith('REINDEX INDEX ')
+        index = query[len('REINDEX INDEX '):]
+        if index in self.failing:
+            raise CalledProcessError('failed', cmd, {'exit_code': 1})
+        self.reindexed.append((database, index))
+        return {'stdout': []}
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_reindex_collatable_indexes(monkeypatch, jobs):
+    psql = MockedPsql({
+        'candlepin': ['cp_consumer_uuid_key', 'public."CamelCase_idx"'],
+        'foreman': ['index_hosts_on_name'] + ['index_{}'.format(i) for i in range(20)],
+        'template1': [],
+    })
+    actor = MockedActor()
+    monkeypatch.setattr(api, 'current_actor', actor)
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(satellite_upgrader, 'run', psql)
+
+    assert satellite_upgrader.reindex_collatable_indexes(jobs=jobs)
+
+    expected = [(database, index) for database, indexes in psql.indexes.items() for index in indexes]
+    assert sorted(psql.reindexed) == sorted(expected)
+    assert len(actor.messages) == 2
+    assert 'Re-indexing 21 indexes in the foreman database using {} jobs.'.format(min(jobs, 21)) in actor.messages
+
+
+def test_reindex_collatable_indexes_icu(monkeypatch):
+    # pulp_ansible_semver is an ICU collation, its version is refreshed once the indexes using it are rebuilt
+    assert "collprovider IN ('d', 'c', 'i')" in satellite_upgrader.COLLATABLE_INDEXES_QUERY
+    psql = MockedPsql({'pulpcore': ['ansible_collectionversion_semver_idx']})
+    monkeypatch.setattr(api, 'current_actor', MockedActor())
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(satellite_upgrader, 'run', psql)
+
+    assert satellite_upgrader.reindex_collatable_indexes()
+    assert psql.reindexed == [('pulpcore', 'ansible_collectionversion_semver_idx')]
+
+
+def test_reindex_collatable_indexes_failed(monkeypatch):
+    psql = MockedPsql({'foreman': ['index_a', 'index_b', 'index_c']}, failing=('index_b',))
+    monkeypatch.setattr(api, 'current_actor', MockedActor())
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(satellite_upgrader, 'run', psql)
+
+    assert not satellite_upgrader.reindex_collatable_indexes(jobs=2)
+    assert sorted(psql.reindexed) == [('foreman', 'index_a'), ('foreman', 'index_c')]
+    assert any('index_b' in msg for msg in api.current_logger.errmsg)
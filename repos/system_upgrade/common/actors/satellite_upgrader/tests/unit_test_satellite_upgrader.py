@@ -1,5 +1,7 @@
 from multiprocessing import Manager
 
+from leapp.libraries.common import config
+from leapp.libraries.stdlib import CalledProcessError
 from leapp.models import SatelliteFacts, SatellitePostgresqlFacts
 from leapp.snactor.fixture import current_actor_context
 
@@ -14,6 +16,17 @@ class MockedRun(object):
         return {}
 
 
+class MockedRunFailingReindex(MockedRun):
+    def __call__(self, cmd, *args, **kwargs):
+        super(MockedRunFailingReindex, self).__call__(cmd, *args, **kwargs)
+        if 'psql' not in cmd:
+            return {}
+        query = cmd[-1]
+        if query.startswith('REINDEX INDEX '):
+            raise CalledProcessError('failed', cmd, {'exit_code': 1})
+        return {'stdout': ['foreman'] if 'pg_database' in query else ['index_hosts_on_name']}
+
+
 def test_run_installer(monkeypatch, current_actor_context):
     mocked_run = MockedRun()
     monkeypatch.setattr('leapp.libraries.stdlib.run', mocked_run)
@@ -66,3 +79,16 @@ def test_run_reindexdb_with_pulp_ansible(monkeypatch, current_actor_context):
                                       'echo "ALTER COLLATION pulp_ansible_semver REFRESH VERSION;" | psql pulpcore',
                                       'postgres']
     assert mocked_run.commands[4] == ['foreman-installer', '--disable-system-checks']
+
+
+def test_run_collation_reindex_failed(monkeypatch, current_actor_context):
+    mocked_run = MockedRunFailingReindex()
+    monkeypatch.setattr('leapp.libraries.stdlib.run', mocked_run)
+    monkeypatch.setattr(config, 'get_env', lambda x, y: '1' if x == 'LEAPP_SATELLITE_COLLATION_REINDEX' else y)
+    current_actor_context.feed(SatelliteFacts(has_foreman=True,
+                                              postgresql=SatellitePostgresqlFacts(local_postgresql=True,
+                                                                                  has_pulp_ansible_semver=True)))
+    current_actor_context.run()
+    # the collation version is not refreshed when indexes were not rebuilt
+    assert not any('pulp_ansible_semver' in ' '.join(cmd) for cmd in mocked_run.commands)
+    assert mocked_run.commands[-1] == ['foreman-installer', '--disable-system-checks']
@@ -1,6 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import scancpu
-from leapp.models import CPUInfo, DetectedDeviceOrDriver, DeviceDriverDeprecationData
+from leapp.models import CPUInfo, DetectedDeviceOrDriver, DeviceDriverDeprecationDataIndex
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
 
@@ -8,7 +8,7 @@ class ScanCPU(Actor):
     """Scan CPUs of the machine."""
 
     name = 'scancpu'
-    consumes = (DeviceDriverDeprecationData,)
+    consumes = (DeviceDriverDeprecationDataIndex,)
     produces = (CPUInfo, DetectedDeviceOrDriver)
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
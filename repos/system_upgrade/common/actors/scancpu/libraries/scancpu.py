@@ -1,10 +1,11 @@
 import json
 import re
 
+from leapp.libraries.common import devicedriverdeprecation
 from leapp.libraries.common.config import architecture
 from leapp.libraries.common.config.version import get_source_major_version
 from leapp.libraries.stdlib import api, CalledProcessError, run
-from leapp.models import CPUInfo, DetectedDeviceOrDriver, DeviceDriverDeprecationData
+from leapp.models import CPUInfo, DetectedDeviceOrDriver
 
 LSCPU_NAME_VALUE = re.compile(r'^(?P<name>[^:]+):[^\S\n]+(?P<value>.+)\n?', flags=re.MULTILINE)
 PPC64LE_MODEL = re.compile(r'\d+\.\d+ \(pvr (?P<family>[0-9a-fA-F]+) 0*[0-9a-fA-F]+\)')
@@ -42,13 +43,7 @@ def _get_cpu_flags(lscpu):
 
 
 def _get_cpu_entries_for(arch_prefix):
-    result = []
-    for message in api.consume(DeviceDriverDeprecationData):
-        result.extend([
-            entry for entry in message.entries
-            if entry.device_type == 'cpu' and entry.device_id.startswith(arch_prefix)
-        ])
-    return result
+    return devicedriverdeprecation.get_index().get_cpu_entries(arch_prefix)
 
 
 def _is_detected_aarch64(lscpu, entry):
@@ -8,6 +8,8 @@ from leapp.models import CustomModifications
 
 LEAPP_REPO_DIRS = ['/usr/share/leapp-repository']
 LEAPP_PACKAGES_TO_IGNORE = ['snactor']
+# actor.py file: name of the actor
+_ACTOR_NAMES = {}
 
 
 def _get_dirs_to_check(component):
@@ -24,6 +26,34 @@ def _get_rpms_to_check(component=None):
     return rpms.get_leapp_packages(components=[rpms.LeappComponents.REPOSITORY, rpms.LeappComponents.FRAMEWORK])
 
 
+def _parse_actor_name(actor_file):
+    """
+    Return the name attribute of the actor defined in the actor.py file, empty string if not found
+    """
+    data = None
+    with open(actor_file) as f:
+        try:
+            data = ast.parse(f.read())
+        except TypeError:
+            api.current_logger().warning('An error occurred while parsing %s, can not deduce actor name', actor_file)
+            return ''
+    # NOTE(ivasilev) Making proper syntax analysis is not the goal here, so let's get away with the bare minimum.
+    # An actor file will have an Actor ClassDef with a name attribute and a process function defined
+    actor = next((obj for obj in data.body if isinstance(obj, ast.ClassDef) and obj.name and
+                  any(isinstance(o, ast.FunctionDef) and o.name == 'process' for o in obj.body)), None)
+    # NOTE(ivasilev) obj.name attribute refers only to Class name, so for fetching name attribute need to go
+    # deeper
+    if actor:
+        try:
+            actor_name = next((expr.value.s for expr in actor.body
+                               if isinstance(expr, ast.Assign) and expr.targets[-1].id == 'name'), None)
+        except (AttributeError, IndexError):
+            api.current_logger().warning("Syntax Analysis for %d has failed", actor_file)
+            actor_name = None
+        return actor_name or ''
+    return ''
+
+
 def deduce_actor_name(a_file):
     """
     A helper to map an actor/library to the actor name
@@ -36,28 +66,11 @@ def deduce_actor_name(a_file):
     # In case this function has been called on a non-actor file, let's go straight to recursive call on the assumed
     # location of the actor file.
     if os.path.basename(a_file) == 'actor.py':
-        data = None
-        with open(a_file) as f:
-            try:
-                data = ast.parse(f.read())
-            except TypeError:
-                api.current_logger().warning('An error occurred while parsing %s, can not deduce actor name', a_file)
-                return ''
-        # NOTE(ivasilev) Making proper syntax analysis is not the goal here, so let's get away with the bare minimum.
-        # An actor file will have an Actor ClassDef with a name attribute and a process function defined
-        actor = next((obj for obj in data.body if isinstance(obj, ast.ClassDef) and obj.name and
-                      any(isinstance(o, ast.FunctionDef) and o.name == 'process' for o in obj.body)), None)
-        # NOTE(ivasilev) obj.name attribute refers only to Class name, so for fetching name attribute need to go
-        # deeper
-        if actor:
-            try:
-                actor_name = next((expr.value.s for expr in actor.body
-                                   if isinstance(expr, ast.Assign) and expr.targets[-1].id == 'name'), None)
-            except (AttributeError, IndexError):
-                api.current_logger().warning("Syntax Analysis for %d has failed", a_file)
-                actor_name = None
-            if actor_name:
-                return actor_name
+        # NOTE: libraries and files of an actor resolve to the same actor.py, parse it just once
+        if a_file not in _ACTOR_NAMES:
+            _ACTOR_NAMES[a_file] = _parse_actor_name(a_file)
+        if _ACTOR_NAMES[a_file]:
+            return _ACTOR_NAMES[a_file]
 
     # Assuming here we are dealing with a library or a file, so let's discover actor filename and deduce actor name
     # from it. Actor is expected to be found under ../../actor.py
@@ -95,53 +108,89 @@ def _modification_model(filename, change_type, component, rpm_checks_str=''):
                                actor_name=deduce_actor_name(filename), rpm_checks_str=rpm_checks_str)
 
 
-def check_for_modifications(component):
+def _get_package_files(packages):
+    """
+    Return mapping of files installed by the packages to the names of the packages
+
+    All packages are queried by a single execution of rpm.
+    """
+    if not packages:
+        return {}
+    res = _run_command(['rpm', '-q', '--queryformat', r'[%{=NAME}\t%{FILENAMES}\n]'] + packages,
+                       'Could not get a list of installed files from rpms {}'.format(', '.join(packages)))
+    package_files = {}
+    for line in res:
+        name, dummy_sep, filename = line.partition('\t')
+        if filename:
+            package_files[filename] = name
+    return package_files
+
+
+def _get_files_in_dirs(dirs):
+    """
+    Yield regular files (not symlinks) found in the directories
+    """
+    for directory in dirs:
+        for dirpath, dummy_dirnames, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if not os.path.islink(path):
+                    yield path
+
+
+def check_for_modifications(components=('framework', 'repository')):
     """
     This will return a list of any untypical files or changes to shipped leapp files discovered on the system.
     An empty list means that no modifications have been found.
+
+    Packages of all components are queried and verified at once, modifications are listed per component.
     """
-    rpms = _get_rpms_to_check(component)
-    dirs = _get_dirs_to_check(component)
-    source_of_truth = []
-    leapp_files = []
+    rpm_components = {rpm: component for component in components for rpm in _get_rpms_to_check(component)}
+    rpms = sorted(rpm_components)
     # Let's collect data about what should have been installed from rpm
-    for rpm in rpms:
-        res = _run_command(['rpm', '-ql', rpm], 'Could not get a list of installed files from rpm {}'.format(rpm))
-        source_of_truth.extend(res)
-    # Let's collect data about what's really on the system
-    for directory in dirs:
-        res = _run_command(['find', directory, '-type', 'f'],
-                           'Could not get a list of leapp files from {}'.format(directory))
-        leapp_files.extend(res)
-    # Let's check for unexpected additions
-    custom_files = sorted(set(leapp_files) - set(source_of_truth))
+    source_of_truth = _get_package_files(rpms)
+    # Let's check for unexpected additions in what's really on the system
+    custom_files = {component: sorted(f for f in _get_files_in_dirs(_get_dirs_to_check(component))
+                                      if f not in source_of_truth)
+                    for component in components}
     # Now let's check for modifications
-    modified_files = []
-    modified_configs = []
-    for rpm in rpms:
+    modified_files = {component: [] for component in components}
+    modified_configs = {component: [] for component in components}
+    res = []
+    if rpms:
         res = _run_command(
-                ['rpm', '-V', '--nomtime', rpm], 'Could not check authenticity of the files from {}'.format(rpm),
+                ['rpm', '-V', '--nomtime'] + rpms,
+                'Could not check authenticity of the files from {}'.format(', '.join(rpms)),
                 # NOTE(ivasilev) check is False here as in case of any changes found exit code will be 1
                 checked=False)
-        if res:
-            api.current_logger().warning('Modifications to leapp files detected!\n%s', res)
-            for modification_str in res:
-                modification = tuple(modification_str.split())
-                if len(modification) == 3 and modification[1] == 'c':
-                    # Dealing with a configuration that will be displayed as ('S.5......', 'c', '/file/path')
-                    modified_configs.append(modification)
-                else:
-                    # Modification of any other rpm file detected
-                    modified_files.append(modification)
-    return ([_modification_model(filename=f[1], component=component, rpm_checks_str=f[0], change_type='modified')
+    if res:
+        api.current_logger().warning('Modifications to leapp files detected!\n%s', res)
+    for modification_str in res:
+        modification = tuple(modification_str.split())
+        if len(modification) < 2:
+            continue
+        component = rpm_components.get(source_of_truth.get(modification[-1]), components[-1])
+        if len(modification) == 3 and modification[1] == 'c':
+            # Dealing with a configuration that will be displayed as ('S.5......', 'c', '/file/path')
+            modified_configs[component].append(modification)
+        else:
+            # Modification of any other rpm file detected
+            modified_files[component].append(modification)
+
+    modifications = []
+    for component in components:
+        modifications.extend(
+            [_modification_model(filename=f[-1], component=component, rpm_checks_str=f[0], change_type='modified')
              # Let's filter out pyc files not to clutter the output as pyc will be present even in case of
              # a plain open & save-not-changed that we agreed not to react upon.
-             for f in modified_files if not f[1].endswith('.pyc')] +
+             for f in modified_files[component] if not f[-1].endswith('.pyc')] +
             [_modification_model(filename=f, component=component, change_type='custom')
-             for f in custom_files] +
-            [_modification_model(filename=f[2], component='configuration', rpm_checks_str=f[0], change_type='modified')
-            for f in modified_configs])
+             for f in custom_files[component]] +
+            [_modification_model(filename=f[2], component='configuration', rpm_checks_str=f[0],
+                                 change_type='modified')
+             for f in modified_configs[component]])
+    return modifications
 
 
 def scan():
-    return check_for_modifications('framework') + check_for_modifications('repository')
+    return check_for_modifications()
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 
 from leapp.libraries.actor import scancustommodifications
@@ -59,27 +61,35 @@ def test_deduce_actor_name_from_file(a_file, name):
 
 
 def mocked__run_command(list_of_args, log_message, checked=True):
-    if list_of_args == ['rpm', '-ql', 'leapp-upgrade-el8toel9']:
-        # get source of truth
-        return FILES_FROM_RPM.strip().split('\n')
-    if list_of_args and list_of_args[0] == 'find':
-        # listing files in directory
-        return FILES_ON_SYSTEM.strip().split('\n')
-    if list_of_args == ['rpm', '-V', '--nomtime', 'leapp-upgrade-el8toel9']:
-        # checking authenticity
+    if list_of_args[:2] == ['rpm', '-q']:
+        # get source of truth, all packages are queried at once
+        assert list_of_args[-3:] == ['leapp', 'leapp-upgrade-el8toel9', 'python3-leapp']
+        return ['leapp-upgrade-el8toel9\t{}'.format(f) for f in FILES_FROM_RPM.strip().split('\n')]
+    if list_of_args[:3] == ['rpm', '-V', '--nomtime']:
+        # checking authenticity, all packages are verified at once
+        assert list_of_args[3:] == ['leapp', 'leapp-upgrade-el8toel9', 'python3-leapp']
         return VERIFIED_FILES.strip().split('\n')
     return []
 
 
+def mocked__get_files_in_dirs(dirs):
+    # listing files in directory
+    if dirs:
+        return iter(FILES_ON_SYSTEM.strip().split('\n'))
+    return iter([])
+
+
 def test_check_for_modifications(monkeypatch):
     monkeypatch.setattr(api, 'current_actor', CurrentActorMocked(arch='x86_64', src_ver='8.9', dst_ver='9.3'))
     monkeypatch.setattr(scancustommodifications, '_run_command', mocked__run_command)
-    modifications = scancustommodifications.check_for_modifications('repository')
+    monkeypatch.setattr(scancustommodifications, '_get_files_in_dirs', mocked__get_files_in_dirs)
+    modifications = scancustommodifications.check_for_modifications()
     modified = [m for m in modifications if m.type == 'modified']
     custom = [m for m in modifications if m.type == 'custom']
     configurations = [m for m in modifications if m.component == 'configuration']
     assert len(modified) == 3
     assert modified[0].filename == 'repos/system_upgrade/el8toel9/actors/xorgdrvfact/libraries/xorgdriverlib.py'
+    assert modified[0].component == 'repository'
     assert modified[0].rpm_checks_str == '.......T.'
     assert len(custom) == 3
     assert custom[0].filename == '/some/unrelated/to/leapp/file'
@@ -87,3 +97,41 @@ def test_check_for_modifications(monkeypatch):
     assert len(configurations) == 1
     assert configurations[0].filename == 'etc/leapp/files/pes-events.json'
     assert configurations[0].rpm_checks_str == 'S.5....T.'
+
+
+def test_check_for_modifications_no_packages(monkeypatch):
+    def mocked_run_command(list_of_args, log_message, checked=True):
+        assert False, 'rpm must not be executed without packages: {}'.format(list_of_args)
+
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked(arch='x86_64', src_ver='8.9', dst_ver='9.3'))
+    monkeypatch.setattr(scancustommodifications, '_get_rpms_to_check', lambda component=None: [])
+    monkeypatch.setattr(scancustommodifications, '_run_command', mocked_run_command)
+    monkeypatch.setattr(scancustommodifications, '_get_files_in_dirs', mocked__get_files_in_dirs)
+    modifications = scancustommodifications.check_for_modifications()
+    assert len(modifications) == len(FILES_ON_SYSTEM.strip().split('\n'))
+    assert all(m.type == 'custom' and m.component == 'repository' for m in modifications)
+
+
+def test_get_files_in_dirs(tmpdir):
+    tmpdir.mkdir('actors').join('actor.py').write('')
+    tmpdir.join('file').write('')
+    os.symlink(str(tmpdir.join('file')), str(tmpdir.join('link')))
+
+    files = sorted(scancustommodifications._get_files_in_dirs([str(tmpdir)]))
+
+    assert files == [str(tmpdir.join('actors', 'actor.py')), str(tmpdir.join('file'))]
+
+
+def test_deduce_actor_name_parsed_once(monkeypatch):
+    parsed = []
+
+    def mocked_parse_actor_name(actor_file):
+        parsed.append(actor_file)
+        return 'check_memcached'
+
+    monkeypatch.setattr(scancustommodifications, '_ACTOR_NAMES', {})
+    monkeypatch.setattr(scancustommodifications, '_parse_actor_name', mocked_parse_actor_name)
+    for a_file in ('repos/system_upgrade/el7toel8/actors/checkmemcached/actor.py',
+                   'repos/system_upgrade/el7toel8/actors/checkmemcached/libraries/checkmemcached.py'):
+        assert scancustommodifications.deduce_actor_name(a_file) == 'check_memcached'
+    assert parsed == ['repos/system_upgrade/el7toel8/actors/checkmemcached/actor.py']
@@ -1,5 +1,6 @@
 from leapp import reporting
 from leapp.actors import Actor
+from leapp.libraries.common import upgradetimeline
 from leapp.models import SelinuxRelabelDecision
 from leapp.reporting import create_report, Report
 from leapp.tags import FinalizationPhaseTag, IPUWorkflowTag
@@ -27,6 +28,7 @@ class ScheduleSeLinuxRelabeling(Actor):
                 try:
                     with open('/.autorelabel', 'w'):
                         pass
+                    upgradetimeline.mark_stage('selinux-relabel-scheduled')
                     create_report([
                         reporting.Title('SElinux scheduled for relabelling'),
                         reporting.Summary(
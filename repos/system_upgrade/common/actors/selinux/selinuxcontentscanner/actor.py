@@ -1,5 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import selinuxcontentscanner
+from leapp.libraries.common import factcache
 from leapp.models import RpmTransactionTasks, SELinuxCustom, SELinuxFacts, SELinuxModules, SELinuxRequestRPMs
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
@@ -25,6 +26,9 @@ class SELinuxContentScanner(Actor):
             if not fact.enabled:
                 return
 
+        factcache.run_cached('selinux_content', selinuxcontentscanner.get_fact_cache_key, self._scan)
+
+    def _scan(self):
         (semodule_list, template_list, rpms_to_install,) = selinuxcontentscanner.get_selinux_modules()
 
         self.produce(
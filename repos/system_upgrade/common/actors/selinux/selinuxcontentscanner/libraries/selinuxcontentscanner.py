@@ -2,6 +2,7 @@ import os
 import re
 from shutil import rmtree
 
+from leapp.libraries.common import factcache
 from leapp.libraries.common.config import version
 from leapp.libraries.stdlib import api, CalledProcessError, run
 from leapp.models import SELinuxModule
@@ -91,6 +92,15 @@ def list_selinux_modules():
     return modules
 
 
+def get_fact_cache_key():
+    """
+    Return key invalidating cached SELinux customizations
+
+    Both policy modules and semanage customizations are stored in the policy store.
+    """
+    return factcache.tree_state('/etc/selinux', '/var/lib/selinux')
+
+
 def get_selinux_modules():
     """
     Read all custom SELinux policy modules from the system
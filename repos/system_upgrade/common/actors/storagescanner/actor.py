@@ -1,5 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import storagescanner
+from leapp.libraries.common import factcache
 from leapp.models import StorageInfo
 from leapp.reporting import Report
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
@@ -19,4 +20,5 @@ class StorageScanner(Actor):
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
     def process(self):
-        self.produce(storagescanner.get_storage_info())
+        factcache.run_cached('storage_info', storagescanner.get_fact_cache_key,
+                             lambda: self.produce(storagescanner.get_storage_info()))
@@ -5,6 +5,7 @@ import subprocess
 import pyudev
 
 from leapp import reporting
+from leapp.libraries.common import factcache
 from leapp.libraries.stdlib import api
 from leapp.models import (
     FstabEntry,
@@ -276,6 +277,15 @@ def _get_systemd_mount_info():
         )
 
 
+def get_fact_cache_key():
+    """ Return key invalidating cached storage info """
+    return [
+        factcache.file_digest('/proc/partitions', '/proc/mounts'),
+        factcache.path_state('/etc/fstab'),
+        factcache.tree_state('/etc/lvm/backup', '/dev/mapper', '/dev/disk/by-id', '/dev/disk/by-uuid'),
+    ]
+
+
 def get_storage_info():
     """ Collect multiple info about storage and return it """
     return StorageInfo(
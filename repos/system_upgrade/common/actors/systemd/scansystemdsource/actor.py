@@ -1,5 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import scansystemdsource
+from leapp.libraries.common import factcache
 from leapp.models import SystemdBrokenSymlinksSource, SystemdServicesInfoSource, SystemdServicesPresetInfoSource
 from leapp.tags import FactsPhaseTag, IPUWorkflowTag
 
@@ -22,4 +23,4 @@ class ScanSystemdSource(Actor):
     tags = (IPUWorkflowTag, FactsPhaseTag)
 
     def process(self):
-        scansystemdsource.scan()
+        factcache.run_cached('systemd_source', scansystemdsource.get_fact_cache_key, scansystemdsource.scan)
@@ -1,9 +1,19 @@
 from leapp.exceptions import StopActorExecutionError
-from leapp.libraries.common import systemd
+from leapp.libraries.common import factcache, systemd
 from leapp.libraries.stdlib import api, CalledProcessError
 from leapp.models import SystemdBrokenSymlinksSource, SystemdServicesInfoSource, SystemdServicesPresetInfoSource
 
 
+def get_fact_cache_key():
+    """ Return key invalidating cached info about systemd services """
+    return factcache.tree_state(
+        '/etc/systemd/system',
+        '/usr/lib/systemd/system',
+        '/etc/systemd/system-preset',
+        '/usr/lib/systemd/system-preset',
+    )
+
+
 def scan():
     try:
         broken_symlinks = systemd.get_broken_symlinks()
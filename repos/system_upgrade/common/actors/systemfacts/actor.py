@@ -1,5 +1,6 @@
 from leapp.actors import Actor
 from leapp.libraries.actor import systemfacts
+from leapp.libraries.common import factcache
 from leapp.libraries.common.config import architecture
 from leapp.models import (
     ActiveKernelModulesFacts,
@@ -51,7 +52,9 @@ class SystemFactsActor(Actor):
 
     def process(self):
         self.produce(systemfacts.get_sysctls_status())
-        self.produce(systemfacts.get_active_kernel_modules_status(self.log))
+        # probing signatures of modules is expensive, reuse them while the same modules are loaded
+        factcache.run_cached('active_kernel_modules', lambda: factcache.file_digest('/proc/modules'),
+                             lambda: self.produce(systemfacts.get_active_kernel_modules_status(self.log)))
         self.produce(systemfacts.get_system_users_status())
         self.produce(systemfacts.get_system_groups_status())
         self.produce(systemfacts.get_repositories_status())
@@ -12,6 +12,9 @@ class XFSInfoScanner(Actor):
     using ftype = 0. The actor will produce a message with the findings.
     It will contain a list of all XFS mountpoints with ftype = 0 so that those mountpoints can be handled appropriately
     for the overlayfs that is going to be created.
+
+    The XFS geometry is read in-process (XFS_IOC_FSGEOMETRY ioctl) for all mountpoints concurrently. The xfs_info
+    utility is executed only for mountpoints where the geometry cannot be obtained this way.
     """
 
     name = 'xfs_info_scanner'
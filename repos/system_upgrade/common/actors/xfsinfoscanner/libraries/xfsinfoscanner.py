@@ -1,8 +1,21 @@
+import fcntl
 import os
+import struct
+from multiprocessing.pool import ThreadPool
 
+from leapp.libraries.common.config import architecture
 from leapp.libraries.stdlib import api, CalledProcessError, run
 from leapp.models import StorageInfo, XFSPresence
 
+# struct xfs_fsop_geom_v1 from xfs_fs.h - 8x __u32, 4x __u64, 16B uuid, 7x __u32 + padding
+_XFS_FSOP_GEOM_V1_FMT = '=8I4Q16s2Ii4I4x'
+_XFS_FSOP_GEOM_V1_SIZE = struct.calcsize(_XFS_FSOP_GEOM_V1_FMT)
+_XFS_FSOP_GEOM_V1_FLAGS_IDX = 16
+XFS_FSOP_GEOM_FLAGS_FTYPE = 0x10000
+
+# Upper bound of mountpoints inspected at the same time
+MAX_WORKERS = 8
+
 
 def scan_xfs_fstab(data):
     mountpoints = set()
@@ -22,11 +35,36 @@ def scan_xfs_mount(data):
     return mountpoints
 
 
-def is_xfs_without_ftype(mp):
-    if not os.path.ismount(mp):
-        # Check if mp is actually a mountpoint
-        api.current_logger().warning('{} is not mounted'.format(mp))
-        return False
+def _get_xfs_ioc_fsgeometry_v1():
+    """
+    Return XFS_IOC_FSGEOMETRY_V1 = _IOR('X', 100, struct xfs_fsop_geom_v1) for the architecture
+
+    The generic encoding of ioctl numbers (x86_64, aarch64, s390x) uses 14 bits
+    for the size and 2 bits for the direction, _IOC_READ is 2. The ppc64le one
+    uses 13 bits for the size and 3 bits for the direction, _IOC_READ is 2 too.
+    """
+    dir_shift = 29 if architecture.matches_architecture(architecture.ARCH_PPC64LE) else 30
+    return (2 << dir_shift) | (_XFS_FSOP_GEOM_V1_SIZE << 16) | (ord('X') << 8) | 100
+
+
+def _read_xfs_geometry_flags(mp):
+    """
+    Return the geometry flags of the XFS filesystem mounted on the given mountpoint
+
+    The XFS_IOC_FSGEOMETRY_V1 ioctl is used as it is supported by all kernels
+    we are interested in and it already reports the ftype feature flag.
+
+    :raises EnvironmentError: When the ioctl cannot be performed on the mountpoint
+    """
+    fd = os.open(mp, os.O_RDONLY)
+    try:
+        buf = fcntl.ioctl(fd, _get_xfs_ioc_fsgeometry_v1(), b'\0' * _XFS_FSOP_GEOM_V1_SIZE)
+    finally:
+        os.close(fd)
+    return struct.unpack(_XFS_FSOP_GEOM_V1_FMT, buf)[_XFS_FSOP_GEOM_V1_FLAGS_IDX]
+
+
+def _is_xfs_without_ftype_xfs_info(mp):
     try:
         xfs_info = run(['/usr/sbin/xfs_info', '{}'.format(mp)], split=True)
     except CalledProcessError as err:
@@ -40,6 +78,40 @@ def is_xfs_without_ftype(mp):
     return False
 
 
+def is_xfs_without_ftype(mp):
+    if not os.path.ismount(mp):
+        # Check if mp is actually a mountpoint
+        api.current_logger().warning('{} is not mounted'.format(mp))
+        return False
+
+    try:
+        flags = _read_xfs_geometry_flags(mp)
+    except (EnvironmentError, struct.error) as err:
+        api.current_logger().debug(
+            'Cannot read XFS geometry of {} ({}), falling back to xfs_info'.format(mp, err)
+        )
+        return _is_xfs_without_ftype_xfs_info(mp)
+
+    return not flags & XFS_FSOP_GEOM_FLAGS_FTYPE
+
+
+def _filter_xfs_without_ftype(mountpoints):
+    """
+    Return mountpoints with XFS without ftype, inspecting them concurrently
+    """
+    mountpoints = sorted(mountpoints)
+    if len(mountpoints) < 2:
+        return [mp for mp in mountpoints if is_xfs_without_ftype(mp)]
+
+    pool = ThreadPool(min(len(mountpoints), MAX_WORKERS))
+    try:
+        results = pool.map(is_xfs_without_ftype, mountpoints)
+    finally:
+        pool.close()
+        pool.join()
+    return [mp for mp, without_ftype in zip(mountpoints, results) if without_ftype]
+
+
 def scan_xfs():
     storage_info_msgs = api.consume(StorageInfo)
     storage_info = next(storage_info_msgs, None)
@@ -54,7 +126,7 @@ def scan_xfs():
         mount_data = scan_xfs_mount(storage_info.mount)
 
     mountpoints = fstab_data | mount_data
-    mountpoints_ftype0 = list(filter(is_xfs_without_ftype, mountpoints))
+    mountpoints_ftype0 = _filter_xfs_without_ftype(mountpoints)
 
     # By now, we only have XFS mountpoints and check whether or not it has ftype = 0
     api.produce(XFSPresence(
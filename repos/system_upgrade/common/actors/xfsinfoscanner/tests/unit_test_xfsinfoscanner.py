@@ -1,7 +1,12 @@
+import fcntl
 import os
+import struct
+
+import pytest
 
 from leapp.libraries.actor import xfsinfoscanner
-from leapp.libraries.common.testutils import produce_mocked
+from leapp.libraries.common.config import architecture
+from leapp.libraries.common.testutils import CurrentActorMocked, produce_mocked
 from leapp.libraries.stdlib import api, CalledProcessError
 from leapp.models import FstabEntry, MountEntry, StorageInfo, SystemdMountEntry, XFSPresence
 
@@ -43,6 +48,10 @@ class run_mocked(object):
         return with_ftype
 
 
+def _geometry_unavailable(mp):
+    raise OSError(25, 'Inappropriate ioctl for device')
+
+
 def test_scan_xfs_fstab(monkeypatch):
     fstab_data_no_xfs = {
         "fs_spec": "/dev/mapper/fedora-home",
@@ -88,6 +97,7 @@ def test_scan_xfs_mount(monkeypatch):
 
 
 def test_is_xfs_without_ftype(monkeypatch):
+    monkeypatch.setattr(xfsinfoscanner, "_read_xfs_geometry_flags", _geometry_unavailable)
     monkeypatch.setattr(xfsinfoscanner, "run", run_mocked())
     monkeypatch.setattr(os.path, "ismount", lambda _: True)
 
@@ -104,6 +114,7 @@ def test_is_xfs_command_failed(monkeypatch):
                                  result=1)
     # not a mountpoint
     monkeypatch.setattr(os.path, "ismount", lambda _: False)
+    monkeypatch.setattr(xfsinfoscanner, "_read_xfs_geometry_flags", _geometry_unavailable)
     monkeypatch.setattr(xfsinfoscanner, "run", _run_mocked_exception)
     assert not xfsinfoscanner.is_xfs_without_ftype("/nosuchmountpoint")
     # a real mountpoint but something else caused command to fail
@@ -111,7 +122,58 @@ def test_is_xfs_command_failed(monkeypatch):
     assert not xfsinfoscanner.is_xfs_without_ftype("/nosuchmountpoint")
 
 
+def test_is_xfs_without_ftype_geometry(monkeypatch):
+    def _run_mocked_fail(*args, **kwargs):
+        assert False, 'xfs_info must not be executed when the geometry is available'
+
+    monkeypatch.setattr(os.path, "ismount", lambda _: True)
+    monkeypatch.setattr(xfsinfoscanner, "run", _run_mocked_fail)
+
+    monkeypatch.setattr(xfsinfoscanner, "_read_xfs_geometry_flags", lambda _: 0x0)
+    assert xfsinfoscanner.is_xfs_without_ftype("/var")
+
+    flags = xfsinfoscanner.XFS_FSOP_GEOM_FLAGS_FTYPE | 0x2
+    monkeypatch.setattr(xfsinfoscanner, "_read_xfs_geometry_flags", lambda _: flags)
+    assert not xfsinfoscanner.is_xfs_without_ftype("/var")
+
+
+@pytest.mark.parametrize('arch,request_number', [
+    (architecture.ARCH_X86_64, 0x80705864),
+    (architecture.ARCH_ARM64, 0x80705864),
+    (architecture.ARCH_S390X, 0x80705864),
+    (architecture.ARCH_PPC64LE, 0x40705864),
+])
+def test_read_xfs_geometry_flags(monkeypatch, arch, request_number):
+    geometry = [0] * 20
+    geometry[12] = b'\0' * 16
+    geometry[16] = xfsinfoscanner.XFS_FSOP_GEOM_FLAGS_FTYPE
+    ioctl_calls = []
+
+    def _ioctl_mocked(fd, request, buf):
+        ioctl_calls.append(request)
+        assert len(buf) == 112
+        return struct.pack(xfsinfoscanner._XFS_FSOP_GEOM_V1_FMT, *geometry)
+
+    monkeypatch.setattr(os, "open", lambda *args: 42)
+    monkeypatch.setattr(os, "close", lambda fd: None)
+    monkeypatch.setattr(fcntl, "ioctl", _ioctl_mocked)
+    monkeypatch.setattr(api, "current_actor", CurrentActorMocked(arch=arch))
+
+    assert xfsinfoscanner._read_xfs_geometry_flags("/var") == xfsinfoscanner.XFS_FSOP_GEOM_FLAGS_FTYPE
+    assert ioctl_calls == [request_number]
+
+
+def test_filter_xfs_without_ftype_concurrent(monkeypatch):
+    monkeypatch.setattr(xfsinfoscanner, "is_xfs_without_ftype", lambda mp: mp.startswith('/var'))
+    mountpoints = {'/', '/boot', '/var', '/var/log', '/home'}
+
+    assert xfsinfoscanner._filter_xfs_without_ftype(mountpoints) == ['/var', '/var/log']
+    assert xfsinfoscanner._filter_xfs_without_ftype({'/var'}) == ['/var']
+    assert xfsinfoscanner._filter_xfs_without_ftype(set()) == []
+
+
 def test_scan_xfs(monkeypatch):
+    monkeypatch.setattr(xfsinfoscanner, "_read_xfs_geometry_flags", _geometry_unavailable)
     monkeypatch.setattr(xfsinfoscanner, "run", run_mocked())
     monkeypatch.setattr(os.path, "ismount", lambda _: True)
 
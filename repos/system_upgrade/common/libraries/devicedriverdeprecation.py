@@ -0,0 +1,151 @@
+"""
+Lookups in the device and driver deprecation data
+
+The DeviceDriverDeprecationData message contains hundreds to thousands of
+entries. Actors detecting deprecated devices and drivers need only a few of
+them, so the load_device_driver_deprecation_data actor indexes the entries
+once by the identifiers the actors look for (PCI id, driver name, CPU
+architecture) and stores the index on the disk, keyed by the checksum of the
+data. The actors consume just the small DeviceDriverDeprecationDataIndex
+message, read only the part of the index they query and create models only
+for the matching entries.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from leapp.exceptions import StopActorExecutionError
+from leapp.libraries.stdlib import api
+from leapp.models import DeviceDriverDeprecationDataIndex, DeviceDriverDeprecationEntry
+
+INDEX_DIR = '/var/lib/leapp/device_driver_deprecation_index'
+INDEX_PARTS = ('pci', 'drivers', 'cpus')
+
+
+def normalize_pci_id(pci_id):
+    """
+    Return the PCI id without hexadecimal prefixes, e.g. '0x8086:0x1234' -> '8086:1234'
+    """
+    return pci_id.replace('0x', '')
+
+
+def get_checksum(entries):
+    """
+    Return checksum of the deprecation data
+
+    :param entries: Dumped DeviceDriverDeprecationEntry models
+    """
+    return hashlib.sha256(json.dumps(entries, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def build_index(entries):
+    """
+    Return parts of the index of the deprecation data
+
+    When more entries describe the same device or driver, the last one is used.
+
+    :param entries: Dumped DeviceDriverDeprecationEntry models
+    """
+    index = {part: {} for part in INDEX_PARTS}
+    for entry in entries:
+        if not entry['device_id']:
+            if entry['driver_name']:
+                index['drivers'][entry['driver_name']] = entry
+        elif entry['device_type'] == 'pci':
+            index['pci'][normalize_pci_id(entry['device_id'])] = entry
+        elif entry['device_type'] == 'cpu':
+            index['cpus'].setdefault(entry['device_id'].split(':', 1)[0], []).append(entry)
+    return index
+
+
+def store_index(entries):
+    """
+    Store the index of the deprecation data unless the index of the same data is stored already
+
+    Indexes of any other data are removed.
+
+    :param entries: Dumped DeviceDriverDeprecationEntry models
+    :return: DeviceDriverDeprecationDataIndex describing the stored index
+    :raises EnvironmentError: When the index cannot be stored
+    """
+    checksum = get_checksum(entries)
+    path = os.path.join(INDEX_DIR, checksum)
+    if not os.path.isdir(INDEX_DIR):
+        os.makedirs(INDEX_DIR)
+    for name in os.listdir(INDEX_DIR):
+        if name != checksum:
+            shutil.rmtree(os.path.join(INDEX_DIR, name))
+    if not os.path.isdir(path):
+        os.mkdir(path + '.tmp')
+        for part, data in build_index(entries).items():
+            with open(os.path.join(path + '.tmp', part + '.json'), 'w') as f:
+                json.dump(data, f)
+        os.rename(path + '.tmp', path)
+    return DeviceDriverDeprecationDataIndex(checksum=checksum, path=path)
+
+
+class DeviceDriverDeprecationIndex(object):
+    """
+    Index of device and driver deprecation entries
+
+    Parts of the index are read on the first lookup.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path to the stored index, None for an index without entries
+        """
+        self._path = path
+        self._parts = {}
+
+    def _read_part(self, part):
+        try:
+            with open(os.path.join(self._path, part + '.json')) as f:
+                return json.load(f)
+        except (EnvironmentError, ValueError) as err:
+            raise StopActorExecutionError(
+                'Cannot read the index of the device and driver deprecation data',
+                details={'details': str(err)}
+            )
+
+    def _get_part(self, part):
+        if part not in self._parts:
+            self._parts[part] = self._read_part(part) if self._path else {}
+        return self._parts[part]
+
+    def find_pci_device(self, pci_id):
+        """
+        Return the entry describing the PCI device, None if the device is not deprecated
+
+        :param pci_id: PCI id of the device, e.g. '8086:1234:8086:0001'
+        """
+        entry = self._get_part('pci').get(normalize_pci_id(pci_id))
+        return DeviceDriverDeprecationEntry(**entry) if entry else None
+
+    def find_driver(self, driver_name):
+        """
+        Return the entry describing the driver (not bound to a device), None if the driver is not deprecated
+        """
+        entry = self._get_part('drivers').get(driver_name)
+        return DeviceDriverDeprecationEntry(**entry) if entry else None
+
+    def get_cpu_entries(self, arch):
+        """
+        Return entries describing CPUs of the architecture
+
+        Entries have to be matched against the CPU further as their device_id can contain
+        sets and ranges of CPU models.
+        """
+        return [DeviceDriverDeprecationEntry(**entry) for entry in self._get_part('cpus').get(arch, ())]
+
+
+def get_index(context=api):
+    """
+    Return the index described by the consumed DeviceDriverDeprecationDataIndex message
+
+    :param context: context of the execution
+    """
+    message = next(context.consume(DeviceDriverDeprecationDataIndex), None)
+    return DeviceDriverDeprecationIndex(message.path if message else None)
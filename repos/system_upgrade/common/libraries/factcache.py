@@ -0,0 +1,199 @@
+"""
+Cache of facts collected by scanners in previous executions of leapp preupgrade
+
+Scanning the system takes a significant part of the FactsPhase, although
+the system usually does not change between consecutive executions of
+`leapp preupgrade`. Messages produced by a scan are stored together with
+an invalidation key describing the state of the system the facts have been
+collected from (e.g. mtimes of configuration files, content of files under
+/proc). When the key matches in the next execution, the stored messages are
+produced again instead of scanning the system.
+
+Every key implicitly covers the state of the RPM DB, the upgrade
+configuration (source and target versions, LEAPP_* environment variables)
+and the booted kernel, so any change of installed packages (including
+leapp itself) invalidates all cached facts.
+
+The cache is used only when LEAPP_FACT_CACHE is set:
+    1 - reuse valid cached facts, store facts of scans performed
+    rescan - always scan the system, store facts of the scans
+"""
+
+import hashlib
+import importlib
+import json
+import os
+
+from leapp import models
+from leapp.libraries.common.config import get_all_envs, get_env
+from leapp.libraries.stdlib import api
+from leapp.models.fields import ModelViolationError
+
+FACT_CACHE_DIR = '/var/lib/leapp/fact_cache'
+FACT_CACHE_VERSION = 1
+RPMDB_DIRS = ('/var/lib/rpm', '/usr/lib/sysimage/rpm')
+# Environment variables not affecting the collected facts
+ENV_IGNORE = ('LEAPP_FACT_CACHE', 'LEAPP_EXECUTION_ID')
+
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _lstat(path):
+    try:
+        stat = os.lstat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime, stat.st_size, stat.st_ino, stat.st_mode]
+
+
+def path_state(*paths):
+    """
+    Return state (mtime, size, inode, mode) of each path, None for missing ones
+
+    Suitable for regular files and for directories when only addition or removal
+    of their entries is relevant.
+    """
+    return [[path, _lstat(path)] for path in paths]
+
+
+def tree_state(*paths):
+    """
+    Return digest of states of all files and directories in the directory trees
+
+    Symlinks are not followed, their targets are part of the state instead.
+    """
+    states = []
+    for path in paths:
+        states.append([path, _lstat(path)])
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in dirnames + sorted(filenames):
+                entry = os.path.join(dirpath, name)
+                state = _lstat(entry)
+                if os.path.islink(entry):
+                    state = [os.readlink(entry)] + (state or [])
+                states.append([entry, state])
+    return _digest(states)
+
+
+def file_digest(*paths):
+    """
+    Return digest of contents of the files
+
+    Intended for files under /proc and /sys, which mtime does not reflect changes.
+    """
+    contents = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                contents.append([path, hashlib.sha256(f.read()).hexdigest()])
+        except EnvironmentError:
+            contents.append([path, None])
+    return contents
+
+
+def message_digest(*messages):
+    """
+    Return digest of the messages, e.g. of consumed messages the facts are derived from
+    """
+    return _digest([[type(msg).__name__, msg.dump()] for msg in messages])
+
+
+def _get_base_key():
+    configuration = api.current_actor().configuration
+    envs = sorted([env.name, env.value] for env in get_all_envs() if env.name not in ENV_IGNORE)
+    return [
+        FACT_CACHE_VERSION,
+        configuration.architecture,
+        configuration.kernel,
+        configuration.flavour,
+        [configuration.version.source, configuration.version.target],
+        envs,
+        tree_state(*RPMDB_DIRS),
+    ]
+
+
+def _cache_path(name):
+    return os.path.join(FACT_CACHE_DIR, '{}.json'.format(name))
+
+
+def _get_model(name, module):
+    model = getattr(models, name, None)
+    if model is None:
+        model = getattr(importlib.import_module(module), name)
+    return model
+
+
+def _load(name, key):
+    try:
+        with open(_cache_path(name)) as f:
+            entry = json.load(f)
+        if entry.get('key') != key:
+            return None
+        return [_get_model(msg['model'], msg['module']).create(msg['data']) for msg in entry['messages']]
+    except (EnvironmentError, ValueError, KeyError, AttributeError, TypeError, ImportError,
+            ModelViolationError) as err:
+        api.current_logger().debug('Cannot load cached facts {}: {}'.format(name, err))
+        return None
+
+
+def _store(name, key, messages):
+    entry = {
+        'key': key,
+        'messages': [
+            {'model': type(msg).__name__, 'module': type(msg).__module__, 'data': msg.dump()} for msg in messages
+        ],
+    }
+    path = _cache_path(name)
+    try:
+        if not os.path.isdir(FACT_CACHE_DIR):
+            os.makedirs(FACT_CACHE_DIR)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(entry, f)
+        os.rename(path + '.tmp', path)
+    except EnvironmentError as err:
+        api.current_logger().warning('Cannot store facts {} into the cache: {}'.format(name, err))
+
+
+def run_cached(name, get_key, scan):
+    """
+    Run the scan unless valid messages produced by the scan in a previous execution are cached
+
+    All messages produced by the scan (including reports) are recorded and stored
+    in the cache. When cached messages are reused, they are produced again
+    and the scan is not executed at all.
+
+    :param name: Name of the cache entry, unique among all scans
+    :param get_key: Function returning the invalidation key, a JSON serializable value describing
+                    the state of the system the facts are collected from
+    :param scan: Function producing the messages
+    """
+    cache_mode = get_env('LEAPP_FACT_CACHE', '0')
+    if cache_mode not in ('1', 'rescan'):
+        scan()
+        return
+
+    key = _digest([_get_base_key(), get_key()])
+    messages = _load(name, key) if cache_mode == '1' else None
+    if messages is not None:
+        api.current_logger().debug('Reusing cached facts {}.'.format(name))
+        for msg in messages:
+            api.produce(msg)
+        return
+
+    actor = api.current_actor()
+    produce = actor.produce
+    produced = []
+
+    def _recording_produce(*messages):
+        produced.extend(messages)
+        produce(*messages)
+
+    actor.produce = _recording_produce
+    try:
+        scan()
+    finally:
+        actor.produce = produce
+    _store(name, key, produced)
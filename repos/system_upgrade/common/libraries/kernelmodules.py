@@ -0,0 +1,113 @@
+"""
+Lookups in the kernel module metadata of a kernel (modules.dep, modules.builtin, modules.alias)
+
+The metadata are read from the given modules directory (e.g. /lib/modules/<kernel-version>),
+so they can be used for the booted kernel as well as for the target kernel installed
+inside the target userspace.
+"""
+
+import fnmatch
+import os
+import re
+from collections import namedtuple
+
+from leapp.libraries.stdlib import api
+
+_MODULE_FILE_RE = re.compile(r'\.ko(\.(xz|gz|zst))?$')
+
+KernelModules = namedtuple('KernelModules', ('loadable', 'builtin'))
+
+
+def normalize_module_name(name):
+    """
+    Return the name of the kernel module as used by the kernel, e.g. 'dm-crypt' -> 'dm_crypt'
+    """
+    return name.replace('-', '_')
+
+
+def get_module_name(path):
+    """
+    Return the name of the kernel module stored in the file, None if the file is not a kernel module
+
+    E.g. 'kernel/drivers/md/dm-crypt.ko.xz' -> 'dm_crypt'
+    """
+    basename = os.path.basename(path)
+    if not _MODULE_FILE_RE.search(basename):
+        return None
+    return normalize_module_name(_MODULE_FILE_RE.sub('', basename))
+
+
+def _read_module_names(path, get_path):
+    names = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                name = get_module_name(get_path(line))
+                if name:
+                    names.add(name)
+    except (IOError, OSError):
+        api.current_logger().debug('Cannot read {}.'.format(path))
+    return names
+
+
+def get_kernel_modules(modules_dir):
+    """
+    Return names of loadable and builtin modules of the kernel
+
+    :param modules_dir: Modules directory of the kernel, e.g. /lib/modules/<kernel-version>
+    :rtype: KernelModules
+    """
+    return KernelModules(
+        loadable=_read_module_names(os.path.join(modules_dir, 'modules.dep'),
+                                    lambda line: line.split(':', 1)[0].strip()),
+        builtin=_read_module_names(os.path.join(modules_dir, 'modules.builtin'), lambda line: line.strip()),
+    )
+
+
+def format_pci_modalias(vendor, device, subsystem_vendor, subsystem_device, device_class):
+    """
+    Return the modalias of the PCI device as provided by the kernel in sysfs
+
+    :param device_class: Class, subclass and programming interface of the device, e.g. 0x010601
+    """
+    return 'pci:v{:08X}d{:08X}sv{:08X}sd{:08X}bc{:02X}sc{:02X}i{:02X}'.format(
+        vendor, device, subsystem_vendor, subsystem_device,
+        device_class >> 16, (device_class >> 8) & 0xff, device_class & 0xff)
+
+
+class PCIModuleAliases(object):
+    """
+    Kernel modules handling PCI devices, as resolved by `lspci -k` from the modalias of a device
+    """
+
+    def __init__(self, modules_dir):
+        # aliases indexed by the vendor part of the pattern, aliases matching any vendor are under ''
+        self._aliases = {}
+        self._resolved = {}
+        for name in ('modules.alias', 'modules.builtin.alias'):
+            try:
+                with open(os.path.join(modules_dir, name)) as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 3 and parts[0] == 'alias' and parts[1].startswith('pci:'):
+                            self._aliases.setdefault(self._vendor_key(parts[1]), []).append((parts[1], parts[2]))
+            except (IOError, OSError):
+                api.current_logger().debug('Cannot read {}, modules of PCI devices are not resolved.'.format(
+                    os.path.join(modules_dir, name)))
+
+    @staticmethod
+    def _vendor_key(modalias):
+        vendor = modalias[4:13]
+        return '' if any(c in vendor for c in '*?[') else vendor
+
+    def modules(self, modalias):
+        if not modalias or not modalias.startswith('pci:'):
+            return []
+        if modalias not in self._resolved:
+            modules = []
+            aliases = self._aliases.get(self._vendor_key(modalias), []) + self._aliases.get('', [])
+            for pattern, module in aliases:
+                if module not in modules and fnmatch.fnmatchcase(modalias, pattern):
+                    modules.append(module)
+            self._resolved[modalias] = modules
+        return list(self._resolved[modalias])
@@ -1,6 +1,7 @@
 import warnings
 
 from leapp.libraries.common.config.version import get_source_major_version
+from leapp.libraries.stdlib import api
 
 try:
     import dnf
@@ -15,7 +16,7 @@ except ImportError:
     warnings.warn('Could not import the `hawkey` python module.', ImportWarning)
 
 
-def _create_or_get_dnf_base(base=None):
+def _create_or_get_dnf_base(base=None, cacheonly=False):
     if not base:
         # The DNF command reads /etc/yum/vars/releasever, but the DNF library does not. It parses redhat-release
         # package to retrieve system's major version which it then uses as $releasever. However, some systems might
@@ -36,6 +37,7 @@ def _create_or_get_dnf_base(base=None):
 
         # load all substitutions from etc
         conf.substitutions.update_from_etc('/')
+        conf.cacheonly = cacheonly
 
         base = dnf.Base(conf=conf)
         base.init_plugins()
@@ -44,10 +46,33 @@ def _create_or_get_dnf_base(base=None):
         # e.g. the amazon-id plugin requires loaded repositories
         # for the proper configuration.
         base.configure_plugins()
+        if cacheonly:
+            # a repository without cached metadata must not be skipped silently,
+            # otherwise we would miss its module streams
+            for repo in base.repos.iter_enabled():
+                repo.skip_if_unavailable = False
         base.fill_sack()
     return base
 
 
+def create_local_dnf_base():
+    """
+    Return dnf.Base with the sack filled preferably from the local data only.
+
+    The sack is filled from the rpmdb and the cached repository metadata, the same
+    way as `dnf --cacheonly` does, so no metadata are downloaded. In case metadata
+    of any enabled repository are not cached, fall back to the regular load of
+    repositories, which can download the metadata.
+    """
+    try:
+        return _create_or_get_dnf_base(cacheonly=True)
+    except dnf.exceptions.Error as err:
+        api.current_logger().debug(
+            'Cannot load repositories from the cache, loading them regularly: {}'.format(err)
+        )
+    return _create_or_get_dnf_base()
+
+
 def get_modules(base=None):
     """
     Return info about all module streams as a list of libdnf.module.ModulePackage objects.
@@ -63,14 +88,14 @@ def get_modules(base=None):
     return module_base.get_modules('*')[0]
 
 
-def get_enabled_modules():
+def get_enabled_modules(base=None):
     """
     Return currently enabled module streams as a list of libdnf.module.ModulePackage objects.
     """
     if not dnf:
         return []
 
-    base = _create_or_get_dnf_base()
+    base = _create_or_get_dnf_base(base)
     modules = get_modules(base)
 
     # if modules are not supported (RHEL 7), base.sack._moduleContainer won't exist
@@ -3,6 +3,7 @@ import functools
 import os
 import re
 import time
+from multiprocessing.pool import ThreadPool
 
 from leapp import reporting
 from leapp.exceptions import StopActorExecutionError
@@ -383,6 +384,27 @@ def switch_certificate(context, rhsm_info, cert_path):
             context.copy_to(cert_path, os.path.join(path, os.path.basename(cert_path)))
 
 
+def _query_concurrently(context, queries):
+    """
+    Execute the read-only subscription-manager queries concurrently
+
+    Every query is retried on its own, so a failure of one query does not repeat the others.
+
+    :param context: An instance of a mounting.IsolatedActions class
+    :type context: mounting.IsolatedActions class
+    :param queries: Functions called with the context
+    :return: Results of the queries in the same order
+    :rtype: List
+    """
+    retried_queries = [_rhsm_retry(max_attempts=_ATTEMPTS, sleep=_RETRY_SLEEP)(query) for query in queries]
+    pool = ThreadPool(len(retried_queries))
+    try:
+        return pool.map(lambda query: query(context), retried_queries)
+    finally:
+        pool.close()
+        pool.join()
+
+
 @with_rhsm
 def scan_rhsm_info(context):
     """
@@ -396,10 +418,12 @@ def scan_rhsm_info(context):
     :rtype: RHSMInfo model
     """
     info = RHSMInfo()
-    info.attached_skus = get_attached_skus(context)
+    # NOTE: Available repositories are parsed from the redhat.repo file regenerated by `yum clean all`, other
+    # subscription-manager commands can rewrite the file, so get them before executing other queries.
     info.available_repos = get_available_repo_ids(context)
-    info.enabled_repos = get_enabled_repo_ids(context)
-    info.release = get_release(context)
+    # Each of the queries waits mostly for the entitlement server, so execute them at once
+    info.attached_skus, info.enabled_repos, info.release, info.sca_detected = _query_concurrently(
+        context, [get_attached_skus, get_enabled_repo_ids, get_release, is_manifest_sca]
+    )
     info.existing_product_certificates.extend(get_existing_product_certificates(context))
-    info.sca_detected = is_manifest_sca(context)
     return info
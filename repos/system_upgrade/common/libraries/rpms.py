@@ -1,3 +1,4 @@
+from leapp.actors import Actor
 from leapp.libraries import stdlib
 from leapp.libraries.common.config.version import get_source_major_version
 from leapp.models import InstalledRPM
@@ -65,24 +66,50 @@ def get_installed_rpms():
         return []
 
 
+def _get_lookup_cache(context):
+    """
+    Return cache of lookups built by the current actor, None if lookups cannot be cached
+
+    Messages consumed by an actor do not change during its execution, so lookups
+    built from them are reused instead of deserializing the consumed messages
+    again on each call (e.g. each has_package call).
+    """
+    actor = context.current_actor() if hasattr(context, 'current_actor') else None
+    if not isinstance(actor, Actor):
+        return None
+    if not hasattr(actor, '_rpm_lookups'):
+        actor._rpm_lookups = {}  # pylint: disable=protected-access
+    return actor._rpm_lookups  # pylint: disable=protected-access
+
+
 def create_lookup(model, field, keys, context=stdlib.api):
     """
     Create a lookup set from one of the model fields.
 
+    Lookups are cached for the rest of the execution of the current actor.
+
     :param model: model class
     :param field: model field, its value will be taken for lookup data
     :param key: property of the field's data that will be used to build a resulting set
     :param context: context of the execution
     """
+    cache = _get_lookup_cache(context)
+    cache_key = (model, field, tuple(keys))
+    if cache is not None and cache_key in cache:
+        return set(cache[cache_key])
+
     data = getattr(next((m for m in context.consume(model)), model()), field)
     try:
-        return {tuple(getattr(obj, key) for key in keys) for obj in data} if data else set()
+        lookup = {tuple(getattr(obj, key) for key in keys) for obj in data} if data else set()
     except TypeError:
         # data is not iterable, not lookup can be built
         stdlib.api.current_logger().error(
                 "{model}.{field}.{keys} is not iterable, can't build lookup".format(
                     model=model, field=field, keys=keys))
         return set()
+    if cache is not None:
+        cache[cache_key] = frozenset(lookup)
+    return lookup
 
 
 def has_package(model, package_name, arch=None, version=None, release=None, context=stdlib.api):
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from leapp.exceptions import StopActorExecutionError
+from leapp.libraries.common import devicedriverdeprecation
+from leapp.libraries.common.testutils import CurrentActorMocked
+from leapp.libraries.stdlib import api
+from leapp.models import DeviceDriverDeprecationEntry
+
+
+def _entry(device_type, device_id, driver_name='', device_name=''):
+    return DeviceDriverDeprecationEntry(
+        deprecation_announced='',
+        device_id=device_id,
+        device_type=device_type,
+        device_name=device_name,
+        driver_name=driver_name,
+        available_in_rhel=[7],
+        maintained_in_rhel=[7],
+    )
+
+
+ENTRIES = [
+    _entry('pci', '0x8086:0x1234', driver_name='e1000'),
+    _entry('pci', '', driver_name='e1000'),
+    _entry('pci', '', driver_name='mptsas', device_name='old'),
+    _entry('pci', '', driver_name='mptsas', device_name='new'),
+    _entry('cpu', 'x86_64:intel:6:[56-57]'),
+    _entry('cpu', 'x86_64:amd:21:*'),
+    _entry('cpu', 's390x:ibm:2827:*'),
+]
+
+
+def _store_index(monkeypatch, tmpdir, entries):
+    monkeypatch.setattr(devicedriverdeprecation, 'INDEX_DIR', tmpdir.join('index').strpath)
+    return devicedriverdeprecation.store_index([entry.dump() for entry in entries])
+
+
+def test_lookups(monkeypatch, tmpdir):
+    index_message = _store_index(monkeypatch, tmpdir, ENTRIES)
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked(msgs=[index_message]))
+    index = devicedriverdeprecation.get_index()
+
+    assert index.find_pci_device('8086:1234') == ENTRIES[0]
+    assert index.find_pci_device('0x8086:0x1234') == ENTRIES[0]
+    assert index.find_pci_device('8086:4321') is None
+
+    assert index.find_driver('e1000') == ENTRIES[1]
+    assert index.find_driver('mptsas').device_name == 'new'
+    assert index.find_driver('') is None
+    assert index.find_driver('ext4') is None
+
+    assert index.get_cpu_entries('x86_64') == ENTRIES[4:6]
+    assert index.get_cpu_entries('s390x') == ENTRIES[6:]
+    assert index.get_cpu_entries('ppc64le') == []
+
+
+def test_store_index(monkeypatch, tmpdir):
+    index_message = _store_index(monkeypatch, tmpdir, ENTRIES)
+    stored_part = os.path.join(index_message.path, 'pci.json')
+    mtime = os.stat(stored_part).st_mtime
+
+    # the index of the same data is reused
+    assert _store_index(monkeypatch, tmpdir, ENTRIES) == index_message
+    assert os.stat(stored_part).st_mtime == mtime
+
+    # the index of other data replaces it
+    other_message = _store_index(monkeypatch, tmpdir, ENTRIES[1:])
+    assert other_message.checksum != index_message.checksum
+    assert os.listdir(tmpdir.join('index').strpath) == [other_message.checksum]
+
+
+def test_missing_index(monkeypatch, tmpdir):
+    index_message = _store_index(monkeypatch, tmpdir, ENTRIES)
+    tmpdir.join('index').remove()
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked(msgs=[index_message]))
+    index = devicedriverdeprecation.get_index()
+
+    with pytest.raises(StopActorExecutionError):
+        index.find_driver('e1000')
+
+
+def test_no_data(monkeypatch):
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked())
+    index = devicedriverdeprecation.get_index()
+
+    assert index.find_pci_device('8086:1234') is None
+    assert index.find_driver('e1000') is None
+    assert index.get_cpu_entries('x86_64') == []
@@ -0,0 +1,118 @@
+import pytest
+
+from leapp.libraries.common import factcache
+from leapp.libraries.common.testutils import CurrentActorMocked
+from leapp.libraries.stdlib import api
+from leapp.models import InstalledPackageOrigin
+
+
+class _ActorMocked(CurrentActorMocked):
+    def __init__(self, *args, **kwargs):
+        super(_ActorMocked, self).__init__(*args, **kwargs)
+        self.produced = []
+
+    def produce(self, *models):
+        self.produced.extend(models)
+
+
+class _Scan(object):
+    def __init__(self, *messages):
+        self.called = 0
+        self.messages = messages
+
+    def __call__(self):
+        self.called += 1
+        api.produce(*self.messages)
+
+
+@pytest.fixture
+def cache(monkeypatch, tmpdir):
+    monkeypatch.setattr(factcache, 'FACT_CACHE_DIR', str(tmpdir.join('cache')))
+    monkeypatch.setattr(factcache, 'RPMDB_DIRS', (str(tmpdir.mkdir('rpm')),))
+    return tmpdir
+
+
+def _set_actor(monkeypatch, mode, **kwargs):
+    actor = _ActorMocked(envars={'LEAPP_FACT_CACHE': mode}, **kwargs)
+    monkeypatch.setattr(api, 'current_actor', actor)
+    return actor
+
+
+MESSAGES = (
+    InstalledPackageOrigin(name='bash', repository='baseos'),
+    InstalledPackageOrigin(name='vim', repository='appstream'),
+)
+
+
+def test_disabled(monkeypatch, cache):
+    actor = _set_actor(monkeypatch, '0')
+    scan = _Scan(*MESSAGES)
+
+    factcache.run_cached('test', lambda: 'key', scan)
+    factcache.run_cached('test', lambda: 'key', scan)
+
+    assert scan.called == 2
+    assert actor.produced == list(MESSAGES) * 2
+    assert not cache.join('cache').check()
+
+
+def test_reused(monkeypatch, cache):
+    scan = _Scan(*MESSAGES)
+    _set_actor(monkeypatch, '1')
+    factcache.run_cached('test', lambda: 'key', scan)
+
+    actor = _set_actor(monkeypatch, '1')
+    factcache.run_cached('test', lambda: 'key', scan)
+
+    assert scan.called == 1
+    assert actor.produced == list(MESSAGES)
+
+
+@pytest.mark.parametrize('key,kwargs,mode', [
+    ('changed key', {}, '1'),
+    ('key', {'dst_ver': '9.0'}, '1'),
+    ('key', {}, 'rescan'),
+])
+def test_rescanned(monkeypatch, cache, key, kwargs, mode):
+    scan = _Scan(*MESSAGES)
+    _set_actor(monkeypatch, '1')
+    factcache.run_cached('test', lambda: 'key', scan)
+
+    actor = _set_actor(monkeypatch, mode, **kwargs)
+    factcache.run_cached('test', lambda: key, scan)
+
+    assert scan.called == 2
+    assert actor.produced == list(MESSAGES)
+
+
+def test_rpmdb_changed(monkeypatch, cache):
+    scan = _Scan(*MESSAGES)
+    _set_actor(monkeypatch, '1')
+    factcache.run_cached('test', lambda: 'key', scan)
+
+    cache.join('rpm', 'rpmdb.sqlite').write('changed')
+    _set_actor(monkeypatch, '1')
+    factcache.run_cached('test', lambda: 'key', scan)
+
+    assert scan.called == 2
+
+
+def test_failed_scan_not_cached(monkeypatch, cache):
+    def scan():
+        api.produce(MESSAGES[0])
+        raise RuntimeError('failed')
+
+    _set_actor(monkeypatch, '1')
+    with pytest.raises(RuntimeError):
+        factcache.run_cached('test', lambda: 'key', scan)
+
+    assert not cache.join('cache', 'test.json').check()
+
+
+def test_tree_state(tmpdir):
+    tmpdir.join('file').write('content')
+    state = factcache.tree_state(str(tmpdir))
+
+    assert factcache.tree_state(str(tmpdir)) == state
+    tmpdir.mkdir('dir').join('file').write('content')
+    assert factcache.tree_state(str(tmpdir)) != state
@@ -0,0 +1,58 @@
+import pytest
+
+from leapp.libraries.common import kernelmodules
+
+
+@pytest.mark.parametrize('path,name', [
+    ('kernel/drivers/md/dm-crypt.ko.xz', 'dm_crypt'),
+    ('kernel/drivers/ata/ahci.ko', 'ahci'),
+    ('/usr/lib/modules/5.14.0-1/kernel/fs/xfs/xfs.ko.zst', 'xfs'),
+    ('kernel/fs/nfs/nfsv4.ko.gz', 'nfsv4'),
+    ('usr/lib/modules/5.14.0-1/modules.dep', None),
+    ('usr/bin/kmod', None),
+])
+def test_get_module_name(path, name):
+    assert kernelmodules.get_module_name(path) == name
+
+
+def test_get_kernel_modules(tmpdir):
+    tmpdir.join('modules.dep').write(
+        'kernel/drivers/md/dm-crypt.ko.xz: kernel/drivers/md/dm-mod.ko.xz\n'
+        'kernel/drivers/md/dm-mod.ko.xz:\n'
+        'extra/leapp/custom.ko:\n'
+    )
+    tmpdir.join('modules.builtin').write('kernel/fs/ext4/ext4.ko\nkernel/fs/vfat/vfat.ko\n')
+
+    modules = kernelmodules.get_kernel_modules(tmpdir.strpath)
+
+    assert modules.loadable == {'dm_crypt', 'dm_mod', 'custom'}
+    assert modules.builtin == {'ext4', 'vfat'}
+
+
+def test_get_kernel_modules_missing(tmpdir):
+    modules = kernelmodules.get_kernel_modules(tmpdir.join('nonexistent').strpath)
+
+    assert modules.loadable == set()
+    assert modules.builtin == set()
+
+
+def test_format_pci_modalias():
+    modalias = kernelmodules.format_pci_modalias(0x8086, 0x2922, 0x1af4, 0x1100, 0x010601)
+
+    assert modalias == 'pci:v00008086d00002922sv00001AF4sd00001100bc01sc06i01'
+
+
+def test_pci_module_aliases(tmpdir):
+    tmpdir.join('modules.alias').write(
+        'alias pci:v*d*sv*sd*bc01sc06i01* ahci\n'
+        'alias pci:v00001AF4d*sv*sd*bc*sc*i* virtio_pci\n'
+        'alias pci:v00008086d00002922sv*sd*bc*sc*i* ahci\n'
+        'alias usb:v*p*d*dc*dsc*dp*ic08isc06ip50in* usb_storage\n'
+    )
+    aliases = kernelmodules.PCIModuleAliases(tmpdir.strpath)
+
+    assert aliases.modules('pci:v00008086d00002922sv00001AF4sd00001100bc01sc06i01') == ['ahci']
+    assert aliases.modules('pci:v00001AF4d00001001sv00001AF4sd00000002bc01sc00i00') == ['virtio_pci']
+    assert aliases.modules('pci:v00001234d00001111sv00001AF4sd00001100bc03sc00i00') == []
+    assert aliases.modules('usb:v0781p5567d0100dc00dsc00dp00ic08isc06ip50in00') == []
+    assert aliases.modules(None) == []
@@ -385,3 +385,58 @@ def test_get_existing_product_certificates_missing_cert_directory(monkeypatch, a
     assert len(existing_product_certificates) == 1, fail_description
     fail_description = 'Library failed to identify certificate from mocked outputs.'
     assert existing_product_certificates[0] == '/etc/pki/product-default/cert', fail_description
+
+
+def test_scan_rhsm_info(monkeypatch, actor_mocked, context_mocked):
+    """Tests whether all the RHSM information is gathered when the queries are executed concurrently."""
+    context_mocked.add_mocked_command_call_with_stdout(CMD_RHSM_LIST_CONSUMED, 'SKU: 598339696910')
+    context_mocked.add_mocked_command_call_with_stdout(CMD_RHSM_STATUS, RHSM_STATUS_OUTPUT_SCA)
+    context_mocked.add_mocked_command_call_with_stdout(CMD_RHSM_RELEASE, 'Release: 7.9')
+    context_mocked.add_mocked_command_call_with_stdout(CMD_RHSM_LIST_ENABLED_REPOS, 'Repo ID: rhel-7-server-rpms')
+    monkeypatch.setattr(rhsm, 'get_available_repo_ids', lambda context: ['rhel-7-server-rpms', 'other'])
+    monkeypatch.setattr(rhsm, 'get_existing_product_certificates', lambda context: ['/etc/pki/product/69.pem'])
+
+    info = rhsm.scan_rhsm_info(context_mocked)
+
+    assert info.attached_skus == ['598339696910']
+    assert info.available_repos == ['rhel-7-server-rpms', 'other']
+    assert info.enabled_repos == ['rhel-7-server-rpms']
+    assert info.release == '7.9'
+    assert info.existing_product_certificates == ['/etc/pki/product/69.pem']
+    assert info.sca_detected
+
+
+def test_query_concurrently_retries_failed_query(monkeypatch, actor_mocked, context_mocked):
+    """Tests whether only the failed query is retried."""
+    monkeypatch.setattr(rhsm, '_RETRY_SLEEP', 0)
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    context_mocked.add_mocked_command_call_with_stdout(CMD_RHSM_LIST_CONSUMED, 'SKU: 598339696910')
+    context_mocked.add_mocked_command_call_with_stdout(CMD_RHSM_RELEASE, 'Release: 7.9')
+    call = context_mocked.call
+    attempts = []
+
+    def call_failing_once(cmd, *args, **kwargs):
+        attempts.append(tuple(cmd))
+        if tuple(cmd) == CMD_RHSM_RELEASE and attempts.count(CMD_RHSM_RELEASE) == 1:
+            raise_call_error(cmd)
+        return call(cmd, *args, **kwargs)
+
+    monkeypatch.setattr(context_mocked, 'call', call_failing_once)
+
+    result = rhsm._query_concurrently(context_mocked, [rhsm.get_attached_skus, rhsm.get_release])
+
+    assert result == [['598339696910'], '7.9']
+    assert attempts.count(CMD_RHSM_LIST_CONSUMED) == 1
+    assert attempts.count(CMD_RHSM_RELEASE) == 2
+
+
+def test_query_concurrently_error(monkeypatch, actor_mocked):
+    """Tests whether the error is raised when a query keeps failing."""
+    monkeypatch.setattr(rhsm, '_RETRY_SLEEP', 0)
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    context = IsolatedActionsMocked(raise_err=True)
+
+    with pytest.raises(StopActorExecutionError):
+        rhsm._query_concurrently(context, [rhsm.get_attached_skus, rhsm.get_release])
+
+    assert len(context.commands_called) == 2 * rhsm._ATTEMPTS
@@ -1,8 +1,10 @@
 import pytest
 
+from leapp.libraries.common import rpms
 from leapp.libraries.common.rpms import _parse_config_modification, get_leapp_dep_packages, get_leapp_packages
 from leapp.libraries.common.testutils import CurrentActorMocked
 from leapp.libraries.stdlib import api
+from leapp.models import DistributionSignedRPM, RPM
 
 
 def test_parse_config_modification():
@@ -95,3 +97,28 @@ def test_get_leapp_dep_packages(major_version, component, result, monkeypatch):
         kwargs["component"] = component
 
     assert frozenset(get_leapp_dep_packages(**kwargs)) == frozenset(result)
+
+
+def test_create_lookup_cached_per_actor(monkeypatch):
+    rpm = RPM(name='bash', version='5.1', release='1.el9', epoch='0', packager='', arch='x86_64', pgpsig='')
+    actor = CurrentActorMocked(msgs=[DistributionSignedRPM(items=[rpm])])
+    consumed = []
+
+    def consume(model):
+        consumed.append(model)
+        return api.current_actor().consume(model)
+
+    # only lookups created by actors are cached, pretend the mocked actor is a real one
+    monkeypatch.setattr(rpms, 'Actor', CurrentActorMocked)
+    monkeypatch.setattr(api, 'current_actor', actor)
+    monkeypatch.setattr(api, 'consume', consume)
+
+    assert rpms.has_package(DistributionSignedRPM, 'bash')
+    assert not rpms.has_package(DistributionSignedRPM, 'vim')
+    lookup = rpms.create_lookup(DistributionSignedRPM, 'items', ('name',))
+    lookup.clear()
+    assert rpms.has_package(DistributionSignedRPM, 'bash')
+    assert consumed == [DistributionSignedRPM]
+
+    monkeypatch.setattr(api, 'current_actor', CurrentActorMocked(msgs=[DistributionSignedRPM(items=[])]))
+    assert not rpms.has_package(DistributionSignedRPM, 'bash')
@@ -0,0 +1,60 @@
+import json
+import os
+
+from leapp.libraries.common import upgradetimeline
+
+
+def test_mark_stage_outside_initramfs(monkeypatch, tmpdir):
+    monkeypatch.setattr(upgradetimeline, 'RUNTIME_TIMELINE_DIR', str(tmpdir.join('nonexistent')))
+    upgradetimeline.mark_stage('rpm-transaction-start')
+    assert not os.path.exists(str(tmpdir.join('nonexistent')))
+
+
+def test_mark_stage_and_read(monkeypatch, tmpdir):
+    monkeypatch.setattr(upgradetimeline, 'RUNTIME_TIMELINE_DIR', str(tmpdir))
+    upgradetimeline.mark_stage('rpm-transaction-start')
+    upgradetimeline.mark_stage('rpm-transaction-end')
+
+    records = upgradetimeline.read_timeline(str(tmpdir.join(upgradetimeline.TIMELINE_FILE_NAME)))
+    assert [record['stage'] for record in records] == ['rpm-transaction-start', 'rpm-transaction-end']
+    assert records[0]['time'] <= records[1]['time']
+
+
+def test_mark_phase_start(monkeypatch, tmpdir):
+    monkeypatch.setattr(upgradetimeline, 'RUNTIME_TIMELINE_DIR', str(tmpdir))
+    monkeypatch.setenv('LEAPP_CURRENT_PHASE', 'RPMUpgrade')
+    upgradetimeline.mark_phase_start()
+
+    records = upgradetimeline.read_timeline(str(tmpdir.join(upgradetimeline.TIMELINE_FILE_NAME)))
+    assert [record['stage'] for record in records] == ['phase-RPMUpgrade']
+
+
+def test_read_timeline_skips_malformed_lines(tmpdir):
+    timeline = tmpdir.join('timeline.jsonl')
+    timeline.write('\n'.join([
+        json.dumps({'stage': 'initramfs-start', 'time': 100, 'uptime': 5.0}),
+        '{"stage": "broken", "time": ',
+        json.dumps({'time': 101}),
+        json.dumps({'stage': 'save-logs', 'time': 200, 'uptime': 105.5}),
+    ]))
+
+    records = upgradetimeline.read_timeline(str(timeline))
+    assert [record['stage'] for record in records] == ['initramfs-start', 'save-logs']
+    assert upgradetimeline.read_timeline(str(tmpdir.join('nonexistent'))) == []
+
+
+def test_get_stage_durations():
+    records = [
+        {'stage': 'initramfs-start', 'time': 100, 'uptime': 5.0},
+        {'stage': 'leapp-upgrade-start', 'time': 101, 'uptime': 6.5},
+        {'stage': 'save-logs', 'time': 700, 'uptime': 606.25},
+        # uptime is reset after the reboot, the wall clock time is used
+        {'stage': 'first-boot', 'time': 760.5, 'uptime': 20.0},
+    ]
+
+    assert upgradetimeline.get_stage_durations(records) == [
+        ('initramfs-start', 1.5),
+        ('leapp-upgrade-start', 599.75),
+        ('save-logs', 60.5),
+    ]
+    assert upgradetimeline.get_stage_durations(records[:1]) == []
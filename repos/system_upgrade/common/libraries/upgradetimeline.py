@@ -0,0 +1,111 @@
+import json
+import os
+import time
+
+from leapp.libraries.stdlib import api
+
+# Directory created by the do-upgrade.sh script in the upgrade initramfs and bind
+# mounted into the upgrade container, so stages can be marked from actors as well
+RUNTIME_TIMELINE_DIR = '/run/leapp-upgrade-timeline'
+TIMELINE_FILE_NAME = 'timeline.jsonl'
+# Where the timeline is stored by do-upgrade.sh when leaving the upgrade initramfs
+TIMELINE_LOG_PATH = '/var/log/leapp/leapp-upgrade-timeline.jsonl'
+
+
+def _get_uptime():
+    try:
+        with open('/proc/uptime') as f:
+            return float(f.read().split()[0])
+    except (EnvironmentError, IndexError, ValueError):
+        return None
+
+
+def mark_stage(stage, path=None):
+    """
+    Record the current time for the given stage of the upgrade into the timeline.
+
+    Each record is one JSON object per line with the stage name, the wall
+    clock time (seconds since the epoch) and the system uptime. The same
+    format is written by the do-upgrade.sh script in the upgrade initramfs.
+
+    When the path is not specified, the stage is recorded only if running inside
+    the upgrade initramfs, otherwise the call is a no-op. Any failure is only logged,
+    the timeline must never break the upgrade.
+
+    :param stage: Name of the stage, e.g. 'rpm-transaction-start'
+    :type stage: str
+    :param path: Path to the timeline file
+    :type path: str
+    """
+    if not path:
+        if not os.path.isdir(RUNTIME_TIMELINE_DIR):
+            return
+        path = os.path.join(RUNTIME_TIMELINE_DIR, TIMELINE_FILE_NAME)
+
+    record = {'stage': stage, 'time': time.time(), 'uptime': _get_uptime()}
+    try:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    except EnvironmentError as err:
+        api.current_logger().debug('Cannot record the {} upgrade stage: {}'.format(stage, err))
+
+
+def mark_phase_start():
+    """
+    Record the start of the currently executed phase of the workflow into the timeline.
+
+    The stage is named after the phase, e.g. 'phase-RPMUpgrade'. See mark_stage.
+    """
+    mark_stage('phase-{}'.format(os.environ.get('LEAPP_CURRENT_PHASE', 'unknown')))
+
+
+def read_timeline(path=None):
+    """
+    Return records of the upgrade timeline in the order they have been recorded.
+
+    Records are appended to the timeline as stages happen, so the order of
+    lines is chronological. Malformed lines are skipped.
+
+    :param path: Path to the timeline file, TIMELINE_LOG_PATH by default
+    :type path: str
+    :rtype: list of dict
+    """
+    path = path or TIMELINE_LOG_PATH
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and 'stage' in record and 'time' in record:
+                    records.append(record)
+    except EnvironmentError:
+        return []
+
+    return records
+
+
+def get_stage_durations(records):
+    """
+    Return how long each stage of the timeline took.
+
+    The duration of a stage is the time until the next recorded stage. The uptime
+    is preferred when available for both stages within the same boot as the wall
+    clock time recorded in the upgrade initramfs has only a second precision.
+
+    :param records: Records of the timeline as returned by read_timeline
+    :type records: list of dict
+    :returns: List of tuples (stage, duration in seconds)
+    :rtype: list of tuple
+    """
+    durations = []
+    for record, next_record in zip(records, records[1:]):
+        uptime, next_uptime = record.get('uptime'), next_record.get('uptime')
+        if uptime is not None and next_uptime is not None and next_uptime >= uptime:
+            duration = next_uptime - uptime
+        else:
+            duration = next_record['time'] - record['time']
+        durations.append((record['stage'], max(duration, 0)))
+    return durations
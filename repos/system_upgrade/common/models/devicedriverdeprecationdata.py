@@ -91,3 +91,24 @@ class DeviceDriverDeprecationData(Model):
     """
     A list of entries describing deprecated devices and drivers
     """
+
+
+class DeviceDriverDeprecationDataIndex(Model):
+    """
+    Describes the stored index of the device and driver deprecation data
+
+    Actors looking up particular devices and drivers should consume this message
+    instead of DeviceDriverDeprecationData and query the index using the
+    devicedriverdeprecation library.
+    """
+    topic = SystemFactsTopic
+
+    checksum = fields.String()
+    """
+    Checksum of the deprecation data the index has been built from
+    """
+
+    path = fields.String()
+    """
+    Path to the directory with the stored index
+    """
@@ -43,6 +43,9 @@ class PCIDevice(Model):
 
         then
         pci_id == "8086:15bf:17aa:2279"
+
+    modalias - modalias of the device used to look up kernel modules handling
+        the device, e.g. pci:v00008086d000015BFsv000017AAsd00002279bc08sc80i00
     """
     topic = SystemInfoTopic
 
@@ -59,6 +62,7 @@ class PCIDevice(Model):
     modules = fields.Nullable(fields.List(fields.String()))
     numa_node = fields.Nullable(fields.String())
     pci_id = fields.String()
+    modalias = fields.Nullable(fields.String(default=None))
 
 
 class PCIDevices(Model):
@@ -0,0 +1,57 @@
+from leapp.models import fields, Model, Module
+from leapp.topics import SystemFactsTopic
+
+
+class InstalledPackageOrigin(Model):
+    """
+    The repository an installed package has been installed from.
+    """
+    topic = SystemFactsTopic
+
+    name = fields.String()
+    repository = fields.String()
+
+
+class ModularRPM(Model):
+    """
+    An installed RPM which is an artifact of a module stream.
+    """
+    topic = SystemFactsTopic
+
+    name = fields.String()
+    epoch = fields.String()
+    version = fields.String()
+    release = fields.String()
+    arch = fields.String()
+    module = fields.String()
+    stream = fields.String()
+
+
+class PkgManagerSnapshot(Model):
+    """
+    Snapshot of the package manager data about installed packages and modules on the source system
+
+    The snapshot is created once during the FactsPhase, using just the local data when
+    possible (rpmdb, cached repository metadata and /etc/dnf/modules.d), so actors
+    that need this information do not have to initialize the package manager again.
+
+    We expect to have only one single message of this kind produced
+    """
+    topic = SystemFactsTopic
+
+    package_origins = fields.List(fields.Model(InstalledPackageOrigin), default=[])
+    """
+    Repositories the installed packages come from.
+    """
+
+    modular_rpms = fields.List(fields.Model(ModularRPM), default=[])
+    """
+    Installed RPMs that are artifacts of a module stream.
+
+    Empty on systems without modularity (RHEL 7).
+    """
+
+    enabled_modules = fields.List(fields.Model(Module), default=[])
+    """
+    Module streams enabled on the source system.
+    """
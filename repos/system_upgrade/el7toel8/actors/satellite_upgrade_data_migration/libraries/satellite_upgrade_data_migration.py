@@ -0,0 +1,180 @@
+import errno
+import fcntl
+import glob
+import grp
+import os
+import pwd
+import shutil
+import stat
+import time
+from multiprocessing.pool import ThreadPool
+
+from leapp.libraries.stdlib import api
+
+POSTGRESQL_DATA_PATH = '/var/lib/pgsql/data/'
+POSTGRESQL_SCL_DATA_PATH = '/var/opt/rh/rh-postgresql12/lib/pgsql/data/'
+POSTGRESQL_USER = 'postgres'
+POSTGRESQL_GROUP = 'postgres'
+
+MAX_WORKERS = 8
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# ioctl creating a reflink of a file, from linux/fs.h
+FICLONE = 0x40049409
+
+
+class RelocationError(Exception):
+    pass
+
+
+def _copy_range(src_fd, dst_fd, size):
+    """
+    Copy data between files in the kernel, return number of bytes copied
+
+    The copy stops when the fast copy is not supported for the files, the rest has to be copied
+    by other means then.
+    """
+    copied = 0
+    while copied < size:
+        try:
+            if hasattr(os, 'copy_file_range'):
+                count = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+            else:
+                count = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+        except OSError as e:
+            if e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                break
+            raise
+        if not count:
+            break
+        copied += count
+    return copied
+
+
+def _copy_file(src, dst, uid, gid):
+    """
+    Copy the regular file with its permissions and times, owned by the given user and group
+
+    Reflink is used when supported by the filesystem, copying by the kernel otherwise.
+    :return: size of the file
+    """
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        src_stat = os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, stat.S_IMODE(src_stat.st_mode))
+        try:
+            os.fchown(dst_fd, uid, gid)
+            try:
+                fcntl.ioctl(dst_fd, FICLONE, src_fd)
+                copied = src_stat.st_size
+            except (IOError, OSError):
+                copied = _copy_range(src_fd, dst_fd, src_stat.st_size)
+            if copied < src_stat.st_size:
+                os.lseek(src_fd, copied, os.SEEK_SET)
+                os.lseek(dst_fd, copied, os.SEEK_SET)
+                with os.fdopen(os.dup(src_fd), 'rb') as src_file, os.fdopen(os.dup(dst_fd), 'wb') as dst_file:
+                    shutil.copyfileobj(src_file, dst_file, COPY_CHUNK_SIZE)
+            # fchown drops setuid/setgid bits, set the mode again
+            os.fchmod(dst_fd, stat.S_IMODE(src_stat.st_mode))
+            if os.fstat(dst_fd).st_size != src_stat.st_size:
+                raise RelocationError('Size of {} differs from {} after the copy'.format(dst, src))
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    os.utime(dst, (src_stat.st_atime, src_stat.st_mtime))
+    return src_stat.st_size
+
+
+def _copy_file_job(args):
+    return _copy_file(*args)
+
+
+def copy_tree(src, dst, uid, gid):
+    """
+    Copy content of the src directory into the existing dst directory, owned by the given user and group
+
+    Directories and symlinks are created first, regular files are copied then by concurrent
+    jobs, the largest first.
+    :return: number of bytes copied
+    """
+    files = []
+    directories = [(src, dst)]
+    for dirpath, dirnames, filenames in os.walk(src):
+        dst_dirpath = os.path.join(dst, os.path.relpath(dirpath, src))
+        for name in dirnames + filenames:
+            src_path = os.path.join(dirpath, name)
+            dst_path = os.path.join(dst_dirpath, name)
+            src_stat = os.lstat(src_path)
+            if stat.S_ISLNK(src_stat.st_mode):
+                os.symlink(os.readlink(src_path), dst_path)
+                os.lchown(dst_path, uid, gid)
+            elif stat.S_ISDIR(src_stat.st_mode):
+                os.mkdir(dst_path, stat.S_IMODE(src_stat.st_mode))
+                directories.append((src_path, dst_path))
+            elif stat.S_ISREG(src_stat.st_mode):
+                files.append((src_stat.st_size, src_path, dst_path))
+            else:
+                raise RelocationError('Unsupported type of file: {}'.format(src_path))
+
+    files.sort(reverse=True)
+    pool = ThreadPool(max(1, min(len(files), MAX_WORKERS)))
+    try:
+        sizes = pool.map(_copy_file_job, [(src_path, dst_path, uid, gid) for dummy_size, src_path, dst_path in files])
+    finally:
+        pool.close()
+        pool.join()
+
+    # directories are finished when all their content exists, so their times are not changed anymore
+    for src_path, dst_path in directories:
+        os.chown(dst_path, uid, gid)
+        shutil.copystat(src_path, dst_path)
+    return sum(sizes)
+
+
+def _count_tree(path):
+    count, size = 0, 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        count += len(dirnames) + len(filenames)
+        size += sum(os.lstat(os.path.join(dirpath, name)).st_size for name in filenames)
+    return count, size
+
+
+def relocate(src, dst, uid, gid):
+    """
+    Move content of the src directory into the existing empty dst directory on another partition
+
+    The content is copied first and verified, the source is removed only if the copy is complete.
+    """
+    start = time.time()
+    copied = copy_tree(src, dst, uid, gid)
+    if _count_tree(src) != _count_tree(dst):
+        raise RelocationError('Content of {} differs from {} after the copy'.format(dst, src))
+    duration = max(time.time() - start, 0.001)
+    api.current_logger().info('Copied {:.1f} MiB of PostgreSQL data in {:.1f}s ({:.1f} MiB/s).'.format(
+        copied / 1024.0 ** 2, duration, copied / 1024.0 ** 2 / duration))
+    for item in glob.glob(os.path.join(src, '*')) + glob.glob(os.path.join(src, '.*')):
+        if os.path.isdir(item) and not os.path.islink(item):
+            shutil.rmtree(item)
+        else:
+            os.unlink(item)
+
+
+def migrate_data(same_partition):
+    """
+    Move the PostgreSQL data from the SCL location to the location used by the system PostgreSQL
+    """
+    if same_partition:
+        # renaming the items is the fastest way, ownership does not need to be fixed in such a case
+        for item in glob.glob(os.path.join(POSTGRESQL_SCL_DATA_PATH, '*')):
+            try:
+                shutil.move(item, POSTGRESQL_DATA_PATH)
+            except Exception as e:  # pylint: disable=broad-except
+                api.current_logger().warning('Failed moving PostgreSQL data: {}'.format(e))
+                return
+        return
+
+    try:
+        relocate(POSTGRESQL_SCL_DATA_PATH, POSTGRESQL_DATA_PATH,
+                 pwd.getpwnam(POSTGRESQL_USER).pw_uid, grp.getgrnam(POSTGRESQL_GROUP).gr_gid)
+    except Exception as e:  # pylint: disable=broad-except
+        api.current_logger().warning('Failed moving PostgreSQL data: {}'.format(e))
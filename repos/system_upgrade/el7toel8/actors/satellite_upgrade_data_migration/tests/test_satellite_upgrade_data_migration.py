@@ -0,0 +1,80 @@
+import os
+import stat
+
+import pytest
+
+from leapp.libraries.actor import satellite_upgrade_data_migration
+from leapp.libraries.common.testutils import logger_mocked
+from leapp.libraries.stdlib import api
+
+
+@pytest.fixture
+def data(tmpdir):
+    src = tmpdir.mkdir('scl')
+    dst = tmpdir.mkdir('data')
+    src.join('PG_VERSION').write('12\n')
+    src.join('.hidden').write('')
+    base = src.mkdir('base').mkdir('16385')
+    for i in range(50):
+        base.join(str(i)).write_binary(os.urandom(i * 1024))
+    base.join('big').write_binary(os.urandom(3 * 1024 * 1024 + 7))
+    src.mkdir('pg_wal').join('000000010000000000000001').write('wal')
+    src.join('pg_wal', 'archive_status').mkdir()
+    src.join('postgresql.conf').write('data_directory = ...\n')
+    src.join('postgresql.conf').chmod(0o600)
+    os.symlink('base/16385', str(src.join('current')))
+    os.utime(str(src.join('PG_VERSION')), (1000000000, 1000000000))
+    return src, dst
+
+
+def _tree(root):
+    result = {}
+    for dirpath, dirnames, filenames in os.walk(str(root)):
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            content = os.readlink(path) if os.path.islink(path) else None
+            if stat.S_ISREG(st.st_mode):
+                with open(path, 'rb') as f:
+                    content = f.read()
+            result[os.path.relpath(path, str(root))] = (stat.S_IFMT(st.st_mode), stat.S_IMODE(st.st_mode), content)
+    return result
+
+
+def test_relocate(monkeypatch, data):
+    src, dst = data
+    monkeypatch.setattr(api, 'current_logger', logger_mocked())
+    monkeypatch.setattr(satellite_upgrade_data_migration, 'COPY_CHUNK_SIZE', 1024 * 1024)
+    expected = _tree(src)
+
+    satellite_upgrade_data_migration.relocate(str(src), str(dst), os.getuid(), os.getgid())
+
+    assert _tree(dst) == expected
+    assert not src.listdir()
+    assert dst.join('PG_VERSION').mtime() == 1000000000
+    assert all(os.lstat(os.path.join(dst.strpath, path)).st_uid == os.getuid() for path in expected)
+    assert any('MiB/s' in msg for msg in api.current_logger.infomsg)
+
+
+def test_relocate_unsupported_file(monkeypatch, data):
+    src, dst = data
+    os.mkfifo(str(src.join('fifo')))
+    expected = _tree(src)
+
+    with pytest.raises(satellite_upgrade_data_migration.RelocationError):
+        satellite_upgrade_data_migration.relocate(str(src), str(dst), os.getuid(), os.getgid())
+    assert _tree(src) == expected
+
+
+def test_copy_file_fallback(monkeypatch, tmpdir):
+    # e.g. copy_file_range between filesystems is not supported on older kernels
+    monkeypatch.setattr(satellite_upgrade_data_migration, '_copy_range', lambda src_fd, dst_fd, size: 0)
+    monkeypatch.setattr(satellite_upgrade_data_migration, 'FICLONE', 0)
+    content = os.urandom(1024 * 1024)
+    tmpdir.join('src').write_binary(content)
+
+    size = satellite_upgrade_data_migration._copy_file(
+        str(tmpdir.join('src')), str(tmpdir.join('dst')), os.getuid(), os.getgid())
+
+    assert size == len(content)
+    assert tmpdir.join('dst').read_binary() == content
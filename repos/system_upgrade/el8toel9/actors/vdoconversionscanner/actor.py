@@ -38,6 +38,10 @@ class VdoConversionScanner(Actor):
 
     Devices identified as not a VDO device are skipped.
 
+    Devices are checked concurrently and each check is limited by a timeout;
+    a check which timed out marks the device as undetermined. All paths of
+    a multipath device are checked just once, using the multipath device.
+
     Devices identified as pre-conversion VDOs have their identifying data
     stored in a VdoConversionPreDevice model; their simple existence is
     sufficient reason to prevent upgrade.
@@ -46,7 +50,8 @@ class VdoConversionScanner(Actor):
     conversion to LVM-based management (e.g., via a poorly timed system crash
     during the conversion). For those VDO device's identified as
     post-conversion `VdoConversionScanner` performs an additional check to
-    determine if the device is identified by blkid as an LVM2_member.  As the
+    determine if the device contains the LVM2 label (read directly from the
+    device, or by blkid as an LVM2_member when it cannot be read).  As the
     invocation of blkid may fail for reasons outside this scanner's control if
     such happens the device's completion status will be set to indicate it did
     not complete conversion.
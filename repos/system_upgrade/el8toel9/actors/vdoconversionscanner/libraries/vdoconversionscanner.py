@@ -1,4 +1,5 @@
 import os
+from multiprocessing.pool import ThreadPool
 
 from leapp import models
 from leapp.libraries.common import rpms
@@ -6,13 +7,55 @@ from leapp.libraries.stdlib import api, run
 
 MIN_DISK_SIZE = 2 ** 22  # 4 MiB
 
+# Upper bound of devices probed at the same time
+MAX_WORKERS = 8
+# Seconds to wait for a single device check, a stuck SAN path must not block the upgrade
+CHECK_TIMEOUT = 120
+# Exit code of the timeout utility when the command timed out
+TIMEOUT_EXIT_CODE = 124
+
+# The LVM label is stored in one of the first four 512B sectors of a PV
+_LVM_LABEL_SECTOR_SIZE = 512
+_LVM_LABEL_SCAN_SECTORS = 4
+_LVM_LABEL_ID = b'LABELONE'
+_LVM_LABEL_TYPE = b'LVM2 001'
+_LVM_LABEL_TYPE_OFFSET = 24
+
+
+def _timed(command):
+    return ['timeout', str(CHECK_TIMEOUT)] + command
+
+
+def _has_lvm_label(device):
+    """
+    Return True if the device contains the LVM2 label, the same way as blkid detects LVM2_member
+
+    :raises EnvironmentError: when the device cannot be read
+    """
+    with open(device, 'rb') as f:
+        data = f.read(_LVM_LABEL_SECTOR_SIZE * _LVM_LABEL_SCAN_SECTORS)
+    for offset in range(0, len(data), _LVM_LABEL_SECTOR_SIZE):
+        sector = data[offset:offset + _LVM_LABEL_SECTOR_SIZE]
+        label_type = sector[_LVM_LABEL_TYPE_OFFSET:_LVM_LABEL_TYPE_OFFSET + len(_LVM_LABEL_TYPE)]
+        if sector.startswith(_LVM_LABEL_ID) and label_type == _LVM_LABEL_TYPE:
+            return True
+    return False
+
 
 def _check_vdo_lvm_managed(device):
     """
     Determines if the specified device (which has already been identified
     as a post-conversion vdo device (at the level of vdo) is managed by lvm.
+
+    The LVM label is looked up directly on the device; blkid is used
+    only when the device cannot be read.
     """
-    command = ['blkid', '--match-token', 'TYPE=LVM2_member', device]
+    try:
+        return 0 if _has_lvm_label(device) else 2
+    except EnvironmentError as err:
+        api.current_logger().debug('Cannot read the LVM label of {}: {}'.format(device, err))
+
+    command = _timed(['blkid', '--match-token', 'TYPE=LVM2_member', device])
     result = run(command, checked=False)
     exit_code = result['exit_code']
     #     0: Is LVM managed
@@ -26,7 +69,7 @@ def _check_vdo_pre_conversion(device):
     Identify if the specified device is either not a vdo device, a
     pre-conversion vdo device or a post-conversion vdo device.
     """
-    command = ['/usr/libexec/vdoprepareforlvm', '--check', device]
+    command = _timed(['/usr/libexec/vdoprepareforlvm', '--check', device])
     result = run(command, checked=False)
     exit_code = result['exit_code']
     #   255: Not a vdo device
@@ -44,81 +87,137 @@ def _vdo_package_installed():
     return rpms.has_package(models.DistributionSignedRPM, 'vdo')
 
 
+def _get_multipath_devices(storage_info):
+    """
+    Return dict mapping names of multipath paths to the kernel name of their multipath device
+    """
+    return {
+        lsblk.parent_name: lsblk.kname
+        for lsblk in storage_info.lsblk if lsblk.tp == 'mpath' and lsblk.parent_name
+    }
+
+
+def _probe_device(device):
+    """
+    Return a tuple of results of vdoprepareforlvm and of the LVM check for the device
+
+    The LVM check is performed only for post-conversion vdo devices, otherwise it's None.
+    """
+    result = _check_vdo_pre_conversion(device)
+    if result != 0:
+        return result, None
+    return result, _check_vdo_lvm_managed(device)
+
+
+def _probe_devices(devices):
+    """
+    Probe the devices concurrently, return dict mapping each device to the result of _probe_device
+    """
+    devices = sorted(devices)
+    if len(devices) < 2:
+        return {device: _probe_device(device) for device in devices}
+
+    pool = ThreadPool(min(len(devices), MAX_WORKERS))
+    try:
+        results = pool.map(_probe_device, devices)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(devices, results))
+
+
 def get_info(storage_info):
     pre_conversion_devices = []
     post_conversion_devices = []
     undetermined_conversion_devices = []
 
     # Only if lvm is installed can there be VDO instances.
-    if _lvm_package_installed():
-        vdo_package_installed = _vdo_package_installed()
-
-        for lsblk in storage_info.lsblk:
-            # NOTE: partitions < MIN_DISK_SIZE cannot be handled by vdo and
-            # the check results in unexpected outputs
-            if lsblk.tp not in ('disk', 'part') or lsblk.bsize < MIN_DISK_SIZE:
-                continue
-
-            if not vdo_package_installed:
-                undetermined_conversion_devices.append(
-                    models.VdoConversionUndeterminedDevice(name=lsblk.name))
-                continue
-
-            # refer to kernel name
-            device = '/dev/{0}'.format(lsblk.kname)
-            if not os.path.exists(device):
-                # NOTE: Corner case. It's hypothetical situation which could possibly
-                # happen but we do not know under what circumstances and we do not
-                # have time now for investigation. Let's see if someone report it
-                # to us so we will have a data :)
-                # For now, stay on the safe side and inhibit the upgrade if this
-                # happens.
-                failure = (
-                    'cannot check device {0} (kernel name: {1}): file {2} does not exist'
-                    .format(lsblk.name, lsblk.kname, device)
+    if not _lvm_package_installed():
+        return models.VdoConversionInfo()
+
+    vdo_package_installed = _vdo_package_installed()
+    multipath_devices = _get_multipath_devices(storage_info)
+    # lsblk entries to check together with the device to probe for each of them
+    to_check = []
+
+    for lsblk in storage_info.lsblk:
+        # NOTE: partitions < MIN_DISK_SIZE cannot be handled by vdo and
+        # the check results in unexpected outputs
+        if lsblk.tp not in ('disk', 'part') or lsblk.bsize < MIN_DISK_SIZE:
+            continue
+
+        if not vdo_package_installed:
+            undetermined_conversion_devices.append(
+                models.VdoConversionUndeterminedDevice(name=lsblk.name))
+            continue
+
+        # refer to kernel name
+        device = '/dev/{0}'.format(lsblk.kname)
+        if not os.path.exists(device):
+            # NOTE: Corner case. It's hypothetical situation which could possibly
+            # happen but we do not know under what circumstances and we do not
+            # have time now for investigation. Let's see if someone report it
+            # to us so we will have a data :)
+            # For now, stay on the safe side and inhibit the upgrade if this
+            # happens.
+            failure = (
+                'cannot check device {0} (kernel name: {1}): file {2} does not exist'
+                .format(lsblk.name, lsblk.kname, device)
+            )
+            api.current_logger().warning(failure)
+            undetermined_conversion_devices.append(
+                models.VdoConversionUndeterminedDevice(
+                    name=lsblk.name,
+                    check_failed=True,
+                    failure=failure
                 )
-                api.current_logger().warning(failure)
-                undetermined_conversion_devices.append(
-                    models.VdoConversionUndeterminedDevice(
-                        name=lsblk.name,
-                        check_failed=True,
-                        failure=failure
-                    )
-                )
-                continue
-            result = _check_vdo_pre_conversion(device)
-            if result not in (255, 0, 1):
+            )
+            continue
+
+        # all paths of a multipath device hold the same data, probe the multipath
+        # device just once instead of each of its paths
+        if lsblk.name in multipath_devices:
+            device = '/dev/{0}'.format(multipath_devices[lsblk.name])
+        to_check.append((lsblk, device))
+
+    results = _probe_devices({device for dummy_lsblk, device in to_check})
+
+    for lsblk, device in to_check:
+        result, lvm_result = results[device]
+        if result not in (255, 0, 1):
+            if result == TIMEOUT_EXIT_CODE:
+                failure = '\'vdoprepareforlvm\' timed out for {0}'.format(lsblk.name)
+            else:
                 failure = (
                     'unexpected error from \'vdoprepareforlvm\' for {0}; result = {1}'
                     .format(lsblk.name, result)
                 )
-                undetermined_conversion_devices.append(
-                    models.VdoConversionUndeterminedDevice(
-                        name=lsblk.name,
-                        check_failed=True,
-                        failure=failure
-                    )
+            undetermined_conversion_devices.append(
+                models.VdoConversionUndeterminedDevice(
+                    name=lsblk.name,
+                    check_failed=True,
+                    failure=failure
                 )
-                continue
-
-            if result == 255:
-                # Not a vdo.
-                continue
-
-            if result:
-                pre_conversion_devices.append(
-                  models.VdoConversionPreDevice(name=lsblk.name))
-            else:
-                result = _check_vdo_lvm_managed(device)
-                failure = (None if result in (0, 2) else
-                           'unexpected error from \'blkid\' for {0}; '
-                           'result = {1}'.format(lsblk.name, result))
-
-                post_conversion_devices.append(
-                  models.VdoConversionPostDevice(name=lsblk.name,
-                                                 complete=(not result),
-                                                 check_failed=(failure is not None),
-                                                 failure=failure))
+            )
+            continue
+
+        if result == 255:
+            # Not a vdo.
+            continue
+
+        if result:
+            pre_conversion_devices.append(
+              models.VdoConversionPreDevice(name=lsblk.name))
+        else:
+            failure = (None if lvm_result in (0, 2) else
+                       'unexpected error from \'blkid\' for {0}; '
+                       'result = {1}'.format(lsblk.name, lvm_result))
+
+            post_conversion_devices.append(
+              models.VdoConversionPostDevice(name=lsblk.name,
+                                             complete=(not lvm_result),
+                                             check_failed=(failure is not None),
+                                             failure=failure))
 
     return models.VdoConversionInfo(pre_conversion=pre_conversion_devices,
                                     post_conversion=post_conversion_devices,
@@ -281,3 +281,61 @@ def test_small_partition_skip(monkeypatch):
     assert len(info.undetermined_conversion) == undetermined
     for item in info.undetermined_conversion:
         assert 'small' not in item.name
+
+
+def test_check_timeout(monkeypatch):
+    monkeypatch.setattr(os.path, 'exists', lambda dummy_file: True)
+    monkeypatch.setattr(vdoconversionscanner, '_lvm_package_installed', lambda: True)
+    monkeypatch.setattr(vdoconversionscanner, '_vdo_package_installed', lambda: True)
+    monkeypatch.setattr(vdoconversionscanner, 'run',
+                        lambda _, checked: {'exit_code': vdoconversionscanner.TIMEOUT_EXIT_CODE})
+
+    info = vdoconversionscanner.get_info(_storage_info(pre=1))
+
+    assert len(info.undetermined_conversion) == 1
+    assert info.undetermined_conversion[0].check_failed
+    assert 'timed out' in info.undetermined_conversion[0].failure
+
+
+def test_multipath_paths_probed_once(monkeypatch):
+    probed = []
+
+    def _check_pre_conversion_mocked(device):
+        probed.append(device)
+        return 1
+
+    monkeypatch.setattr(os.path, 'exists', lambda dummy_file: True)
+    monkeypatch.setattr(vdoconversionscanner, '_lvm_package_installed', lambda: True)
+    monkeypatch.setattr(vdoconversionscanner, '_vdo_package_installed', lambda: True)
+    monkeypatch.setattr(vdoconversionscanner, '_check_vdo_pre_conversion', _check_pre_conversion_mocked)
+
+    paths = [_lsblk_entry('sd', x, ['disk']) for x in range(2)]
+    mpaths = [
+        models.LsblkEntry(name='mpatha', kname='dm-0', maj_min='253:0', rm='0', size='128G', bsize=2 ** 37,
+                          ro='0', tp='mpath', mountpoint='', parent_name=path.name, parent_path='')
+        for path in paths
+    ]
+    info = vdoconversionscanner.get_info(models.StorageInfo(lsblk=paths + mpaths + [_lsblk_entry('sd', 2, ['disk'])]))
+
+    assert sorted(probed) == ['/dev/dm-0', '/dev/sd2']
+    assert sorted(device.name for device in info.pre_conversion) == ['sd0', 'sd1', 'sd2']
+
+
+def _write_device(path, sector=None):
+    data = bytearray(2048)
+    if sector is not None:
+        offset = 512 * sector
+        data[offset:offset + 8] = b'LABELONE'
+        data[offset + 24:offset + 32] = b'LVM2 001'
+    path.write_binary(bytes(data))
+    return str(path)
+
+
+def test_check_vdo_lvm_managed_label(monkeypatch, tmpdir):
+    monkeypatch.setattr(vdoconversionscanner, 'run', lambda *args, **kwargs: {'exit_code': -1})
+
+    assert vdoconversionscanner._check_vdo_lvm_managed(_write_device(tmpdir.join('pv0'), sector=0)) == 0
+    assert vdoconversionscanner._check_vdo_lvm_managed(_write_device(tmpdir.join('pv1'), sector=1)) == 0
+    assert vdoconversionscanner._check_vdo_lvm_managed(_write_device(tmpdir.join('nopv'))) == 2
+    # unreadable device falls back to blkid
+    assert vdoconversionscanner._check_vdo_lvm_managed(str(tmpdir.join('missing'))) == -1
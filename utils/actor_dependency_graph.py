@@ -0,0 +1,252 @@
+"""
+Analyse dependencies between actors of a workflow phase
+
+Actors of a phase are executed by the leapp framework one after another in
+an order satisfying their consumes/produces declarations. This tool builds
+the dependency graph of actors of the given phase from their definitions
+and shows groups (waves) of actors independent on each other, which could
+be executed concurrently.
+
+When a leapp-timing.json file of a previous execution is provided, the tool
+estimates the wall time of the phase if the independent actors were executed
+concurrently by the given number of workers, compared to the sequential one.
+
+Actors are discovered by parsing actor.py files, so the tool does not need
+the leapp framework to be installed.
+
+Actors of a single upgrade path are analysed, i.e. actors of the common
+repository and of the repository of the given upgrade path (e.g. el8toel9).
+
+Example:
+    python utils/actor_dependency_graph.py -C repos/system_upgrade --upgrade-path el8toel9 \\
+        --phase FactsPhase --timing /var/log/leapp/leapp-timing.json --workers 4
+"""
+
+import argparse
+import ast
+import heapq
+import json
+import os
+import re
+import sys
+
+STAGES = ('Before', None, 'After')
+COMMON_REPO = 'common'
+UPGRADE_PATH_REPO_RE = re.compile(r'^el\d+toel\d+$')
+
+
+def _names(node):
+    """
+    Return names and stages of tags/models listed in a tuple, e.g. `(FactsPhaseTag.Before, IPUWorkflowTag)`
+    """
+    if not isinstance(node, (ast.Tuple, ast.List)):
+        node = ast.Tuple(elts=[node])
+    result = []
+    for elt in node.elts:
+        if isinstance(elt, ast.Name):
+            result.append((elt.id, None))
+        elif isinstance(elt, ast.Attribute) and isinstance(elt.value, ast.Name):
+            result.append((elt.value.id, elt.attr))
+    return result
+
+
+def parse_actor(actor_path):
+    """
+    Return dict with the name, consumes, produces and tags of the actor defined in the file, None if not found
+    """
+    with open(actor_path) as actor_file:
+        try:
+            module = ast.parse(actor_file.read())
+        except SyntaxError:
+            sys.stderr.write('Failed to parse {0}.\n'.format(actor_path))
+            return None
+
+    for node in module.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        if not any(isinstance(base, ast.Name) and base.id == 'Actor' for base in node.bases):
+            continue
+        actor = {'path': os.path.dirname(actor_path), 'name': None, 'consumes': [], 'produces': [], 'tags': []}
+        for child in node.body:
+            if not isinstance(child, ast.Assign) or len(child.targets) != 1:
+                continue
+            target = child.targets[0]
+            if not isinstance(target, ast.Name):
+                continue
+            if target.id == 'name':
+                actor['name'] = getattr(child.value, 's', getattr(child.value, 'value', None))
+            elif target.id in ('consumes', 'produces'):
+                actor[target.id] = [name for name, dummy_attr in _names(child.value)]
+            elif target.id == 'tags':
+                actor['tags'] = _names(child.value)
+        return actor
+    return None
+
+
+def find_actors(root, repos):
+    actors = []
+    for repo in repos:
+        for directory, dummy_subdirs, files in os.walk(os.path.join(root, repo)):
+            if 'actor.py' in files and os.sep + 'tests' not in directory:
+                actor = parse_actor(os.path.join(directory, 'actor.py'))
+                if actor and actor['name']:
+                    actors.append(actor)
+    return actors
+
+
+def get_upgrade_path_repos(root, upgrade_path):
+    """
+    Return repositories with actors of the upgrade path, e.g. ['common', 'el8toel9'] for 'el8toel9'
+    """
+    upgrade_paths = sorted(
+        d for d in os.listdir(root) if UPGRADE_PATH_REPO_RE.match(d) and os.path.isdir(os.path.join(root, d))
+    )
+    if upgrade_path not in upgrade_paths:
+        raise ValueError('Unknown upgrade path {}, available: {}'.format(upgrade_path, ', '.join(upgrade_paths)))
+    return [COMMON_REPO, upgrade_path]
+
+
+def get_phase_actors(actors, phase, workflow_tag):
+    """
+    Return actors of the phase with their stage ('Before', None or 'After')
+    """
+    result = []
+    phase_tag = '{}Tag'.format(phase)
+    for actor in actors:
+        tags = dict(actor['tags'])
+        if workflow_tag not in tags or phase_tag not in tags:
+            continue
+        actor = dict(actor, stage=tags[phase_tag] if tags[phase_tag] in STAGES else None)
+        result.append(actor)
+    return sorted(result, key=lambda a: a['name'])
+
+
+def build_dependencies(actors):
+    """
+    Return dict mapping name of each actor to names of actors of the phase it has to wait for
+
+    An actor waits for actors producing models it consumes and for all actors of previous stages.
+    """
+    producers = {}
+    for actor in actors:
+        for model in actor['produces']:
+            producers.setdefault(model, set()).add(actor['name'])
+
+    dependencies = {}
+    for actor in actors:
+        deps = set()
+        for model in actor['consumes']:
+            deps.update(producers.get(model, ()))
+        stage = STAGES.index(actor['stage'])
+        deps.update(a['name'] for a in actors if STAGES.index(a['stage']) < stage)
+        deps.discard(actor['name'])
+        dependencies[actor['name']] = deps
+    return dependencies
+
+
+def get_waves(dependencies):
+    """
+    Return list of waves, each wave is a sorted list of actors depending only on actors of previous waves
+    """
+    remaining = {name: set(deps) for name, deps in dependencies.items()}
+    waves = []
+    while remaining:
+        wave = sorted(name for name, deps in remaining.items() if not deps)
+        if not wave:
+            raise ValueError('Cyclic dependencies between actors: {}'.format(', '.join(sorted(remaining))))
+        waves.append(wave)
+        for name in wave:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(wave)
+    return waves
+
+
+def estimate_wall_time(dependencies, durations, workers):
+    """
+    Estimate the wall time of executing the actors by the given number of workers
+
+    Ready actors are started in the order of their durations, the longest first.
+    """
+    remaining = {name: set(deps) for name, deps in dependencies.items()}
+    dependants = {}
+    for name, deps in dependencies.items():
+        for dep in deps:
+            dependants.setdefault(dep, set()).add(name)
+
+    ready = [(-durations.get(name, 0.0), name) for name, deps in remaining.items() if not deps]
+    heapq.heapify(ready)
+    running = []
+    now = 0.0
+    while ready or running:
+        while ready and len(running) < workers:
+            duration, name = heapq.heappop(ready)
+            heapq.heappush(running, (now - duration, name))
+        now, finished = heapq.heappop(running)
+        for name in dependants.get(finished, ()):
+            remaining[name].discard(finished)
+            if not remaining[name]:
+                heapq.heappush(ready, (-durations.get(name, 0.0), name))
+    return now
+
+
+def load_durations(timing_path, phase):
+    with open(timing_path) as f:
+        timing = json.load(f)
+    return {a['actor']: a['wall_time'] for a in timing.get('actors', []) if a['phase'] == phase}
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(description='Show actors of a workflow phase which could run concurrently')
+    parser.add_argument('-C', '--change-dir', dest='cwd', default='repos/system_upgrade',
+                        help='Directory containing the repositories.')
+    parser.add_argument('--upgrade-path',
+                        help='Repository of the upgrade path, e.g. el8toel9. Analysed with the common repository.')
+    parser.add_argument('--repo', action='append', dest='repos',
+                        help='Repository to analyse, can be used multiple times instead of --upgrade-path.')
+    parser.add_argument('--phase', default='FactsPhase', help='Name of the phase, e.g. FactsPhase or ChecksPhase.')
+    parser.add_argument('--workflow-tag', default='IPUWorkflowTag', help='Tag of the workflow.')
+    parser.add_argument('--timing', help='Path to leapp-timing.json of an execution to estimate the wall time.')
+    parser.add_argument('--workers', type=int, default=4, help='Number of workers for the estimation.')
+    return parser
+
+
+def main():
+    parser = make_parser()
+    args = parser.parse_args()
+    root = os.path.abspath(args.cwd)
+    if bool(args.upgrade_path) == bool(args.repos):
+        parser.error('exactly one of --upgrade-path or --repo has to be specified')
+    if args.upgrade_path:
+        try:
+            repos = get_upgrade_path_repos(root, args.upgrade_path)
+        except ValueError as err:
+            parser.error(str(err))
+    else:
+        repos = args.repos
+        if len([repo for repo in repos if UPGRADE_PATH_REPO_RE.match(repo)]) > 1:
+            parser.error('actors of different upgrade paths cannot be analysed together')
+    actors = get_phase_actors(find_actors(root, repos), args.phase, args.workflow_tag)
+    dependencies = build_dependencies(actors)
+    waves = get_waves(dependencies)
+
+    print('{}: {} actors in {} waves, up to {} independent actors at once'.format(
+        args.phase, len(actors), len(waves), max([len(w) for w in waves] or [0])))
+    for i, wave in enumerate(waves, 1):
+        print('  wave {}: {}'.format(i, ', '.join(wave)))
+
+    if args.timing:
+        durations = load_durations(args.timing, args.phase)
+        missing = sorted(set(dependencies) - set(durations))
+        if missing:
+            print('No timing data for (not executed?): {}'.format(', '.join(missing)))
+        sequential = sum(durations.get(name, 0.0) for name in dependencies)
+        print('Sequential wall time:            {:.1f}s'.format(sequential))
+        print('Estimated wall time, {} workers: {:.1f}s'.format(
+            args.workers, estimate_wall_time(dependencies, durations, max(args.workers, 1))))
+        print('Critical path:                   {:.1f}s'.format(
+            estimate_wall_time(dependencies, durations, len(dependencies) or 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Measure the startup time of leapp with and without the repository manifest
+
+Two things are measured, each with the manifest used and with the manifest
+ignored (LEAPP_DEVEL_SKIP_REPOSITORY_MANIFEST=1):
+  - wall time of `leapp preupgrade --help`, which loads all leapp commands
+  - time needed to load the repositories, i.e. the time spent by leapp
+    preupgrade/upgrade before the execution of the first actor
+
+Must be executed on a system with leapp and leapp-repository installed.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+LOAD_REPOSITORIES = (
+    'import time\n'
+    'from leapp.cli.commands.upgrade import util\n'
+    'start = time.time()\n'
+    'util.load_repositories()\n'
+    'print(time.time() - start)\n'
+)
+
+
+def _env(skip_manifest):
+    env = dict(os.environ)
+    env['LEAPP_DEVEL_SKIP_REPOSITORY_MANIFEST'] = '1' if skip_manifest else '0'
+    return env
+
+
+def measure_help(skip_manifest):
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        subprocess.check_call(['leapp', 'preupgrade', '--help'], stdout=devnull, env=_env(skip_manifest))
+    return time.time() - start
+
+
+def measure_load_repositories(skip_manifest):
+    output = subprocess.check_output([sys.executable, '-c', LOAD_REPOSITORIES], env=_env(skip_manifest))
+    return float(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of leapp')
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='Number of measurements of each case')
+    args = parser.parse_args()
+
+    for title, measure in (('leapp preupgrade --help', measure_help),
+                           ('load repositories', measure_load_repositories)):
+        for skip_manifest in (True, False):
+            times = [measure(skip_manifest) for dummy_i in range(args.iterations)]
+            print('{:<25} {:<18} median {:.3f}s, min {:.3f}s, max {:.3f}s'.format(
+                title, 'without manifest' if skip_manifest else 'with manifest',
+                _median(times), min(times), max(times)))
+
+
+if __name__ == '__main__':
+    main()
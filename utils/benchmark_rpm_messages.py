@@ -0,0 +1,103 @@
+"""
+Measure the cost of messages with installed packages in leapp.db
+
+Compares the current representation, where DistributionSignedRPM,
+InstalledRedHatSignedRPM and InstalledUnsignedRPM carry copies of RPM models
+of InstalledRPM, with a reference-based one, where they carry just indexes
+into InstalledRPM.items. Two things are measured for both representations:
+  - size of the message data stored in leapp.db; leapp stores the data of
+    messages by their hash, so messages with the same content (e.g.
+    DistributionSignedRPM and InstalledRedHatSignedRPM on RHEL) are stored once
+  - time needed to decode the data consumed by an actor checking signed
+    packages; with references the actor has to consume InstalledRPM as well
+
+The installed packages are read from the RPM DB of the system, a synthetic
+inventory is generated with --synthetic N.
+"""
+
+import argparse
+import hashlib
+import json
+import subprocess
+import time
+
+RPM_FIELDS = ('name', 'epoch', 'packager', 'version', 'release', 'arch', 'pgpsig')
+RPM_QUERY_FORMAT = '|'.join(
+    '%{{{}}}'.format(tag) for tag in ('NAME', 'EPOCH', 'PACKAGER', 'VERSION', 'RELEASE', 'ARCH')
+) + '|%|DSAHEADER?{%{DSAHEADER:pgpsig}}:{%|RSAHEADER?{%{RSAHEADER:pgpsig}}:{(none)}|}|\n'
+SIGNATURE = 'RSA/SHA256, Mon 01 Jan 2024 00:00:00 AM UTC, Key ID 199e2f91fd431d51'
+
+
+def read_installed_rpms():
+    output = subprocess.check_output(['rpm', '-qa', '--queryformat', RPM_QUERY_FORMAT]).decode('utf-8')
+    return [
+        dict(zip(RPM_FIELDS, line.split('|')), repository=None, module=None, stream=None)
+        for line in output.splitlines() if line
+    ]
+
+
+def generate_rpms(count, unsigned_ratio):
+    unsigned_every = int(1 / unsigned_ratio) if unsigned_ratio else 0
+    return [
+        {
+            'name': 'package-{}'.format(i), 'epoch': '0', 'packager': 'Red Hat, Inc. <http://bugzilla.redhat.com>',
+            'version': '1.{}.0'.format(i % 50), 'release': '{}.el9'.format(i % 7), 'arch': 'x86_64',
+            'pgpsig': '(none)' if unsigned_every and i % unsigned_every == 0 else SIGNATURE,
+            'repository': None, 'module': None, 'stream': None,
+        }
+        for i in range(count)
+    ]
+
+
+def _message_data(data):
+    # the same serialization as used by leapp for the message data
+    return json.dumps(data, sort_keys=True)
+
+
+def _stored_size(messages):
+    stored = {}
+    for data in messages:
+        serialized = _message_data(data)
+        stored[hashlib.sha256(serialized.encode('utf-8')).hexdigest()] = len(serialized)
+    return sum(stored.values())
+
+
+def _decode_time(messages, iterations):
+    serialized = [_message_data(data) for data in messages]
+    start = time.time()
+    for dummy_i in range(iterations):
+        for data in serialized:
+            json.loads(data)
+    return (time.time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cost of messages with installed packages')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='Use N generated packages instead of the RPM DB.')
+    parser.add_argument('--unsigned-ratio', type=float, default=0.05,
+                        help='Ratio of unsigned generated packages (default: 0.05).')
+    parser.add_argument('-n', '--iterations', type=int, default=20, help='Number of measurements of decoding.')
+    args = parser.parse_args()
+
+    rpms = generate_rpms(args.synthetic, args.unsigned_ratio) if args.synthetic else read_installed_rpms()
+    signed = [i for i, rpm in enumerate(rpms) if rpm['pgpsig'] != '(none)']
+    unsigned = [i for i, rpm in enumerate(rpms) if rpm['pgpsig'] == '(none)']
+
+    installed = {'items': rpms}
+    copies = {
+        'signed': {'items': [rpms[i] for i in signed]},
+        'unsigned': {'items': [rpms[i] for i in unsigned]},
+    }
+    references = {'signed': {'indexes': signed}, 'unsigned': {'indexes': unsigned}}
+
+    print('{} packages, {} signed, {} unsigned'.format(len(rpms), len(signed), len(unsigned)))
+    for title, split in (('copies', copies), ('references', references)):
+        # InstalledRPM, DistributionSignedRPM, InstalledRedHatSignedRPM, InstalledUnsignedRPM
+        stored = _stored_size([installed, split['signed'], split['signed'], split['unsigned']])
+        consumed = [split['signed']] if title == 'copies' else [installed, split['signed']]
+        print('{:<11} stored message data {:>8.1f} KiB, decoding consumed signed packages {:>7.2f} ms'.format(
+            title, stored / 1024.0, _decode_time(consumed, args.iterations) * 1000))
+
+
+if __name__ == '__main__':
+    main()
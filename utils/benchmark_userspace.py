@@ -0,0 +1,511 @@
+"""
+Measure the userspace phase of the upgrade against local stand-in services
+
+The target userspace creation, the DNF transaction check and the download
+of packages depend on the subscription-manager and on the CDN, which makes
+their measurements noisy and impossible offline. This script replaces them
+with local stand-ins:
+  - an HTTP server serving repositories, either a synthetic one generated
+    with the configured number and size of packages, or an existing local
+    mirror (--mirror), with a configurable latency of every request
+  - fake subscription-manager and yum executables (put first in PATH) answering
+    the queries of the rhsm library with a configurable latency
+
+Following stages are measured, reporting the wall time, CPU time, maximal
+RSS, IO of the executed processes and the amount of data served:
+  metadata    - dnf makecache of the served repositories
+  check       - dnf resolution of the transaction installing all served packages
+  download    - dnf download of all served packages
+  rhsm        - rhsm.scan_rhsm_info() of the leapp repository (requires leapp)
+  userspace   - creation of the target userspace by the target_userspace_creator
+                actor code: repositories enabled by the subscription-manager are
+                queried and the userspace packages are installed from them
+                (requires leapp, root and --mirror of the target system content)
+  preupgrade  - leapp preupgrade --no-rhsm with the served repositories enabled,
+                which prepares the target userspace and performs the DNF transaction
+                check (requires root and --mirror of the target system content)
+
+The dnf stages use an empty installroot and do not change the system. The rhsm
+and userspace stages measure only the called leapp code, not the loading of the
+leapp repositories preceding it; the RSS of these stages includes the loading.
+The served repositories are defined in /etc/yum.repos.d/ during the userspace
+and preupgrade stages.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import unquote
+except ImportError:  # Python 2
+    from urllib import unquote
+
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+STAGES = ('metadata', 'check', 'download', 'rhsm', 'userspace', 'preupgrade')
+# Stages executed with the served repositories defined in the system
+SYSTEM_REPOS_STAGES = ('userspace', 'preupgrade')
+DEFAULT_STAGES = ('metadata', 'check', 'download', 'rhsm')
+PACKAGE_PREFIX = 'leapp-benchmark'
+SYSTEM_REPOFILE = '/etc/yum.repos.d/leapp-benchmark.repo'
+MIB = 1024 * 1024
+
+SUBSCRIPTION_MANAGER = '''#!{python}
+import sys
+import time
+
+time.sleep({latency})
+args = sys.argv[1:]
+if args[:2] == ['list', '--consumed']:
+    print('SKU: RH00000000')
+elif args[:1] == ['status']:
+    print('Overall Status: Current')
+    print('Content Access Mode is set to Simple Content Access')
+elif args[:2] == ['repos', '--list-enabled']:
+    for repoid in {repoids!r}:
+        print('Repo ID: {{}}'.format(repoid))
+        print('Enabled: 1')
+elif args == ['release']:
+    print('Release: {release}')
+'''
+
+YUM = '''#!/bin/sh
+sleep {latency}
+'''
+
+# Script executing leapp code, the usage of the measured call is written into the file
+# given as the first argument; {body} calls measured() after the repositories are loaded
+LEAPP_SCRIPT = '''import json
+import logging
+import resource
+import sys
+import time
+
+from leapp.repository.scan import find_and_scan_repositories
+
+logging.basicConfig(level=logging.INFO, filename='/dev/null')
+repositories = find_and_scan_repositories('repos', include_locals=True)
+repositories.load()
+
+from leapp.libraries.common import mounting, rhsm
+from leapp.libraries.common.testutils import CurrentActorMocked
+from leapp.libraries.stdlib import api
+
+
+def usage():
+    usages = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return [time.time()] + [sum(getattr(u, name) for u in usages)
+                            for name in ('ru_utime', 'ru_stime', 'ru_inblock', 'ru_oublock')]
+
+
+def measured(function, *args):
+    start = usage()
+    function(*args)
+    wall, user, system, inblock, oublock = [end - begin for begin, end in zip(start, usage())]
+    with open(sys.argv[1], 'w') as f:
+        json.dump({{'wall': wall, 'user': user, 'sys': system,
+                   'read_mib': inblock * 512.0 / {mib}, 'written_mib': oublock * 512.0 / {mib}}}, f)
+
+
+{body}'''
+
+RHSM_SCAN = '''api.current_actor = CurrentActorMocked()
+measured(rhsm.scan_rhsm_info, mounting.NotIsolatedActions(base_dir='/'))
+'''
+
+# The userspace is created the way the target_userspace_creator actor does it, except
+# the context is the system itself instead of a container of its copy
+USERSPACE = '''userspace_dir, target_version, packages = sys.argv[2], sys.argv[3], sys.argv[4:]
+
+
+def create_userspace():
+    context = mounting.NotIsolatedActions(base_dir='/')
+    api.current_actor = CurrentActorMocked(dst_ver=target_version)
+    repoids = rhsm.get_enabled_repo_ids(context)
+    # the subscription-manager DNF plugin of the system must not manage the served repositories
+    api.current_actor = CurrentActorMocked(dst_ver=target_version,
+                                           envars={'LEAPP_NO_RHSM': '1', 'LEAPP_NOGPGCHECK': '1'})
+    userspacegen.prepare_target_userspace(context, userspace_dir, repoids, packages)
+
+
+with repositories.lookup_actor('target_userspace_creator').injected_context():
+    from leapp.libraries.actor import userspacegen
+    measured(create_userspace)
+'''
+# Packages installed into the target userspace by the target_userspace_creator actor
+USERSPACE_PACKAGES = ['dnf', 'dnf-command(config-manager)', 'util-linux']
+
+PRIMARY_PACKAGE = '''<package type="rpm">
+  <name>{name}</name>
+  <arch>noarch</arch>
+  <version epoch="0" ver="1.0" rel="1"/>
+  <checksum type="sha256" pkgid="YES">{pkgid}</checksum>
+  <summary>Synthetic package {name}</summary>
+  <description>Synthetic package {name}</description>
+  <packager/>
+  <url/>
+  <time file="0" build="0"/>
+  <size package="{size}" installed="{size}" archive="{size}"/>
+  <location href="{location}"/>
+  <format>
+    <rpm:license>GPLv2+</rpm:license>
+    <rpm:vendor/>
+    <rpm:group>Unspecified</rpm:group>
+    <rpm:buildhost>localhost</rpm:buildhost>
+    <rpm:sourcerpm>{name}-1.0-1.src.rpm</rpm:sourcerpm>
+    <rpm:header-range start="0" end="0"/>
+    <rpm:provides>
+      <rpm:entry name="{name}" flags="EQ" epoch="0" ver="1.0" rel="1"/>
+    </rpm:provides>
+    {requires}
+    <file>/usr/share/{name}/{name}</file>
+  </format>
+</package>
+'''
+
+FILELISTS_PACKAGE = '''<package pkgid="{pkgid}" name="{name}" arch="noarch">
+  <version epoch="0" ver="1.0" rel="1"/>
+  <file>/usr/share/{name}/{name}</file>
+  <file type="dir">/usr/share/{name}</file>
+</package>
+'''
+
+OTHER_PACKAGE = '''<package pkgid="{pkgid}" name="{name}" arch="noarch">
+  <version epoch="0" ver="1.0" rel="1"/>
+</package>
+'''
+
+METADATA = (
+    ('primary', '<metadata xmlns="http://linux.duke.edu/metadata/common" '
+                'xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="{count}">\n', '</metadata>\n'),
+    ('filelists', '<filelists xmlns="http://linux.duke.edu/metadata/filelists" packages="{count}">\n',
+     '</filelists>\n'),
+    ('other', '<otherdata xmlns="http://linux.duke.edu/metadata/other" packages="{count}">\n', '</otherdata>\n'),
+)
+
+REPOMD_DATA = '''  <data type="{type}">
+    <checksum type="sha256">{checksum}</checksum>
+    <open-checksum type="sha256">{open_checksum}</open-checksum>
+    <location href="repodata/{type}.xml.gz"/>
+    <timestamp>{timestamp}</timestamp>
+    <size>{size}</size>
+    <open-size>{open_size}</open-size>
+  </data>
+'''
+
+
+def _write_metadata(repodir, kind, header, footer, entries):
+    content = ('<?xml version="1.0" encoding="UTF-8"?>\n' + header + ''.join(entries) + footer).encode('utf-8')
+    path = os.path.join(repodir, 'repodata', '{}.xml.gz'.format(kind))
+    with open(path, 'wb') as f:
+        # mtime is fixed, so the same repository is generated every time
+        with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+            gz.write(content)
+    with open(path, 'rb') as f:
+        compressed = f.read()
+    return {
+        'type': kind,
+        'checksum': hashlib.sha256(compressed).hexdigest(),
+        'open_checksum': hashlib.sha256(content).hexdigest(),
+        'size': len(compressed),
+        'open_size': len(content),
+    }
+
+
+def generate_repository(repodir, repoid, packages, package_size):
+    """
+    Generate a repository of synthetic packages, return names of the packages
+
+    The packages have valid metadata, but their payload is not an RPM, so they can be
+    resolved and downloaded, not installed. Every package requires another one, so
+    the resolution of the transaction is not trivial.
+    """
+    os.makedirs(os.path.join(repodir, 'repodata'))
+    os.makedirs(os.path.join(repodir, 'Packages'))
+    names = ['{}-pkg{}'.format(repoid, i) for i in range(packages)]
+    entries = {kind: [] for kind, dummy_header, dummy_footer in METADATA}
+    for i, name in enumerate(names):
+        location = 'Packages/{}-1.0-1.noarch.rpm'.format(name)
+        # The payload differs for every package, so are their checksums (pkgid)
+        block = hashlib.sha256(name.encode('utf-8')).digest() * 32
+        payload = (block * (package_size // len(block) + 1))[:package_size]
+        with open(os.path.join(repodir, location), 'wb') as f:
+            f.write(payload)
+        requires = ''
+        if i:
+            requires = '<rpm:requires>\n      <rpm:entry name="{}"/>\n    </rpm:requires>'.format(names[i // 2])
+        fields = {'name': name, 'pkgid': hashlib.sha256(payload).hexdigest(), 'size': package_size,
+                  'location': location, 'requires': requires}
+        entries['primary'].append(PRIMARY_PACKAGE.format(**fields))
+        entries['filelists'].append(FILELISTS_PACKAGE.format(**fields))
+        entries['other'].append(OTHER_PACKAGE.format(**fields))
+
+    timestamp = int(time.time())
+    data = [_write_metadata(repodir, kind, header.format(count=packages), footer, entries[kind])
+            for kind, header, footer in METADATA]
+    with open(os.path.join(repodir, 'repodata', 'repomd.xml'), 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<repomd xmlns="http://linux.duke.edu/metadata/repo" '
+                'xmlns:rpm="http://linux.duke.edu/metadata/rpm">\n')
+        f.write('  <revision>{}</revision>\n'.format(timestamp))
+        for item in data:
+            f.write(REPOMD_DATA.format(timestamp=timestamp, **item))
+        f.write('</repomd>\n')
+    return names
+
+
+class _RepositoryServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, latency):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _RepositoryHandler)
+        self.root = root
+        self.latency = latency
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def add_served(self, size):
+        with self._lock:
+            self.served += size
+
+
+class _RepositoryHandler(SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        path = posixpath.normpath(unquote(path.split('?', 1)[0].split('#', 1)[0]))
+        return os.path.join(self.server.root, *[part for part in path.split('/') if part not in ('', '.', '..')])
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        SimpleHTTPRequestHandler.do_GET(self)
+
+    def copyfile(self, source, outputfile):
+        while True:
+            buf = source.read(64 * 1024)
+            if not buf:
+                break
+            outputfile.write(buf)
+            self.server.add_served(len(buf))
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(root, latency):
+    server = _RepositoryServer(root, latency)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def _write_executable(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    os.chmod(path, 0o755)
+
+
+def write_rhsm_shims(bindir, repoids, release, latency):
+    """
+    Write fake subscription-manager and yum executables into the bindir
+    """
+    os.makedirs(bindir)
+    _write_executable(os.path.join(bindir, 'subscription-manager'), SUBSCRIPTION_MANAGER.format(
+        python=sys.executable, latency=latency, repoids=list(repoids), release=release))
+    _write_executable(os.path.join(bindir, 'yum'), YUM.format(latency=latency))
+
+
+def write_repofile(path, baseurl, repoids):
+    with open(path, 'w') as f:
+        for repoid in repoids:
+            f.write('[{0}]\nname={0}\nbaseurl={1}/{0}/\nenabled=1\ngpgcheck=0\nmetadata_expire=0\n\n'.format(
+                repoid, baseurl))
+
+
+def measure(cmd, env, log, ok_codes=(0,), cwd=None):
+    """
+    Execute the command, return its resource usage
+
+    The usage covers the command and all its children waited for.
+    """
+    log.write('+ {}\n'.format(' '.join(cmd)))
+    log.flush()
+    start = time.time()
+    proc = subprocess.Popen(cmd, env=env, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+    dummy_pid, status, usage = os.wait4(proc.pid, 0)
+    wall = time.time() - start
+    exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    if exit_code not in ok_codes:
+        raise RuntimeError('Command {} failed with exit code {}, see {}'.format(' '.join(cmd), exit_code, log.name))
+    return {
+        'wall': wall,
+        'user': usage.ru_utime,
+        'sys': usage.ru_stime,
+        'maxrss_mib': usage.ru_maxrss / 1024.0,
+        'read_mib': usage.ru_inblock * 512.0 / MIB,
+        'written_mib': usage.ru_oublock * 512.0 / MIB,
+    }
+
+
+def _dnf_cmd(workdir, *args):
+    return [
+        'dnf', '-y', '--config', os.path.join(workdir, 'dnf.conf'),
+        '--installroot', os.path.join(workdir, 'installroot'), '--releasever', '1',
+        '--setopt=reposdir={}'.format(os.path.join(workdir, 'yum.repos.d')),
+        '--setopt=cachedir={}'.format(os.path.join(workdir, 'cache')),
+        '--disableplugin=*', '--nogpgcheck',
+    ] + list(args)
+
+
+def _leapp_script_cmd(workdir, stage, body, *args):
+    script = LEAPP_SCRIPT.format(mib=MIB, body=body)
+    return [sys.executable, '-c', script, os.path.join(workdir, '{}-usage.json'.format(stage))] + list(args)
+
+
+def get_stage_commands(stages, workdir, repoids, packages, target_version):
+    """
+    Return the commands of the stages as tuples (stage, command, accepted exit codes)
+
+    Commands of the rhsm and userspace stages write the usage of the measured leapp code
+    into <workdir>/<stage>-usage.json.
+    """
+    commands = []
+    for stage in stages:
+        if stage == 'metadata':
+            commands.append((stage, _dnf_cmd(workdir, 'makecache'), (0,)))
+        elif stage == 'check':
+            # The transaction is only resolved, dnf exits with 1 when the transaction is refused
+            commands.append((stage, _dnf_cmd(workdir, '--assumeno', 'install') + packages, (0, 1)))
+        elif stage == 'download':
+            commands.append((stage, _dnf_cmd(workdir, '--downloadonly', '--destdir',
+                                             os.path.join(workdir, 'download'), 'install') + packages, (0,)))
+        elif stage == 'rhsm':
+            commands.append((stage, _leapp_script_cmd(workdir, stage, RHSM_SCAN), (0,)))
+        elif stage == 'userspace':
+            commands.append((stage, _leapp_script_cmd(workdir, stage, USERSPACE, os.path.join(workdir, 'userspace'),
+                                                      target_version, *USERSPACE_PACKAGES), (0,)))
+        elif stage == 'preupgrade':
+            enablerepos = [arg for repoid in repoids for arg in ('--enablerepo', repoid)]
+            commands.append((stage, ['leapp', 'preupgrade', '--no-rhsm'] + enablerepos, (0,)))
+    return commands
+
+
+def _get_mirror_repoids(mirror):
+    return sorted(name for name in os.listdir(mirror)
+                  if os.path.isfile(os.path.join(mirror, name, 'repodata', 'repomd.xml')))
+
+
+def _print_results(results):
+    print('{:<11} {:>9} {:>9} {:>9} {:>10} {:>9} {:>10} {:>10}'.format(
+        'stage', 'wall [s]', 'user [s]', 'sys [s]', 'RSS [MiB]', 'read', 'written', 'served'))
+    for result in results:
+        print('{stage:<11} {wall:>9.2f} {user:>9.2f} {sys:>9.2f} {maxrss_mib:>10.1f} {read_mib:>9.1f}M '
+              '{written_mib:>9.1f}M {served_mib:>9.1f}M'.format(**result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the userspace phase against local stand-in services')
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES),
+                        help='Comma separated stages to measure, available: {}'.format(', '.join(STAGES)))
+    parser.add_argument('--repos', type=int, default=2, help='Number of synthetic repositories')
+    parser.add_argument('--packages', type=int, default=2000, help='Number of packages in a synthetic repository')
+    parser.add_argument('--package-size', type=int, default=64 * 1024, help='Size of a synthetic package in bytes')
+    parser.add_argument('--mirror', help='Serve repositories (subdirectories with repodata) of the local mirror '
+                                         'instead of the synthetic ones')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latency of every HTTP request in seconds')
+    parser.add_argument('--rhsm-latency', type=float, default=1.0,
+                        help='Latency of every subscription-manager command in seconds')
+    parser.add_argument('--release', default='8.10', help='Release reported by subscription-manager')
+    parser.add_argument('--target-version', default='9.6',
+                        help='Target system version used to create the target userspace (default: 9.6)')
+    parser.add_argument('--workdir', help='Directory (not existing yet) for generated data, kept after the run; '
+                                          'a temporary one is used and removed by default')
+    parser.add_argument('--json', help='Write the results into the file in the JSON format')
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error('Unknown stages: {}'.format(', '.join(sorted(unknown))))
+    if set(stages) & set(SYSTEM_REPOS_STAGES) and os.path.exists(SYSTEM_REPOFILE):
+        parser.error('{} exists already, remove it first'.format(SYSTEM_REPOFILE))
+    if 'userspace' in stages and not args.mirror:
+        parser.error('The userspace stage requires --mirror, synthetic packages cannot be installed')
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='leapp-benchmark-')
+    repo_root = os.path.join(workdir, 'repos')
+    os.makedirs(os.path.join(workdir, 'yum.repos.d'))
+    os.makedirs(os.path.join(workdir, 'installroot'))
+
+    if args.mirror:
+        repo_root = args.mirror
+        repoids = _get_mirror_repoids(args.mirror)
+        # Packages of a mirror are not known, let dnf install whatever the mirror provides
+        packages = ['*']
+    else:
+        repoids = ['{}-{}'.format(PACKAGE_PREFIX, i) for i in range(args.repos)]
+        packages = []
+        for repoid in repoids:
+            packages.extend(generate_repository(os.path.join(repo_root, repoid), repoid, args.packages,
+                                                args.package_size))
+
+    server = start_server(repo_root, args.latency)
+    baseurl = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    write_repofile(os.path.join(workdir, 'yum.repos.d', 'benchmark.repo'), baseurl, repoids)
+    with open(os.path.join(workdir, 'dnf.conf'), 'w') as f:
+        f.write('[main]\ngpgcheck=0\ninstallonly_limit=3\nclean_requirements_on_remove=True\n')
+    bindir = os.path.join(workdir, 'bin')
+    write_rhsm_shims(bindir, repoids, args.release, args.rhsm_latency)
+
+    env = dict(os.environ)
+    env['PATH'] = os.pathsep.join([bindir, env.get('PATH', '')])
+    results = []
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(workdir, 'benchmark.log'), 'w') as log:
+        try:
+            stage_commands = get_stage_commands(stages, workdir, repoids, packages, args.target_version)
+            for stage, cmd, ok_codes in stage_commands:
+                if stage in SYSTEM_REPOS_STAGES:
+                    write_repofile(SYSTEM_REPOFILE, baseurl, repoids)
+                served = server.served
+                try:
+                    result = measure(cmd, env, log, ok_codes=ok_codes, cwd=repo_dir)
+                finally:
+                    if stage in SYSTEM_REPOS_STAGES:
+                        os.unlink(SYSTEM_REPOFILE)
+                usage_path = os.path.join(workdir, '{}-usage.json'.format(stage))
+                if os.path.exists(usage_path):
+                    # only the measured leapp code, without loading of the repositories
+                    with open(usage_path) as f:
+                        result.update(json.load(f))
+                result['stage'] = stage
+                result['served_mib'] = (server.served - served) / float(MIB)
+                results.append(result)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    _print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2, sort_keys=True)
+    if not args.workdir:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import actor_dependency_graph  # noqa: E402; pylint: disable=wrong-import-position
+
+ACTOR_TEMPLATE = '''
+from leapp.actors import Actor
+from leapp.models import {models}
+from leapp.tags import FactsPhaseTag, IPUWorkflowTag
+
+
+class {cls}(Actor):
+    name = '{name}'
+    consumes = ({consumes})
+    produces = ({produces})
+    tags = (FactsPhaseTag{stage}, IPUWorkflowTag)
+'''
+
+
+def _actor(name, consumes=(), produces=(), stage=None):
+    return {'name': name, 'consumes': list(consumes), 'produces': list(produces), 'stage': stage}
+
+
+def _write_actor(path, name, consumes=(), produces=(), stage=None):
+    path.ensure_dir()
+    path.join('actor.py').write(ACTOR_TEMPLATE.format(
+        models=', '.join(set(consumes) | set(produces) | {'Report'}),
+        cls=''.join(part.capitalize() for part in name.split('_')),
+        name=name,
+        consumes=''.join('{}, '.format(model) for model in consumes),
+        produces=''.join('{}, '.format(model) for model in produces),
+        stage='.{}'.format(stage) if stage else '',
+    ))
+
+
+def test_build_dependencies():
+    actors = [
+        _actor('before', stage='Before'),
+        _actor('scanner', produces=['Facts']),
+        _actor('other_scanner', produces=['Facts', 'OtherFacts']),
+        _actor('checker', consumes=['Facts']),
+        _actor('independent', consumes=['Unknown']),
+        _actor('after', consumes=['OtherFacts'], stage='After'),
+    ]
+
+    dependencies = actor_dependency_graph.build_dependencies(actors)
+
+    assert dependencies == {
+        'before': set(),
+        'scanner': {'before'},
+        'other_scanner': {'before'},
+        'checker': {'before', 'scanner', 'other_scanner'},
+        'independent': {'before'},
+        'after': {'before', 'scanner', 'other_scanner', 'checker', 'independent'},
+    }
+
+
+def test_build_dependencies_consumes_own_model():
+    dependencies = actor_dependency_graph.build_dependencies([_actor('a', consumes=['Facts'], produces=['Facts'])])
+    assert dependencies == {'a': set()}
+
+
+def test_get_waves():
+    dependencies = {
+        'a': set(),
+        'b': set(),
+        'c': {'a'},
+        'd': {'a', 'c'},
+        'e': {'b'},
+    }
+
+    assert actor_dependency_graph.get_waves(dependencies) == [['a', 'b'], ['c', 'e'], ['d']]
+    assert actor_dependency_graph.get_waves({}) == []
+
+
+def test_get_waves_cycle():
+    with pytest.raises(ValueError, match='Cyclic dependencies between actors: a, b'):
+        actor_dependency_graph.get_waves({'a': {'b'}, 'b': {'a'}, 'c': set()})
+
+
+@pytest.mark.parametrize('workers,expected', [
+    (1, 10.0),
+    (2, 6.0),
+    (4, 6.0),
+])
+def test_estimate_wall_time(workers, expected):
+    dependencies = {
+        'a': set(),
+        'b': set(),
+        'c': set(),
+        'd': {'a'},
+    }
+    durations = {'a': 2.0, 'b': 3.0, 'c': 1.0, 'd': 4.0}
+
+    assert actor_dependency_graph.estimate_wall_time(dependencies, durations, workers) == expected
+
+
+def test_estimate_wall_time_missing_durations():
+    # actors without timing data (e.g. not executed) take no time
+    assert actor_dependency_graph.estimate_wall_time({'a': set(), 'b': {'a'}}, {'b': 1.5}, 1) == 1.5
+
+
+def test_get_upgrade_path_repos(tmpdir):
+    for repo in ('common', 'el7toel8', 'el8toel9'):
+        tmpdir.mkdir(repo)
+
+    assert actor_dependency_graph.get_upgrade_path_repos(tmpdir.strpath, 'el8toel9') == ['common', 'el8toel9']
+    with pytest.raises(ValueError, match='available: el7toel8, el8toel9'):
+        actor_dependency_graph.get_upgrade_path_repos(tmpdir.strpath, 'common')
+
+
+def test_phase_actors_of_upgrade_path(tmpdir):
+    _write_actor(tmpdir.join('common', 'actors', 'scanner'), 'scanner', produces=['Facts'])
+    _write_actor(tmpdir.join('common', 'actors', 'checker'), 'checker', consumes=['Facts'], stage='After')
+    _write_actor(tmpdir.join('el8toel9', 'actors', 'checker9'), 'checker9', consumes=['Facts'])
+    _write_actor(tmpdir.join('el9toel10', 'actors', 'checker10'), 'checker10', consumes=['Facts'])
+
+    repos = actor_dependency_graph.get_upgrade_path_repos(tmpdir.strpath, 'el8toel9')
+    actors = actor_dependency_graph.get_phase_actors(
+        actor_dependency_graph.find_actors(tmpdir.strpath, repos), 'FactsPhase', 'IPUWorkflowTag'
+    )
+
+    assert [(actor['name'], actor['stage']) for actor in actors] == [
+        ('checker', 'After'), ('checker9', None), ('scanner', None)
+    ]
+    assert actor_dependency_graph.get_waves(actor_dependency_graph.build_dependencies(actors)) == [
+        ['scanner'], ['checker9'], ['checker']
+    ]